@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark voor YouTube Samenvatting
+Draait de pipeline tegen lokale stand-ins voor YouTube, Ollama, OpenAI en Anthropic
+en meet latency per stap, throughput en piekgeheugen.
+
+Gebruik:
+    python benchmark.py
+    python benchmark.py --provider anthropic --transcript-words 40000 --repeat 5
+    python benchmark.py --json baseline.json
+    python benchmark.py --compare baseline.json   # exit code 1 bij een regressie
+    python benchmark.py --startup                 # import tijd / eerste venster
+    python benchmark.py --startup --app "dist/YouTube Samenvatting.app/Contents/MacOS/YouTube Samenvatting"
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import statistics
+import tracemalloc
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+import youtube_samenvatting as ys
+
+API_KEY = "benchmark-key"
+
+# Woorden voor de gegenereerde transcriptie (vast zaadje: elke run dezelfde tekst)
+VOCABULARY = """
+model agent python pytorch transformer context token cache latency api server client
+training inference dataset gpu cpu geheugen snelheid kwaliteit benchmark versie release
+open source licentie prompt embedding vector database zoekopdracht resultaat workflow
+we gaan kijken hoe dit werkt en waarom het sneller is dan de vorige aanpak in de praktijk
+""".split()
+
+# Antwoord van de nep-LLM: Markdown in de structuur van SUMMARY_PROMPT
+ANSWER_LINES = [
+    "## Core Thesis", "Lokale modellen met een **KV-cache** halveren de latency.",
+    "## Technische Componenten & Toolstack", "- Ollama 0.3 met gpt-oss:20b", "- PyTorch 2.4",
+    "## Concrete Toepassingen (The 'How-To')", "1. Transcript ophalen", "2. Samenvatting maken",
+    "## Mechanische Diepgang", "De prefill bepaalt de wachttijd tot het eerste token.",
+    "## Toekomstige Implicaties & 'Next Steps'", "- Grotere context windows binnen 6 maanden",
+]
+
+
+def make_transcript(words: int, seed: int = 42) -> list:
+    """Deterministic transcript lines of about `words` words (12 per line)."""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(VOCABULARY) for _ in range(12)) + "." for _ in range(max(1, words // 12))]
+
+
+def answer_tokens(count: int) -> list:
+    """The first `count` word tokens of the fake LLM answer (repeated when needed)."""
+    pieces = []
+    for line in ANSWER_LINES:
+        words = line.split(" ")
+        pieces.extend(w + " " for w in words[:-1])
+        pieces.append(words[-1] + "\n")
+    return [pieces[i % len(pieces)] for i in range(count)]
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for Ollama (/api/generate, /api/chat), OpenAI (/v1/chat/completions)
+    and Anthropic (/v1/messages), streaming and non-streaming.
+    Timing comes from the server: latency before the first token, then tokens
+    at token_rate per second.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        tokens = answer_tokens(server.answer_tokens)
+        time.sleep(server.latency)
+
+        if self.path in ("/api/generate", "/api/chat"):
+            self.ollama(body, tokens)
+        elif self.path.endswith("/chat/completions"):
+            self.openai(body, tokens)
+        elif self.path.endswith("/messages"):
+            self.anthropic(body, tokens)
+        else:
+            self.send_error(404)
+
+    def pace(self):
+        if self.server.token_rate:
+            time.sleep(1 / self.server.token_rate)
+
+    def send_json(self, data: dict):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+    def ollama(self, body: dict, tokens: list):
+        chat = self.path == "/api/chat"
+        prompt_tokens = len(json.dumps(body.get("messages") or body.get("prompt"))) // 4
+
+        def chunk(text, done=False):
+            data = {"message": {"role": "assistant", "content": text}} if chat else {"response": text}
+            data["done"] = done
+            if done:
+                data.update(prompt_eval_count=prompt_tokens, prompt_eval_duration=int(self.server.latency * 1e9),
+                            eval_count=len(tokens), eval_duration=int(len(tokens) / (self.server.token_rate or 1e9) * 1e9))
+            return data
+
+        if not body.get("stream", True):
+            for _ in tokens:
+                self.pace()
+            self.send_json(chunk("".join(tokens), done=True))
+            return
+        self.start_chunked("application/x-ndjson")
+        for token in tokens:
+            self.pace()
+            self.write_chunk(json.dumps(chunk(token)) + "\n")
+        self.write_chunk(json.dumps(chunk("", done=True)) + "\n")
+        self.end_chunked()
+
+    def openai(self, body: dict, tokens: list):
+        base = {"id": "bench", "created": 0, "model": body.get("model", "bench")}
+        usage = {"prompt_tokens": len(json.dumps(body.get("messages"))) // 4, "completion_tokens": len(tokens)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not body.get("stream"):
+            for _ in tokens:
+                self.pace()
+            self.send_json({**base, "object": "chat.completion",
+                            "choices": [{"index": 0, "finish_reason": "stop",
+                                         "message": {"role": "assistant", "content": "".join(tokens)}}],
+                            "usage": usage})
+            return
+        self.start_chunked("text/event-stream")
+        for token in tokens:
+            self.pace()
+            delta = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            self.write_chunk(f"data: {json.dumps(delta)}\n\n")
+        if body.get("stream_options", {}).get("include_usage"):
+            final = {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+            self.write_chunk(f"data: {json.dumps(final)}\n\n")
+        self.write_chunk("data: [DONE]\n\n")
+        self.end_chunked()
+
+    def anthropic(self, body: dict, tokens: list):
+        prompt = [body.get("system"), body.get("messages")]
+        usage = {"input_tokens": len(json.dumps(prompt)) // 4, "output_tokens": len(tokens),
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        message = {"id": "bench", "type": "message", "role": "assistant", "model": body.get("model", "bench"),
+                   "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage}
+        if not body.get("stream"):
+            for _ in tokens:
+                self.pace()
+            self.send_json({**message, "content": [{"type": "text", "text": "".join(tokens)}],
+                            "stop_reason": "end_turn"})
+            return
+
+        def event(name, data):
+            self.write_chunk(f"event: {name}\ndata: {json.dumps({'type': name, **data})}\n\n")
+
+        self.start_chunked("text/event-stream")
+        event("message_start", {"message": message})
+        event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+        for token in tokens:
+            self.pace()
+            event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": token}})
+        event("content_block_stop", {"index": 0})
+        event("message_delta", {"delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                "usage": {"output_tokens": len(tokens)}})
+        event("message_stop", {})
+        self.end_chunked()
+
+
+def start_llm_server(latency: float, token_rate: float, tokens: int) -> ThreadingHTTPServer:
+    """Start the fake LLM server on a free local port (daemon thread)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeLLMHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_rate = token_rate
+    server.answer_tokens = tokens
+    server.requests = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeSnippet:
+    def __init__(self, text: str, start: float):
+        self.text = text
+        self.start = start
+        self.duration = 4.0
+
+
+class FakeTranscriptInfo:
+    language_code = "en"
+
+
+class FakeTranscriptApi:
+    """Stand-in for YouTubeTranscriptApi (list/fetch) with a fixed latency per call."""
+
+    def __init__(self, lines: list, latency: float):
+        self.lines = lines
+        self.latency = latency
+
+    def list(self, video_id: str):
+        time.sleep(self.latency)
+        return [FakeTranscriptInfo()]
+
+    def fetch(self, video_id: str, languages=None):
+        time.sleep(self.latency)
+        return [FakeSnippet(line, i * 4.0) for i, line in enumerate(self.lines)]
+
+
+class FakeYouTubeAdapter(requests.adapters.BaseAdapter):
+    """Answers the watch page request for the video title without network."""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        time.sleep(self.latency)
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.encoding = "utf-8"
+        response._content = b"<html><head><title>Benchmark video - YouTube</title></head></html>"
+        return response
+
+    def close(self):
+        pass
+
+
+def install_stand_ins(args, work_dir: Path) -> ThreadingHTTPServer:
+    """Point the tool at the stand-ins and at a temporary output/cache directory."""
+    server = start_llm_server(args.llm_latency, args.token_rate, args.answer_tokens)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    ys.OLLAMA_URL = url
+    os.environ["OPENAI_BASE_URL"] = f"{url}/v1"
+    os.environ["ANTHROPIC_BASE_URL"] = url
+
+    ys.OUTPUT_DIR = work_dir
+    ys.TRANSCRIPT_CACHE = ys.DiskCache(work_dir / ".cache" / "transcripts", ys.TRANSCRIPT_CACHE_MAX_BYTES,
+                                       ys.TRANSCRIPT_CACHE_TTL)
+    ys.SUMMARY_CACHE = ys.DiskCache(work_dir / ".cache" / "summaries", ys.SUMMARY_CACHE_MAX_BYTES,
+                                    ys.SUMMARY_CACHE_TTL)
+    ys.LIBRARY = ys.Library(work_dir / ".bibliotheek.sqlite3")
+
+    # Via de client registry: de tool gebruikt gewoon zijn gedeelde clients
+    session = requests.Session()
+    session.mount("https://www.youtube.com/", FakeYouTubeAdapter(args.youtube_latency))
+    ys._clients[("http", "youtube")] = session
+    ys._clients[("youtube_transcript_api",)] = FakeTranscriptApi(make_transcript(args.transcript_words, args.seed),
+                                                                  args.youtube_latency)
+    return server
+
+
+class TokenTimer:
+    """on_token callback that records the time to the first token and the token count."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first = None
+        self.tokens = 0
+
+    def __call__(self, token: str):
+        if self.first is None:
+            self.first = time.perf_counter() - self.start
+        self.tokens += 1
+
+
+def video_url(n: int) -> str:
+    return f"https://youtu.be/bench{n:06d}"
+
+
+def scenarios(args) -> dict:
+    """Benchmark scenarios: name -> function(run_number) returning extra metrics (or None)."""
+    provider = args.provider
+    model = args.model
+    api_key = None if provider == "ollama" else API_KEY
+    transcript = "\n".join(make_transcript(args.transcript_words, args.seed))
+    counter = iter(range(1, 10 ** 9))
+
+    def transcript_cold(run):
+        ys.get_transcript(f"bench{next(counter):06d}", use_cache=False)
+
+    def transcript_warm(run):
+        ys.get_transcript("bench000000")
+
+    def summary(run):
+        timer = TokenTimer()
+        ys.summarize(transcript, provider, api_key, model, on_token=timer)
+        return {"ttft_s": timer.first, "tokens": timer.tokens}
+
+    def video_cold(run):
+        timer = TokenTimer()
+        ys.process_video(video_url(next(counter)), provider, api_key, model, use_cache=False, on_token=timer)
+        return {"ttft_s": timer.first}
+
+    def video_warm(run):
+        ys.process_video(video_url(0), provider, api_key, model)
+
+    def chat(run):
+        history = ys.ChatHistory(provider, model)
+        turns = []
+        for question in ("Wat is de kern van de video?", "Welke tools worden genoemd?", "En de voorspellingen?"):
+            timer = TokenTimer()
+            answer = ys.chat_with_transcript(transcript, question, history, provider, api_key, model, on_token=timer)
+            turns.append(time.perf_counter() - timer.start)
+            history.add(question, answer)
+        return {"turn_s": [round(t, 4) for t in turns]}
+
+    def chat_retrieval(run):
+        index = ys.TranscriptIndex(transcript)
+        ys.chat_with_transcript(transcript, "Welke database wordt gebruikt?", [], provider, api_key, model,
+                                index=index)
+        return {"passages": len(index.passages)}
+
+    def batch(run):
+        start = next(counter) * 1000
+        urls = [video_url(start + i) for i in range(args.batch_size)]
+        results = ys.process_batch(urls, provider, api_key, model, use_cache=False)
+        failed = [r for r in results if r["status"] != "ok"]
+        if failed:
+            raise Exception(failed[0]["error"])
+        return {"videos": len(urls)}
+
+    return {
+        "transcript_cold": transcript_cold,
+        "transcript_warm": transcript_warm,
+        "summary": summary,
+        "process_video_cold": video_cold,
+        "process_video_warm": video_warm,
+        "chat_3_turns": chat,
+        "chat_retrieval": chat_retrieval,
+        "batch": batch,
+    }
+
+
+def run_scenario(fn, repeat: int, warmup: int) -> dict:
+    """
+    Time fn over `repeat` runs after `warmup` discarded runs, then one extra
+    run under tracemalloc for the peak Python memory (not part of the timing).
+    """
+    for run in range(warmup):
+        fn(-1 - run)
+
+    times = []
+    extra = {}
+    for run in range(repeat):
+        start = time.perf_counter()
+        metrics = fn(run)
+        times.append(time.perf_counter() - start)
+        for key, value in (metrics or {}).items():
+            extra.setdefault(key, []).append(value)
+
+    tracemalloc.start()
+    try:
+        fn(repeat)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "max_s": max(times),
+        "peak_mb": peak / (1024 * 1024),
+    }
+    for key, values in extra.items():
+        if all(isinstance(v, (int, float)) for v in values):
+            result[key] = statistics.median(values)
+        else:
+            result[key] = values[-1]
+    return result
+
+
+def max_rss_mb() -> float:
+    """Peak resident memory of this process (None where resource isn't available)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+STARTUP_MODULES = ("youtube_samenvatting", "gui_app")
+
+
+def import_times(module: str) -> dict:
+    """
+    Import module in a fresh interpreter with -X importtime.
+    Returns {imported module: cumulative microseconds}.
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=Path(__file__).parent)
+    if completed.returncode != 0:
+        raise Exception(completed.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def first_frame_seconds(command: list) -> float:
+    """Wall time until the GUI has drawn its first window and exited (startup probe)."""
+    from gui_app import STARTUP_PROBE_ENV
+    env = {**os.environ, STARTUP_PROBE_ENV: "1"}
+    start = time.perf_counter()
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, timeout=120)
+    if completed.returncode != 0:
+        raise Exception((completed.stderr.strip().splitlines() or ["onbekende fout"])[-1])
+    return time.perf_counter() - start
+
+
+def startup_benchmark(args) -> dict:
+    """Import time of the modules and time to the first window (median of --repeat runs)."""
+    results = {}
+    for module in STARTUP_MODULES:
+        runs = [import_times(module) for _ in range(args.repeat)]
+        total = statistics.median(run[module] for run in runs) / 1e6
+        slowest = sorted(((us, name) for name, us in runs[-1].items() if name != module), reverse=True)[:8]
+        results[f"import_{module}"] = {"median_s": total, "min_s": min(run[module] for run in runs) / 1e6,
+                                       "max_s": max(run[module] for run in runs) / 1e6,
+                                       "slowest": [f"{name} {us / 1000:.0f}ms" for us, name in slowest]}
+
+    commands = {"first_frame_script": [sys.executable, str(Path(__file__).parent / "gui_app.py")]}
+    if args.app:
+        commands["first_frame_app"] = [args.app]
+    for name, command in commands.items():
+        try:
+            runs = [first_frame_seconds(command) for _ in range(args.repeat)]
+        except Exception as e:
+            print(f"{name}: overgeslagen ({e})")
+            continue
+        results[name] = {"median_s": statistics.median(runs), "min_s": min(runs), "max_s": max(runs)}
+    return results
+
+
+def print_startup_results(results: dict):
+    print(f"{'Meting':<34} {'mediaan':>9} {'min':>9} {'max':>9}")
+    print("-" * 64)
+    for name, result in results.items():
+        print(f"{name:<34} {result['median_s']:>8.3f}s {result['min_s']:>8.3f}s {result['max_s']:>8.3f}s")
+        if result.get("slowest"):
+            print(f"  traagste imports: {', '.join(result['slowest'])}")
+
+
+def print_results(results: dict, args):
+    print(f"{'Scenario':<22} {'mediaan':>9} {'min':>9} {'max':>9} {'piek MB':>8}  extra")
+    print("-" * 78)
+    for name, result in results.items():
+        extra = []
+        if result.get("ttft_s") is not None:
+            extra.append(f"eerste token {result['ttft_s']:.3f}s")
+        if "tokens" in result and result["median_s"]:
+            extra.append(f"{result['tokens'] / result['median_s']:.0f} tokens/s")
+        if "videos" in result and result["median_s"]:
+            extra.append(f"{result['videos'] / result['median_s']:.2f} video's/s")
+        if "turn_s" in result:
+            extra.append("beurten " + " / ".join(f"{t:.3f}s" for t in result["turn_s"]))
+        if "passages" in result:
+            extra.append(f"{result['passages']} passages")
+        print(f"{name:<22} {result['median_s']:>8.3f}s {result['min_s']:>8.3f}s {result['max_s']:>8.3f}s "
+              f"{result['peak_mb']:>8.1f}  {', '.join(extra)}")
+
+
+def compare(results: dict, baseline_path: str, tolerance: float, min_delta: float) -> list:
+    """Scenarios whose median is more than `tolerance` (and min_delta seconds) slower than the baseline."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        delta = result["median_s"] - old["median_s"]
+        if delta > min_delta and result["median_s"] > old["median_s"] * (1 + tolerance):
+            regressions.append(f"{name}: {old['median_s']:.3f}s -> {result['median_s']:.3f}s "
+                               f"(+{delta / old['median_s']:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark met lokale stand-ins voor alle diensten.")
+    parser.add_argument("-p", "--provider", choices=["ollama", "openai", "anthropic"], default="ollama")
+    parser.add_argument("-m", "--model", help="Model (alleen Ollama, standaard gpt-oss:20b)")
+    parser.add_argument("-s", "--scenario", action="append",
+                        help="Alleen dit scenario (meerdere keren mogelijk)")
+    parser.add_argument("--transcript-words", type=int, default=8000, help="Lengte van de transcriptie in woorden")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconden tot het eerste token")
+    parser.add_argument("--token-rate", type=float, default=2000, help="Tokens per seconde (0 = onbeperkt)")
+    parser.add_argument("--answer-tokens", type=int, default=200, help="Tokens per LLM antwoord")
+    parser.add_argument("--youtube-latency", type=float, default=0.02, help="Seconden per YouTube verzoek")
+    parser.add_argument("--batch-size", type=int, default=8, help="Aantal video's in het batch scenario")
+    parser.add_argument("--repeat", type=int, default=3, help="Gemeten runs per scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="Niet gemeten runs per scenario")
+    parser.add_argument("--seed", type=int, default=42, help="Zaadje voor de transcriptie")
+    parser.add_argument("--startup", action="store_true",
+                        help="Meet alleen de opstarttijd (imports en eerste venster)")
+    parser.add_argument("--app", help="Met --startup: pad naar het programma in de .app bundle van build_app.py")
+    parser.add_argument("--json", help="Schrijf de resultaten naar dit JSON bestand")
+    parser.add_argument("--compare", help="Vergelijk met een eerder --json bestand")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Toegestane vertraging t.o.v. --compare (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.02,
+                        help="Kleinere verschillen (seconden) tellen nooit als regressie")
+    args = parser.parse_args()
+
+    if args.startup:
+        print(f"Startup benchmark: {args.repeat}x")
+        print()
+        results = startup_benchmark(args)
+        print_startup_results(results)
+        rss = None
+    else:
+        available = scenarios(args)
+        selected = args.scenario or list(available)
+        unknown = [name for name in selected if name not in available]
+        if unknown:
+            parser.error(f"Onbekend scenario: {', '.join(unknown)} (kies uit {', '.join(available)})")
+
+        work_dir = Path(tempfile.mkdtemp(prefix="yt_benchmark_"))
+        server = install_stand_ins(args, work_dir)
+        # Cache vullen voor de warme scenario's
+        ys.process_video(video_url(0), args.provider, None if args.provider == "ollama" else API_KEY, args.model)
+
+        print(f"Benchmark: {args.provider}, {args.transcript_words} woorden, {args.repeat}x "
+              f"(latency {args.llm_latency}s, {args.token_rate:g} tokens/s, {args.answer_tokens} tokens per antwoord)")
+        print()
+
+        results = {}
+        for name in selected:
+            results[name] = run_scenario(available[name], args.repeat, args.warmup)
+        server.shutdown()
+
+        print_results(results, args)
+        rss = max_rss_mb()
+        print()
+        print(f"LLM verzoeken: {server.requests}" + (f", piek RSS: {rss:.0f} MB" if rss else ""))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "python": platform.python_version(),
+                       "results": results, "max_rss_mb": rss}, f, indent=2)
+        print(f"Resultaten opgeslagen in {args.json}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance, args.min_delta)
+        if regressions:
+            print("\nREGRESSIES:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("Geen regressies t.o.v. de baseline.")
+
+
+if __name__ == "__main__":
+    main()
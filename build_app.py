@@ -36,7 +36,9 @@ def main():
         "--clean",  # Clean build
         "--noconfirm",  # Overschrijf zonder vragen
         # Hidden imports die PyInstaller mogelijk mist
+        # youtube_samenvatting importeert deze pas bij eerste gebruik (snelle start)
         "--hidden-import", "youtube_transcript_api",
+        "--hidden-import", "docx",
         "--hidden-import", "openai",
         "--hidden-import", "anthropic",
         "--hidden-import", "requests",
@@ -73,6 +75,8 @@ def main():
         print(f"  cp -r 'dist/{APP_NAME}.app' ~/Desktop/")
         print("\nOf open de dist map:")
         print(f"  open dist/")
+        print("\nOpstarttijd meten:")
+        print(f"  python benchmark.py --startup --app 'dist/{APP_NAME}.app/Contents/MacOS/{APP_NAME}'")
     else:
         print("\nBuild gefaald!")
         sys.exit(1)
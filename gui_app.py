@@ -5,9 +5,12 @@ Een Mac desktop app voor het maken van samenvattingen van YouTube videos.
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import logging
 import threading
 import subprocess
+import time
 import os
+import webbrowser
 from pathlib import Path
 
 # Load .env file first
@@ -20,9 +23,66 @@ except ImportError:
     pass
 
 from youtube_samenvatting import (
-    process_video, load_config, save_config, OUTPUT_DIR, chat_with_transcript
+    JobQueue, read_urls, load_config, save_config, OUTPUT_DIR, chat_with_transcript, TranscriptIndex,
+    chat_with_library, format_sources, LIBRARY,
+    ChatHistory, get_summarize_fn, limit_summarize_fn, warm_anthropic_cache, ANTHROPIC_CACHE_WARM_SECONDS, ANTHROPIC_CACHE_WARM_MAX_IDLE,
+    chat_uses_retrieval,
+    preload_dependencies, parse_timestamp, timestamp_url
 )
-from docx import Document
+
+# Verversen van de verstreken tijd in de wachtrij
+JOB_TICK_MS = 1000
+# Tijdstempels als [12:34] of [1:02:03] in samenvatting en chat (Tcl regexp)
+TIMESTAMP_REGEXP = r"\[[0-9]{1,2}(:[0-9]{2}){1,2}\]"
+
+# Met deze variabele sluit de app direct na het eerste getekende venster (startup benchmark)
+STARTUP_PROBE_ENV = "YT_SAMENVATTING_STARTUP_PROBE"
+
+
+class TokenStream:
+    """
+    Collects streamed tokens from a worker thread and writes them to the UI
+    in batches via root.after, so the Tk loop isn't flooded with updates.
+    """
+    FLUSH_MS = 50
+
+    def __init__(self, root, write):
+        self.root = root
+        self.write = write  # Wordt op de main thread aangeroepen met een stuk tekst
+        self.started = False
+        self._parts = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self._closed = False
+
+    def push(self, token):
+        """Add a token (called from the worker thread)."""
+        with self._lock:
+            if self._closed:
+                return
+            self._parts.append(token)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.root.after(self.FLUSH_MS, self.flush)
+
+    def flush(self):
+        """Write the buffered tokens to the UI (runs on main thread)."""
+        with self._lock:
+            text = "".join(self._parts)
+            self._parts = []
+            self._scheduled = False
+            if self._closed:
+                return
+        if text:
+            self.write(text)
+            self.started = True
+
+    def close(self):
+        """Stop writing; tokens that are still buffered are dropped (runs on main thread)."""
+        with self._lock:
+            self._closed = True
+            self._parts = []
 
 
 class YouTubeSamenvattingApp:
@@ -36,18 +96,41 @@ class YouTubeSamenvattingApp:
     def __init__(self, root):
         self.root = root
         self.root.title("YouTube Samenvatting")
-        self.root.geometry("700x700")
+        self.root.geometry("700x820")
         self.root.configure(bg=self.BG_COLOR)
 
         # Load saved config
         self.config = load_config()
 
         # Chat state - bewaar provider/model/key van samenvatting voor chat
-        self.current_transcript = None
+        self.current_transcript = None  # Met [m:ss] markeringen
+        self.current_video_id = None    # Video van de chat, voor klikbare tijdstempels
+        self.result_video_id = None     # Video in het resultaatvenster
         self.current_provider = None
         self.current_model = None
         self.current_api_key = None
-        self.chat_history = []
+        self.chat_history = None      # ChatHistory van de huidige video
+        self.transcript_index = None  # Retrieval index van current_transcript
+
+        # Token telling van de chat sessie (o.a. Anthropic cache) en keep-warm timer
+        self.chat_usage = {}
+        self.last_chat_time = 0.0
+        self.cache_warm_job = None
+
+        # Streaming van tokens naar resultaat- en chatvenster
+        self.summary_stream = None
+        self.chat_stream = None
+
+        # Wachtrij: vaste worker pool, apart voor Ollama en de cloud providers.
+        # Het resultaatvenster volgt één taak tegelijk (stream_job).
+        self.jobs = JobQueue(
+            on_change=lambda job: self.root.after(0, lambda: self.job_changed(job)),
+            on_token=self.job_token
+        )
+        self.stream_job = None
+        self.unfollowed = set()  # Id's van taken die het resultaatvenster niet (meer) volgt
+        self.stream_lock = threading.Lock()
+        self.job_tick = None
 
         # Main container
         container = tk.Frame(root, bg=self.BG_COLOR, padx=20, pady=20)
@@ -213,6 +296,51 @@ class YouTubeSamenvattingApp:
         )
         open_folder_btn.pack(side=tk.LEFT, padx=5)
 
+        # Queue Section
+        queue_label = tk.Label(container, text="Wachtrij", font=("Helvetica", 12, "bold"),
+                               bg=self.BG_COLOR, fg=self.TEXT_LIGHT, anchor="w")
+        queue_label.pack(fill=tk.X, pady=(5, 2))
+
+        queue_frame = tk.Frame(container, bg=self.BG_COLOR)
+        queue_frame.pack(fill=tk.X, pady=(0, 5))
+
+        columns = ("video", "model", "status", "tijd")
+        self.job_list = ttk.Treeview(queue_frame, columns=columns, show="headings", height=4,
+                                     selectmode="browse")
+        for column, text, width in (("video", "Video", 330), ("model", "Taalmodel", 140),
+                                    ("status", "Status", 80), ("tijd", "Tijd", 60)):
+            self.job_list.heading(column, text=text)
+            self.job_list.column(column, width=width, stretch=(column == "video"))
+        self.job_list.pack(fill=tk.X, expand=True, side=tk.LEFT)
+        self.job_list.bind('<Double-1>', lambda e: self.show_selected_job())
+
+        queue_scrollbar = tk.Scrollbar(queue_frame, command=self.job_list.yview)
+        queue_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.job_list.configure(yscrollcommand=queue_scrollbar.set)
+
+        queue_btn_frame = tk.Frame(container, bg=self.BG_COLOR)
+        queue_btn_frame.pack(fill=tk.X, pady=(0, 5))
+
+        retry_btn = tk.Button(
+            queue_btn_frame,
+            text="Opnieuw proberen",
+            command=self.retry_selected_job,
+            font=("Helvetica", 11),
+            fg=self.TEXT_COLOR,
+            highlightbackground=self.BG_COLOR
+        )
+        retry_btn.pack(side=tk.LEFT)
+
+        show_btn = tk.Button(
+            queue_btn_frame,
+            text="Toon resultaat",
+            command=self.show_selected_job,
+            font=("Helvetica", 11),
+            fg=self.TEXT_COLOR,
+            highlightbackground=self.BG_COLOR
+        )
+        show_btn.pack(side=tk.LEFT, padx=(5, 0))
+
         # Result Section
         result_label = tk.Label(container, text="Resultaat", font=("Helvetica", 12, "bold"),
                                bg=self.BG_COLOR, fg=self.TEXT_LIGHT, anchor="w")
@@ -221,12 +349,13 @@ class YouTubeSamenvattingApp:
         result_frame = tk.Frame(container, bg=self.BG_COLOR)
         result_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 5))
 
-        self.result_text = tk.Text(result_frame, height=8, wrap=tk.WORD, font=("Helvetica", 11), bg="#faf8f5")
+        self.result_text = tk.Text(result_frame, height=6, wrap=tk.WORD, font=("Helvetica", 11), bg="#faf8f5")
         self.result_text.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
 
         scrollbar = tk.Scrollbar(result_frame, command=self.result_text.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.result_text.configure(yscrollcommand=scrollbar.set)
+        self.configure_timestamp_links(self.result_text, lambda: self.result_video_id)
 
         # Output folder info
         folder_label = tk.Label(
@@ -281,6 +410,8 @@ class YouTubeSamenvattingApp:
         self.chat_display.tag_configure("user", foreground="#6b5344", font=("Helvetica", 11, "bold"))
         self.chat_display.tag_configure("assistant", foreground="#3d3530")
         self.chat_display.tag_configure("label", foreground="#8a7a6a", font=("Helvetica", 10))
+        self.configure_timestamp_links(
+            self.chat_display, lambda: None if self.library_var.get() else self.current_video_id)
 
         # Input frame
         input_frame = tk.Frame(container, bg=self.BG_COLOR)
@@ -315,6 +446,35 @@ class YouTubeSamenvattingApp:
         )
         clear_btn.pack(side=tk.LEFT, padx=(10, 0))
 
+        # Retrieval: alleen relevante passages meesturen in plaats van het hele transcript
+        self.retrieval_var = tk.BooleanVar(value=True)
+        retrieval_check = tk.Checkbutton(
+            container,
+            text="Alleen relevante passages meesturen (sneller bij lange video's)",
+            variable=self.retrieval_var,
+            bg=self.BG_COLOR,
+            fg=self.TEXT_LIGHT,
+            activebackground=self.BG_COLOR,
+            highlightthickness=0,
+            anchor="w"
+        )
+        retrieval_check.pack(fill=tk.X)
+
+        # Bibliotheek: vragen over alle verwerkte video's in plaats van de huidige
+        self.library_var = tk.BooleanVar(value=False)
+        library_check = tk.Checkbutton(
+            container,
+            text="Vraag over alle video's in de bibliotheek (antwoord met bronnen)",
+            variable=self.library_var,
+            command=self.clear_chat,
+            bg=self.BG_COLOR,
+            fg=self.TEXT_LIGHT,
+            activebackground=self.BG_COLOR,
+            highlightthickness=0,
+            anchor="w"
+        )
+        library_check.pack(fill=tk.X)
+
         # Chat status
         self.chat_status_var = tk.StringVar(value="")
         chat_status_label = tk.Label(
@@ -340,15 +500,26 @@ class YouTubeSamenvattingApp:
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         subprocess.run(['open', str(OUTPUT_DIR)])
 
-    def update_status(self, message):
-        self.root.after(0, lambda: self.status_var.set(message))
-
     def start_processing(self):
-        url = self.url_var.get().strip()
-        if not url:
+        """Add the URL(s) in the entry to the queue; work that is running continues."""
+        urls = read_urls([self.url_var.get()])
+        if not urls:
             messagebox.showwarning("Geen URL", "Voer een YouTube URL in.")
             return
 
+        selected = self.selected_provider()
+        if not selected:
+            return
+        provider, model, api_key = selected
+
+        for url in urls:
+            self.jobs.submit(url, provider, api_key, model)
+        self.url_var.set("")
+        waiting = self.jobs.pending()
+        self.status_var.set(f"{len(urls)} video('s) toegevoegd - {waiting} in de wachtrij")
+
+    def selected_provider(self):
+        """(provider, model, api_key) of the selected language model, or None without API key."""
         provider = self.provider_var.get()
 
         # Handle ollama variants
@@ -364,73 +535,158 @@ class YouTubeSamenvattingApp:
             api_key = self.openai_key_var.get()
             if not api_key:
                 messagebox.showwarning("API Key", "OpenAI API key is vereist.")
-                return
+                return None
         elif provider == "anthropic":
             api_key = self.anthropic_key_var.get()
             if not api_key:
                 messagebox.showwarning("API Key", "Anthropic API key is vereist.")
+                return None
+        return provider, model, api_key
+
+    def job_token(self, job, token):
+        """Route a streamed summary token (worker thread); the first streaming job is followed."""
+        with self.stream_lock:
+            if self.stream_job is None and job.id not in self.unfollowed:
+                self.stream_job = job
+                self.summary_stream = TokenStream(self.root, self.append_summary_text)
+                self.root.after(0, self.show_stream_start)
+            if self.stream_job is not job:
                 return
+            stream = self.summary_stream
+        stream.push(token)
 
-        # Bewaar provider/model/key VOOR thread start (voor chat later)
-        self.current_provider = provider
-        self.current_model = model
-        self.current_api_key = api_key
-
-        self.process_btn.configure(state="disabled")
+    def show_stream_start(self):
+        """Clear the result pane for a newly followed job (runs on main thread)."""
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, "Bezig met verwerken...\n")
 
-        thread = threading.Thread(
-            target=self.process_video_thread,
-            args=(url, provider, api_key, model)
-        )
-        thread.daemon = True
-        thread.start()
-
-    def process_video_thread(self, url, provider, api_key, model=None):
-        try:
-            transcript_path, summary_path = process_video(
-                url, provider, api_key, model=model,
-                progress_callback=self.update_status
-            )
-
-            # Read Word document content for display
-            doc = Document(summary_path)
-            summary_content = '\n'.join([para.text for para in doc.paragraphs])
-
-            self.root.after(0, lambda: self.processing_complete(
-                transcript_path, summary_path, summary_content
-            ))
-
-        except Exception as e:
-            error_msg = str(e)
-            self.root.after(0, lambda msg=error_msg: self.processing_error(msg))
-
-    def processing_complete(self, transcript_path, summary_path, summary_content):
-        self.process_btn.configure(state="normal")
-        self.status_var.set("Klaar!")
+    def release_stream(self, job):
+        """Stop following job; returns True when it was the followed job (runs on main thread)."""
+        with self.stream_lock:
+            if self.stream_job is not job:
+                return False
+            self.summary_stream.close()
+            self.stream_job = None
+            self.unfollowed.add(job.id)
+            return True
+
+    def job_changed(self, job):
+        """Update the queue row of a job and handle finished jobs (runs on main thread)."""
+        iid = str(job.id)
+        model = job.model or job.provider
+        values = (job.label, model, job.status, f"{job.elapsed:.0f}s" if job.started else "")
+        if self.job_list.exists(iid):
+            self.job_list.item(iid, values=values)
+        else:
+            self.job_list.insert("", tk.END, iid=iid, values=values)
+
+        if job.status == "bezig" and job.message:
+            self.status_var.set(f"{job.label[:40]}: {job.message}")
+        elif job.status == "klaar":
+            # Alleen tonen als het resultaatvenster niet al een andere taak volgt; de chat
+            # wisselt alleen van video als er nog geen chat is (anders via "Toon resultaat")
+            followed = self.release_stream(job)
+            if followed or self.stream_job is None:
+                self.processing_complete(job, use_for_chat=not self.chat_in_use())
+            elif not self.chat_in_use():
+                self.use_for_chat(job)
+        elif job.status == "fout":
+            followed = self.release_stream(job)
+            self.processing_error(job, show=followed or self.stream_job is None)
+
+        if job.status == "bezig" and not self.job_tick:
+            self.job_tick = self.root.after(JOB_TICK_MS, self.tick_jobs)
+
+    def tick_jobs(self):
+        """Refresh the elapsed time of running jobs once a second."""
+        self.job_tick = None
+        running = [job for job in self.jobs.jobs.values() if job.status == "bezig"]
+        for job in running:
+            self.job_list.set(str(job.id), "tijd", f"{job.elapsed:.0f}s")
+        if running:
+            self.job_tick = self.root.after(JOB_TICK_MS, self.tick_jobs)
+
+    def selected_job(self):
+        selection = self.job_list.selection()
+        return self.jobs.get(int(selection[0])) if selection else None
+
+    def retry_selected_job(self):
+        job = self.selected_job()
+        if not job or job.status != "fout":
+            messagebox.showinfo("Opnieuw proberen", "Selecteer een mislukte video in de wachtrij.")
+            return
+        with self.stream_lock:
+            self.unfollowed.discard(job.id)
+        self.jobs.retry(job.id)
+
+    def show_selected_job(self):
+        job = self.selected_job()
+        if job and job.status in ("klaar", "fout") and self.stream_job:
+            self.release_stream(self.stream_job)  # Gekozen resultaat niet laten overschrijven
+        if job and job.status == "klaar":
+            self.processing_complete(job)
+        elif job and job.status == "fout":
+            self.processing_error(job)
+
+    def append_summary_text(self, text):
+        """Append streamed summary text to the result pane (runs on main thread)."""
+        if not self.summary_stream.started:
+            self.result_text.delete(1.0, tk.END)
+        self.result_text.insert(tk.END, text)
+        self.result_text.see(tk.END)
+
+    def processing_complete(self, job, use_for_chat=True):
+        """Show the result of a finished job, and with use_for_chat chat about it (runs on main thread)."""
+        result = job.result
+        self.status_var.set(f"Klaar: {job.label[:50]}")
 
         self.result_text.delete(1.0, tk.END)
         self.result_text.insert(tk.END, f"BESTANDEN OPGESLAGEN:\n\n")
-        self.result_text.insert(tk.END, f"Transcriptie:\n{transcript_path}\n\n")
-        self.result_text.insert(tk.END, f"Samenvatting:\n{summary_path}\n\n")
+        self.result_text.insert(tk.END, f"Transcriptie:\n{result.transcript_path}\n\n")
+        self.result_text.insert(tk.END, f"Samenvatting:\n{result.summary_path}\n\n")
         self.result_text.insert(tk.END, "-" * 40 + "\n\n")
-        self.result_text.insert(tk.END, summary_content)
-
-        self.url_var.set("")
-
-        # Load transcript for chat and enable chat tab
+        self.result_text.insert(tk.END, result.summary)
+        self.result_video_id = result.video_id
+        self.tag_timestamps(self.result_text)
+
+        if use_for_chat:
+            self.use_for_chat(job)
+        elif result.timed_transcript() is not self.current_transcript:
+            self.chat_status_var.set("Chat gaat nog over de vorige video - kies \"Toon resultaat\" om te wisselen")
+
+    def chat_in_use(self):
+        """True when the chat tab has a video or a library conversation that a new result shouldn't replace."""
+        history = self.chat_history
+        return self.current_transcript is not None or bool(history and (history.messages or history.summary))
+
+    def use_for_chat(self, job):
+        """Make a finished job the video of the chat tab; clears the chat of another video (main thread)."""
+        result = job.result
+        if result.timed_transcript() is self.current_transcript:
+            return  # Chat over deze video loopt al
+
+        # Chat gebruikt provider/model/key van deze samenvatting
+        self.current_provider = job.provider
+        self.current_model = job.model
+        self.current_api_key = job.api_key
+
+        # Transcript voor chat komt direct uit het resultaat (geen bestand teruglezen),
+        # met tijdmarkeringen zodat antwoorden naar plekken in de video verwijzen
         try:
-            with open(transcript_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # Skip the header (first lines until the separator)
-                if "=" * 50 in content:
-                    self.current_transcript = content.split("=" * 50, 1)[1].strip()
-                else:
-                    self.current_transcript = content
-
-            # Clear previous chat and enable chat tab
-            self.chat_history = []
+            self.current_transcript = result.timed_transcript()
+            self.current_video_id = result.video_id
+
+            # Retrieval index alvast op de achtergrond bouwen
+            self.transcript_index = None
+            threading.Thread(
+                target=self.build_transcript_index,
+                args=(self.current_transcript,),
+                daemon=True
+            ).start()
+
+            # Clear previous chat and enable chat tab (over deze video)
+            self.chat_usage = {}
+            self.library_var.set(False)
             self.clear_chat()
             self.chat_enabled = True
             self.chat_btn.configure(state="normal", fg=self.TEXT_COLOR)
@@ -438,11 +694,67 @@ class YouTubeSamenvattingApp:
         except Exception as e:
             self.chat_status_var.set(f"Chat niet beschikbaar: {e}")
 
-    def processing_error(self, error_message):
-        self.process_btn.configure(state="normal")
-        self.status_var.set("Fout opgetreden")
-        self.result_text.delete(1.0, tk.END)
-        self.result_text.insert(tk.END, f"FOUT: {error_message}")
+    def configure_timestamp_links(self, widget, get_video_id):
+        """Make [m:ss] timestamps tagged in widget open the video at that point; get_video_id() gives the video."""
+        widget.tag_configure("timestamp", foreground="#2a6db0", underline=True)
+        widget.tag_bind("timestamp", "<Enter>", lambda e: widget.configure(cursor="hand2"))
+        widget.tag_bind("timestamp", "<Leave>", lambda e: widget.configure(cursor=""))
+        widget.tag_bind("timestamp", "<Button-1>", lambda e: self.open_timestamp(e, get_video_id()))
+
+    def tag_timestamps(self, widget, start="1.0"):
+        """Tag the [m:ss] timestamps in widget from start as links."""
+        count = tk.IntVar()
+        index = start
+        while True:
+            index = widget.search(TIMESTAMP_REGEXP, index, tk.END, regexp=True, count=count)
+            if not index:
+                break
+            end = f"{index}+{count.get()}c"
+            widget.tag_add("timestamp", index, end)
+            index = end
+
+    def open_timestamp(self, event, video_id):
+        """Open the video in the browser at the clicked timestamp."""
+        if not video_id:
+            return
+        widget = event.widget
+        clicked = widget.index(f"@{event.x},{event.y}")
+        link = widget.tag_prevrange("timestamp", f"{clicked}+1c")
+        if link:
+            seconds = parse_timestamp(widget.get(*link).strip("[]"))
+            webbrowser.open(timestamp_url(video_id, seconds))
+
+    def check_library(self):
+        """Enable the chat tab for library questions when earlier videos exist (background thread)."""
+        try:
+            count = len(LIBRARY)
+        except Exception:
+            logging.warning("Bibliotheek niet beschikbaar", exc_info=True)
+            return
+        if count:
+            self.root.after(0, lambda: self.enable_library_chat(count))
+
+    def enable_library_chat(self, count):
+        if self.chat_enabled:
+            return
+        self.chat_enabled = True
+        self.chat_btn.configure(state="normal", fg=self.TEXT_COLOR)
+        self.library_var.set(True)
+        self.chat_status_var.set(f"Stel vragen over {count} video's in de bibliotheek")
+
+    def build_transcript_index(self, transcript):
+        """Build and return the retrieval index for a transcript (background thread)."""
+        index = TranscriptIndex(transcript)
+        if transcript is self.current_transcript:
+            self.transcript_index = index
+        return index
+
+    def processing_error(self, job, show=True):
+        """Report a failed job; show puts the error in the result pane (runs on main thread)."""
+        self.status_var.set(f"Fout bij {job.label[:40]} - selecteer en probeer opnieuw")
+        if show:
+            self.result_text.delete(1.0, tk.END)
+            self.result_text.insert(tk.END, f"FOUT: {job.error}")
 
     def send_chat_message(self):
         """Send a chat message and get response."""
@@ -450,7 +762,15 @@ class YouTubeSamenvattingApp:
         if not question:
             return
 
-        if not self.current_transcript:
+        use_library = self.library_var.get()
+        if use_library and not self.current_provider:
+            # Nog geen video in deze sessie: chat met het gekozen taalmodel
+            selected = self.selected_provider()
+            if not selected:
+                return
+            self.current_provider, self.current_model, self.current_api_key = selected
+            self.chat_history = ChatHistory(self.current_provider, self.current_model)
+        elif not use_library and not self.current_transcript:
             messagebox.showwarning("Geen transcript", "Maak eerst een samenvatting van een video.")
             return
 
@@ -468,54 +788,158 @@ class YouTubeSamenvattingApp:
         self.chat_input.configure(state="disabled")
         self.chat_status_var.set("Bezig met antwoorden...")
 
-        # Process in background thread
+        # Streamed antwoord komt na deze markering; bij afronden wordt het vervangen
+        self.chat_display.mark_set("stream_start", "end-1c")
+        self.chat_display.mark_gravity("stream_start", tk.LEFT)
+        self.chat_stream = TokenStream(self.root, self.append_chat_text)
+
+        self.last_chat_time = time.time()
+
+        # Process in background thread; het antwoord hoort bij deze geschiedenis en dit transcript,
+        # ook als de chat intussen gewist of naar een andere video gewisseld is
         thread = threading.Thread(
             target=self.chat_thread,
-            args=(question, provider, api_key, model)
+            args=(question, self.chat_history, self.current_transcript, self.transcript_index,
+                  provider, api_key, model, self.retrieval_var.get(), use_library)
         )
         thread.daemon = True
         thread.start()
 
-    def chat_thread(self, question, provider, api_key, model=None):
+    def chat_thread(self, question, history, transcript, index, provider, api_key, model=None,
+                    use_retrieval=True, use_library=False):
         """Background thread for chat processing."""
         try:
-            # Maak kopie van chat_history voor thread-safety
-            history_copy = list(self.chat_history)
+            if use_library:
+                response, sources = chat_with_library(
+                    question, history, provider, api_key, model=model,
+                    on_token=self.chat_stream.push, usage=self.chat_usage
+                )
+                self.root.after(0, lambda q=question, r=response, s=sources:
+                                self.chat_response_complete(history, api_key, q, r, s))
+                return
+
+            # Index is normaal al klaar; anders hier bouwen (niet op de UI thread)
+            if not (use_retrieval and chat_uses_retrieval(transcript, provider, model)):
+                index = None
+            elif index is None:
+                index = self.build_transcript_index(transcript)
 
             response = chat_with_transcript(
-                self.current_transcript,
+                transcript,
                 question,
-                history_copy,
+                history,  # ChatHistory is thread-safe
                 provider,
                 api_key,
-                model=model
+                model=model,
+                on_token=self.chat_stream.push,
+                index=index,
+                usage=self.chat_usage
             )
 
             # Update history en UI op main thread (thread-safe)
-            self.root.after(0, lambda q=question, r=response: self.chat_response_complete(q, r))
+            self.root.after(0, lambda q=question, r=response: self.chat_response_complete(history, api_key, q, r))
 
         except Exception as e:
             error_msg = str(e)
             self.root.after(0, lambda msg=error_msg: self.chat_response_error(msg))
 
-    def chat_response_complete(self, question, response):
-        """Handle successful chat response (runs on main thread)."""
-        # Update chat history thread-safe op main thread
-        self.chat_history.append({"role": "user", "content": question})
-        self.chat_history.append({"role": "assistant", "content": response})
+    def append_chat_text(self, text):
+        """Append streamed answer text to the chat display (runs on main thread)."""
+        self.chat_display.configure(state="normal")
+        if not self.chat_stream.started:
+            self.chat_display.insert(tk.END, "Assistent:\n", "label")
+        self.chat_display.insert(tk.END, text, "assistant")
+        self.chat_display.configure(state="disabled")
+        self.chat_display.see(tk.END)
 
-        # Beperk chat history tot laatste 50 berichten
-        if len(self.chat_history) > 50:
-            self.chat_history = self.chat_history[-50:]
+    def end_chat_stream(self):
+        """Stop streaming and remove the partial streamed answer (runs on main thread)."""
+        self.chat_stream.close()
+        if self.chat_stream.started:
+            self.chat_display.configure(state="normal")
+            self.chat_display.delete("stream_start", tk.END)
+            self.chat_display.configure(state="disabled")
+
+    def chat_response_complete(self, history, api_key, question, response, sources=None):
+        """
+        Handle successful chat response; sources are shown below a library answer (runs on main thread).
+        The answer is added to the history the question was asked in; it is only shown when that is still the chat.
+        """
+        self.end_chat_stream()
+
+        history.add(question, response)
+        self.compact_chat_history(history, api_key)
+        if history is not self.chat_history:
+            # Chat intussen gewist of gewisseld: antwoord niet in het nieuwe gesprek tonen
+            self.send_btn.configure(state="normal")
+            self.chat_input.configure(state="normal")
+            return
 
+        if sources is not None:
+            response = f"{response}\n\n{format_sources(sources) or 'Geen passages gevonden in de bibliotheek.'}"
         self.add_chat_message("assistant", response)
         self.send_btn.configure(state="normal")
         self.chat_input.configure(state="normal")
         self.chat_input.focus()
-        self.chat_status_var.set("")
+        self.chat_status_var.set(self.format_cache_usage())
+
+        if self.current_provider == "anthropic" and sources is None:
+            self.schedule_cache_warm()
+
+    def compact_chat_history(self, history, api_key):
+        """Roll older chat turns into the history summary in the background when needed."""
+        if not history.needs_compaction():
+            return
+        try:
+            summarize_fn = get_summarize_fn(history.provider, api_key, history.model)
+        except Exception:
+            return
+        # Zelfde LLM slot als de samenvattingen in de wachtrij
+        summarize_fn = limit_summarize_fn(summarize_fn, self.jobs.llm_semaphores[history.provider])
+        threading.Thread(target=history.compact, args=(summarize_fn,), daemon=True).start()
+
+    def format_cache_usage(self):
+        """Short status text with the prompt cache token counts (or Ollama prefill timing) of this chat session."""
+        usage = self.chat_usage
+        if "last_prefill_ms" in usage:
+            text = (f"Prefill: {usage['last_prefill_ms']:.0f} ms ({usage['last_prefill_tokens']} tokens), "
+                    f"eerste vraag {usage['first_prefill_ms']:.0f} ms ({usage['first_prefill_tokens']} tokens)")
+            if usage.get("last_tokens_per_second"):
+                text += f" - {usage['last_tokens_per_second']:.1f} tokens/s"
+            return text
+        read = self.chat_usage.get("cache_read_input_tokens", 0)
+        written = self.chat_usage.get("cache_creation_input_tokens", 0)
+        if not read and not written:
+            return ""
+        return f"Cache: {read} tokens gelezen, {written} tokens geschreven"
+
+    def uses_cached_transcript(self):
+        """True when chat sends the full transcript in the (cacheable) system prompt, as warm_cache does."""
+        return not (self.retrieval_var.get()
+                    and chat_uses_retrieval(self.current_transcript, self.current_provider, self.current_model))
+
+    def schedule_cache_warm(self):
+        """Keep the Anthropic prompt cache of the transcript warm between questions."""
+        if self.cache_warm_job:
+            self.root.after_cancel(self.cache_warm_job)
+        self.cache_warm_job = self.root.after(ANTHROPIC_CACHE_WARM_SECONDS * 1000, self.warm_cache)
+
+    def warm_cache(self):
+        self.cache_warm_job = None
+        idle = time.time() - self.last_chat_time
+        if (not self.chat_enabled or self.current_provider != "anthropic" or self.library_var.get()
+                or idle > ANTHROPIC_CACHE_WARM_MAX_IDLE or not self.uses_cached_transcript()):
+            return
+        threading.Thread(
+            target=warm_anthropic_cache,
+            args=(self.current_transcript, self.current_api_key, self.chat_usage),
+            daemon=True
+        ).start()
+        self.schedule_cache_warm()
 
     def chat_response_error(self, error_message):
         """Handle chat error."""
+        self.end_chat_stream()
         self.add_chat_message("assistant", f"Fout: {error_message}")
         self.send_btn.configure(state="normal")
         self.chat_input.configure(state="normal")
@@ -530,24 +954,37 @@ class YouTubeSamenvattingApp:
             self.chat_display.insert(tk.END, f"{content}\n\n", "user")
         else:
             self.chat_display.insert(tk.END, "Assistent:\n", "label")
+            start = self.chat_display.index("end-1c")
             self.chat_display.insert(tk.END, f"{content}\n\n", "assistant")
+            self.tag_timestamps(self.chat_display, start)
 
         self.chat_display.configure(state="disabled")
         self.chat_display.see(tk.END)
 
     def clear_chat(self):
         """Clear chat history and display."""
-        self.chat_history = []
+        self.chat_history = ChatHistory(self.current_provider, self.current_model)
         self.chat_display.configure(state="normal")
         self.chat_display.delete(1.0, tk.END)
         self.chat_display.configure(state="disabled")
-        if self.current_transcript:
+        if self.library_var.get():
+            self.chat_status_var.set("Vragen gaan over alle video's in de bibliotheek")
+        elif self.current_transcript:
             self.chat_status_var.set("Chat gewist - stel nieuwe vragen!")
 
 
 def main():
     root = tk.Tk()
     app = YouTubeSamenvattingApp(root)
+
+    # Eerst het venster tekenen, daarna pas de zware modules laden
+    root.update_idletasks()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        root.update()
+        root.destroy()
+        return
+    root.after(0, lambda: threading.Thread(target=preload_dependencies, daemon=True).start())
+    root.after(0, lambda: threading.Thread(target=app.check_library, daemon=True).start())
     root.mainloop()
 
 
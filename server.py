@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+YouTube Samenvatting - lokale HTTP service
+Een langlopende server rond process_video en chat_with_transcript, zodat meerdere
+gebruikers één warme installatie (en één lokale Ollama) kunnen delen.
+
+Gebruik:
+    python server.py                      # http://127.0.0.1:8765
+    python server.py --host 0.0.0.0 --port 8765 --max-pending 20
+
+API (JSON):
+    GET  /health                    status en wachtrij per provider
+    POST /jobs                      {"url": ..., "provider": "ollama", "model": ..., "formats": ["docx"], "refresh": false,
+                                     "normalize": true, "remove_fillers": false}
+    GET  /jobs                      alle taken
+    GET  /jobs/<id>                 status van een taak
+    GET  /jobs/<id>/result          samenvatting (?transcript=1 ook transcriptie en segmenten)
+    POST /jobs/<id>/retry           mislukte taak opnieuw
+    POST /jobs/<id>/chat            {"question": ..., "session": "default", "stream": true, "retrieval": true}
+                                    streamt NDJSON regels {"token": ...} en tot slot {"done": true, "answer": ...}
+    GET  /library/search?q=...      zoeken in alle verwerkte video's
+    POST /library/chat              {"question": ..., "provider": "ollama", "session": "default", "stream": true}
+                                    vraag over de hele bibliotheek; tot slot ook "sources" (video ID, titel en start)
+
+Samenvattingen en chatvragen delen per provider dezelfde limiet (BATCH_LLM_WORKERS).
+Bij een volle wachtrij of een provider die te lang bezet blijft antwoordt de server met 429 en
+Retry-After.
+"""
+
+import os
+import re
+import json
+import logging
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from youtube_samenvatting import (
+    JobQueue, QueueFullError, ChatHistory, TranscriptIndex, chat_with_transcript, chat_with_library,
+    chat_uses_retrieval,
+    get_summarize_fn, LIBRARY, LIBRARY_SEARCH_LIMIT,
+    extract_video_id, load_config, preload_dependencies, BATCH_LLM_WORKERS, DEFAULT_MODELS,
+    DEFAULT_OUTPUT_FORMATS, RENDERERS
+)
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+# Maximaal aantal wachtende video's per provider; daarna 429
+SERVER_MAX_PENDING = 20
+# Afgeronde taken (met transcriptie en samenvatting) die in het geheugen blijven
+SERVER_KEEP_JOBS = 200
+# Seconden dat een chatvraag op een vrij slot van zijn provider wacht; daarna 429
+SERVER_CHAT_WAIT = 10
+# Retry-After (seconden) bij een 429
+SERVER_RETRY_AFTER = 5
+# Maximale grootte van een request body
+SERVER_MAX_BODY = 64 * 1024
+
+# Verzoeken loggen op INFO, los van het root logger niveau (ERROR)
+request_logger = logging.getLogger("youtube_samenvatting.server")
+request_logger.setLevel(logging.INFO)
+
+
+class ServiceError(Exception):
+    """Error with the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SummaryService:
+    """
+    State of the server: a JobQueue for summaries (per-provider worker lanes,
+    max_pending waiting jobs per provider) and the chat sessions and
+    retrieval indexes of finished jobs. Chat answers take a slot of the
+    queue's per-provider LLM limit, so summaries and chats together never
+    run more requests on a provider (one local Ollama) than it has workers.
+    Library search and chat use library (default LIBRARY).
+    API keys come from the server's config/environment, not from clients.
+    """
+
+    def __init__(self, api_keys: dict, max_pending: int = SERVER_MAX_PENDING,
+                 keep_jobs: int = SERVER_KEEP_JOBS, workers: dict = None, library=None):
+        self.api_keys = api_keys
+        self.library = library if library is not None else LIBRARY
+        self.keep_jobs = keep_jobs
+        self.jobs = JobQueue(workers, max_pending=max_pending)
+        self.sessions = {}  # (job id of "library", sessie) -> ChatHistory
+        self.indexes = {}   # job id -> TranscriptIndex
+        self.lock = threading.Lock()
+
+    def submit(self, body: dict):
+        url = body.get("url")
+        if not url or not extract_video_id(url):
+            raise ServiceError(400, "Ongeldige of ontbrekende YouTube URL")
+        provider = body.get("provider", "ollama")
+        if provider not in self.jobs.workers:
+            raise ServiceError(400, f"Onbekende provider: {provider}")
+        if provider != "ollama" and not self.api_keys.get(provider):
+            raise ServiceError(400, f"Geen API key voor {provider} geconfigureerd op de server")
+        model = (body.get("model") or DEFAULT_MODELS["ollama"]) if provider == "ollama" else None
+
+        formats = body.get("formats", DEFAULT_OUTPUT_FORMATS)
+        if isinstance(formats, str):
+            formats = formats.split(",")
+        formats = tuple(fmt.strip().lower() for fmt in formats if fmt.strip())
+        unknown = [fmt for fmt in formats if fmt not in RENDERERS]
+        if unknown or not formats:
+            raise ServiceError(400, f"Onbekend uitvoerformaat: {', '.join(unknown) or '(geen)'} "
+                                    f"(kies uit {', '.join(RENDERERS)})")
+
+        self.forget_old_jobs()
+        try:
+            return self.jobs.submit(url, provider, self.api_keys.get(provider), model, formats=formats,
+                                    refresh=bool(body.get("refresh")), chunked=body.get("chunked", True),
+                                    normalize=body.get("normalize", True) is not False,
+                                    remove_fillers=bool(body.get("remove_fillers")))
+        except QueueFullError as e:
+            raise ServiceError(429, str(e))
+
+    def forget_old_jobs(self):
+        """Drop the oldest finished jobs with their chat sessions and indexes."""
+        self.jobs.forget(self.keep_jobs)
+        with self.lock:
+            for key in [key for key in self.sessions if key[0] != "library" and key[0] not in self.jobs.jobs]:
+                del self.sessions[key]
+            for job_id in [job_id for job_id in self.indexes if job_id not in self.jobs.jobs]:
+                del self.indexes[job_id]
+
+    def get_job(self, job_id: int, finished: bool = False):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ServiceError(404, f"Taak {job_id} bestaat niet")
+        if finished and job.status != "klaar":
+            raise ServiceError(409, f"Taak {job_id} is nog niet klaar (status: {job.status})")
+        return job
+
+    def retry(self, job_id: int):
+        job = self.get_job(job_id)
+        try:
+            return self.jobs.retry(job.id)
+        except QueueFullError as e:
+            raise ServiceError(429, str(e))
+        except Exception as e:
+            raise ServiceError(409, str(e))
+
+    def chat(self, job_id: int, question: str, session: str = "default", on_token=None,
+             use_retrieval: bool = True):
+        """Answer a question about a finished job; returns (answer, usage)."""
+        job = self.get_job(job_id, finished=True)
+        if not question:
+            raise ServiceError(400, "Geen vraag opgegeven")
+        transcript = job.result.timed_transcript()
+        use_retrieval = use_retrieval and chat_uses_retrieval(transcript, job.provider, job.model)
+        index = self.get_index(job) if use_retrieval else None
+        history = self.get_history((job.id, session), job.provider, job.model)
+
+        def ask(usage):
+            return chat_with_transcript(transcript, question, history, job.provider, job.api_key,
+                                        model=job.model, on_token=on_token, index=index, usage=usage)
+
+        answer, usage = self.run_chat(ask, job.provider)
+        self.remember(history, question, answer, job.provider, job.api_key, job.model)
+        return answer, usage
+
+    def library_chat(self, question: str, provider: str = "ollama", model: str = None,
+                     session: str = "default", on_token=None):
+        """Answer a question over the whole library; returns (answer, sources, usage)."""
+        if not question:
+            raise ServiceError(400, "Geen vraag opgegeven")
+        if provider not in self.jobs.workers:
+            raise ServiceError(400, f"Onbekende provider: {provider}")
+        api_key = self.api_keys.get(provider)
+        if provider != "ollama" and not api_key:
+            raise ServiceError(400, f"Geen API key voor {provider} geconfigureerd op de server")
+        model = (model or DEFAULT_MODELS["ollama"]) if provider == "ollama" else None
+        history = self.get_history(("library", f"{session}:{provider}:{model}"), provider, model)
+        sources = []
+
+        def ask(usage):
+            answer, found = chat_with_library(question, history, provider, api_key, model, on_token, usage,
+                                              self.library)
+            sources.extend(found)
+            return answer
+
+        answer, usage = self.run_chat(ask, provider)
+        self.remember(history, question, answer, provider, api_key, model)
+        return answer, sources, usage
+
+    def get_history(self, key: tuple, provider: str, model: str) -> ChatHistory:
+        with self.lock:
+            history = self.sessions.get(key)
+            if history is None:
+                history = self.sessions[key] = ChatHistory(provider, model)
+            return history
+
+    def run_chat(self, ask, provider: str):
+        """Run ask(usage) in an LLM slot of provider (shared with jobs); 429 when none frees up in time."""
+        slot = self.jobs.llm_semaphores[provider]
+        if not slot.acquire(timeout=SERVER_CHAT_WAIT):
+            raise ServiceError(429, f"{provider} is bezet met andere samenvattingen of vragen")
+        usage = {}
+        try:
+            return ask(usage), usage
+        finally:
+            slot.release()
+
+    def remember(self, history: ChatHistory, question: str, answer: str, provider: str, api_key: str, model: str):
+        """Add a turn to a chat session and compact it in the background when needed."""
+        history.add(question, answer)
+        if history.needs_compaction():
+            summarize_fn = get_summarize_fn(provider, api_key, model)
+            threading.Thread(target=self.compact, args=(history, summarize_fn, provider), daemon=True).start()
+
+    def compact(self, history: ChatHistory, summarize_fn, provider: str):
+        """Compact a chat session in an LLM slot of provider; skipped (tried again next turn) when none frees up."""
+        slot = self.jobs.llm_semaphores[provider]
+        if not slot.acquire(timeout=SERVER_CHAT_WAIT):
+            return
+        try:
+            history.compact(summarize_fn)
+        finally:
+            slot.release()
+
+    def get_index(self, job) -> TranscriptIndex:
+        """Retrieval index of a job's transcript, built on first use."""
+        with self.lock:
+            index = self.indexes.get(job.id)
+        if index is None:
+            index = TranscriptIndex(job.result.timed_transcript())
+            with self.lock:
+                index = self.indexes.setdefault(job.id, index)
+        return index
+
+    def health(self) -> dict:
+        jobs = list(self.jobs.jobs.values())
+        return {
+            "status": "ok",
+            "workers": self.jobs.workers,
+            "pending": {provider: self.jobs.pending(provider) for provider in self.jobs.workers},
+            "running": sum(1 for job in jobs if job.status == "bezig"),
+            "jobs": len(jobs),
+        }
+
+
+def job_info(job) -> dict:
+    """JSON view of a job's status."""
+    info = {
+        "id": job.id,
+        "url": job.url,
+        "provider": job.provider,
+        "model": job.model,
+        "status": job.status,
+        "message": job.message,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created": job.created,
+        "started": job.started,
+        "finished": job.finished,
+        "elapsed": round(job.elapsed, 3),
+    }
+    if job.result:
+        info.update(video_id=job.result.video_id, title=job.result.title)
+    return info
+
+
+def result_info(job, transcript: bool = False) -> dict:
+    """JSON view of a finished job's result."""
+    result = job.result
+    info = job_info(job)
+    info.update(
+        lang=result.lang,
+        summary=result.summary,
+        summary_cached=result.summary_cached,
+        transcript_path=str(result.transcript_path) if result.transcript_path else None,
+        summary_paths={fmt: str(path) for fmt, path in result.summary_paths.items()},
+    )
+    if transcript:
+        info.update(transcript=result.transcript, segments=[list(segment) for segment in result.segments])
+    return info
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Routes the JSON API to the SummaryService of the server."""
+    protocol_version = "HTTP/1.1"
+    routes = [
+        ("GET", re.compile(r"^/health$"), "get_health"),
+        ("GET", re.compile(r"^/jobs$"), "get_jobs"),
+        ("POST", re.compile(r"^/jobs$"), "post_job"),
+        ("GET", re.compile(r"^/jobs/(\d+)$"), "get_job"),
+        ("GET", re.compile(r"^/jobs/(\d+)/result$"), "get_result"),
+        ("POST", re.compile(r"^/jobs/(\d+)/retry$"), "post_retry"),
+        ("POST", re.compile(r"^/jobs/(\d+)/chat$"), "post_chat"),
+        ("GET", re.compile(r"^/library/search$"), "get_library_search"),
+        ("POST", re.compile(r"^/library/chat$"), "post_library_chat"),
+    ]
+
+    @property
+    def service(self) -> SummaryService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        request_logger.info("HTTP %s - " + format, self.address_string(), *args)
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def dispatch(self, method: str):
+        url = urlparse(self.path)
+        self.query = parse_qs(url.query)
+        try:
+            for route_method, pattern, name in self.routes:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    getattr(self, name)(*(int(arg) for arg in match.groups()))
+                    return
+            raise ServiceError(404, f"Onbekend pad: {method} {url.path}")
+        except ServiceError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client is weg
+        except Exception as e:
+            logging.error(f"Server: fout bij {method} {self.path}", exc_info=True)
+            self.send_json(500, {"error": str(e)})
+
+    def read_json(self) -> dict:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > SERVER_MAX_BODY:
+            # De body blijft ongelezen op de verbinding staan: na het antwoord sluiten
+            self.close_connection = True
+            if length < 0:
+                raise ServiceError(400, "Ongeldige Content-Length")
+            raise ServiceError(413, "Request te groot")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise ServiceError(400, "Ongeldige JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "Verwacht een JSON object")
+        return body
+
+    def send_json(self, status: int, data):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", str(SERVER_RETRY_AFTER))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def get_health(self):
+        self.send_json(200, self.service.health())
+
+    def get_jobs(self):
+        self.send_json(200, [job_info(job) for job in list(self.service.jobs.jobs.values())])
+
+    def post_job(self):
+        job = self.service.submit(self.read_json())
+        self.send_json(202, job_info(job))
+
+    def get_job(self, job_id: int):
+        self.send_json(200, job_info(self.service.get_job(job_id)))
+
+    def get_result(self, job_id: int):
+        job = self.service.get_job(job_id, finished=True)
+        transcript = self.query.get("transcript", ["0"])[0] not in ("0", "false", "")
+        self.send_json(200, result_info(job, transcript))
+
+    def post_retry(self, job_id: int):
+        self.send_json(202, job_info(self.service.retry(job_id)))
+
+    def post_chat(self, job_id: int):
+        body = self.read_json()
+        question = (body.get("question") or "").strip()
+        session = str(body.get("session") or "default")
+        use_retrieval = body.get("retrieval", True)
+        if not body.get("stream", True):
+            answer, usage = self.service.chat(job_id, question, session, use_retrieval=use_retrieval)
+            self.send_json(200, {"answer": answer, "usage": usage})
+            return
+
+        def ask(on_token):
+            answer, usage = self.service.chat(job_id, question, session, on_token, use_retrieval)
+            return {"answer": answer, "usage": usage}
+
+        self.stream_chat(ask)
+
+    def get_library_search(self):
+        query = self.query.get("q", [""])[0]
+        try:
+            limit = int(self.query.get("limit", [LIBRARY_SEARCH_LIMIT])[0])
+        except ValueError:
+            raise ServiceError(400, "limit moet een geheel getal zijn")
+        if limit < 1:
+            raise ServiceError(400, "limit moet minstens 1 zijn")
+        hits = self.service.library.search(query, limit)
+        self.send_json(200, hits)
+
+    def post_library_chat(self):
+        body = self.read_json()
+        question = (body.get("question") or "").strip()
+        session = str(body.get("session") or "default")
+        provider = body.get("provider", "ollama")
+        model = body.get("model")
+        if not body.get("stream", True):
+            answer, sources, usage = self.service.library_chat(question, provider, model, session)
+            self.send_json(200, {"answer": answer, "sources": sources, "usage": usage})
+            return
+
+        def ask(on_token):
+            answer, sources, usage = self.service.library_chat(question, provider, model, session, on_token)
+            return {"answer": answer, "sources": sources, "usage": usage}
+
+        self.stream_chat(ask)
+
+    def stream_chat(self, ask):
+        """
+        Stream a chat answer as NDJSON: {"token": ...} lines, then the dict
+        ask(on_token) returns with "done": true. Errors before the first
+        token are still a normal JSON error (e.g. 429).
+        """
+        started = []
+
+        def on_token(token):
+            if not started:
+                self.start_stream()
+                started.append(True)
+            self.write_line({"token": token})
+
+        try:
+            final = ask(on_token)
+        except Exception as e:
+            if not started:
+                raise
+            logging.error("Server: chat afgebroken", exc_info=True)
+            self.write_line({"done": True, "error": str(e)})
+            self.end_stream()
+            return
+        if not started:
+            self.start_stream()
+        self.write_line({"done": True, **final})
+        self.end_stream()
+
+    def start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_line(self, data: dict):
+        line = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+    def end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def create_server(service: SummaryService, host: str = SERVER_HOST, port: int = SERVER_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokale HTTP service voor samenvattingen en chat.")
+    parser.add_argument("--host", default=SERVER_HOST,
+                        help="Adres om op te luisteren (0.0.0.0 voor het hele netwerk; er is geen login)")
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--max-pending", type=int, default=SERVER_MAX_PENDING,
+                        help="Maximaal aantal wachtende video's per provider (daarna 429)")
+    parser.add_argument("--keep-jobs", type=int, default=SERVER_KEEP_JOBS,
+                        help="Aantal afgeronde taken dat in het geheugen blijft")
+    args = parser.parse_args()
+
+    config = load_config()
+    api_keys = {
+        "openai": config.get("openai_api_key") or os.environ.get("OPENAI_API_KEY"),
+        "anthropic": config.get("anthropic_api_key") or os.environ.get("ANTHROPIC_API_KEY"),
+    }
+    service = SummaryService(api_keys, args.max_pending, args.keep_jobs)
+    server = create_server(service, args.host, args.port)
+
+    # Zware modules alvast laden, dan betaalt de eerste aanvraag die tijd niet
+    threading.Thread(target=preload_dependencies, daemon=True).start()
+
+    workers = ", ".join(f"{provider} {count}" for provider, count in BATCH_LLM_WORKERS.items())
+    print(f"Server draait op http://{args.host}:{args.port} (workers: {workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServer gestopt")
+    finally:
+        server.server_close()
+        service.jobs.shutdown()
+
+
+if __name__ == "__main__":
+    main()
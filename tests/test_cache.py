@@ -0,0 +1,44 @@
+import os
+import time
+
+from youtube_samenvatting import DiskCache
+
+
+def test_get_returns_stored_value(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10_000, ttl=60)
+    cache.set("transcript:abc:nl", {"text": "hallo", "lang": "nl"})
+    assert cache.get("transcript:abc:nl") == {"text": "hallo", "lang": "nl"}
+    assert cache.get("transcript:abc:en") is None
+
+
+def test_expired_entry_is_removed(tmp_path, monkeypatch):
+    cache = DiskCache(tmp_path, max_bytes=10_000, ttl=60)
+    cache.set("a", "waarde")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10_000, ttl=60)
+    for i, key in enumerate("abc"):
+        cache.set(key, "x" * 1000)
+        os.utime(cache._path(key), (1000 + i, 1000 + i))
+    cache.get("a")  # a is nu het meest recent gebruikt
+
+    size = cache._path("a").stat().st_size
+    cache.max_bytes = size * 3 + 10  # Ruimte voor drie items
+    cache.set("d", "x" * 1000)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.get("d") is not None
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = DiskCache(tmp_path, max_bytes=10_000, ttl=60)
+    cache.set("a", "waarde")
+    cache._path("a").write_text("{niet json", encoding="utf-8")
+    assert cache.get("a") is None
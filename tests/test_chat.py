@@ -0,0 +1,68 @@
+import json
+from types import SimpleNamespace
+
+import youtube_samenvatting as ys
+from youtube_samenvatting import ANTHROPIC_CACHE_CONTROL, ChatHistory, count_tokens
+
+
+class FakeAnthropic:
+    """Messages API stub with prompt caching: a prefix up to a cache_control block is cached."""
+
+    def __init__(self):
+        self.messages = self
+        self.requests = []
+        self.cached = set()
+
+    def create(self, **request):
+        self.requests.append(request)
+        blocks = list(request["system"])
+        for message in request["messages"]:
+            content = message["content"]
+            blocks.extend(content if isinstance(content, list) else [{"type": "text", "text": content}])
+
+        read = written = 0
+        for end, block in enumerate(blocks, 1):
+            if "cache_control" not in block:
+                continue
+            key = json.dumps(blocks[:end])
+            tokens = sum(count_tokens(b["text"]) for b in blocks[:end])
+            if key in self.cached:
+                read = tokens
+            else:
+                written = tokens - read
+                self.cached.add(key)
+        total = sum(count_tokens(b["text"]) for b in blocks)
+        usage = SimpleNamespace(input_tokens=total - read - written, output_tokens=3,
+                                cache_read_input_tokens=read, cache_creation_input_tokens=written)
+        return SimpleNamespace(content=[SimpleNamespace(text=f"antwoord {len(self.requests)}")], usage=usage)
+
+
+def test_anthropic_chat_caches_transcript_and_history(monkeypatch):
+    client = FakeAnthropic()
+    monkeypatch.setattr(ys, "get_anthropic_client", lambda api_key: client)
+    transcript = "\n".join(f"[{i}:00] regel {i} over fietsen en treinen" for i in range(200))
+    history = ChatHistory("anthropic")
+
+    first, second = {}, {}
+    answer = ys.chat_with_anthropic(transcript, "Waarover gaat het?", history, "sk-test", usage=first)
+    history.add("Waarover gaat het?", answer)
+    ys.chat_with_anthropic(transcript, "En daarna?", history, "sk-test", usage=second)
+
+    system = client.requests[0]["system"]
+    assert system[0]["cache_control"] == ANTHROPIC_CACHE_CONTROL
+    assert "regel 199 over fietsen" in system[0]["text"]
+    assert client.requests[1]["system"] == system
+    assert client.requests[1]["messages"][-2]["content"][0]["cache_control"] == ANTHROPIC_CACHE_CONTROL
+
+    assert first["cache_creation_input_tokens"] > 0 and "cache_read_input_tokens" not in first
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    assert second["cache_creation_input_tokens"] < first["cache_creation_input_tokens"]
+
+
+def test_anthropic_uses_retrieval_only_for_transcripts_over_budget():
+    short = "regel over fietsen\n" * 100
+    long = "regel over fietsen\n" * 100_000
+
+    assert not ys.chat_uses_retrieval(short, "anthropic")
+    assert ys.chat_uses_retrieval(long, "anthropic")
+    assert ys.chat_uses_retrieval(short, "openai") and ys.chat_uses_retrieval(short, "ollama")
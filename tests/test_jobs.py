@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+import youtube_samenvatting as ys
+from youtube_samenvatting import JobQueue, QueueFullError
+
+URL = "https://youtube.com/watch?v=abc123def45"
+
+
+class FakeResult:
+    title = "Video"
+
+    def wait_saved(self):
+        pass
+
+
+def failing_process_video(*args, **kwargs):
+    raise Exception("netwerkfout")
+
+
+def wait_for(job, statuses=("klaar", "fout")):
+    deadline = time.time() + 5
+    while job.status not in statuses and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def queue():
+    jobs = JobQueue({"ollama": 1, "openai": 2})
+    yield jobs
+    jobs.shutdown(wait=True)
+
+
+def test_job_runs_with_its_options(queue, monkeypatch):
+    calls = []
+
+    def fake_process_video(url, provider, api_key=None, model=None, progress_callback=None, **options):
+        calls.append((url, provider, model, options))
+        progress_callback("bezig")
+        return FakeResult()
+
+    monkeypatch.setattr(ys, "process_video", fake_process_video)
+    changes = []
+    queue.on_change = lambda job: changes.append(job.status)
+    job = wait_for(queue.submit(URL, "ollama", model="gemma2:9b", formats=("md",)))
+
+    assert job.status == "klaar" and job.label == "Video" and job.attempts == 1
+    assert calls[0][:3] == (URL, "ollama", "gemma2:9b")
+    assert calls[0][3]["formats"] == ("md",)
+    assert calls[0][3]["llm_semaphore"] is queue.llm_semaphores["ollama"]
+    assert changes[0] == "wachtend" and changes[-1] == "klaar"
+    assert job.elapsed >= 0
+
+
+def test_failed_job_can_be_retried(queue, monkeypatch):
+    attempts = []
+
+    def flaky_process_video(url, *args, **kwargs):
+        attempts.append(url)
+        if len(attempts) == 1:
+            failing_process_video()
+        return FakeResult()
+
+    monkeypatch.setattr(ys, "process_video", flaky_process_video)
+    job = wait_for(queue.submit(URL, "openai"))
+    assert job.status == "fout" and job.error == "netwerkfout"
+
+    queue.retry(job.id)
+    assert wait_for(job).status == "klaar"
+    assert job.attempts == 2 and job.error is None
+    with pytest.raises(Exception, match="mislukte taken"):
+        queue.retry(job.id)
+
+
+def test_max_pending_per_provider(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(ys, "process_video", lambda *args, **kwargs: release.wait(5))
+    jobs = JobQueue({"ollama": 1, "openai": 1}, max_pending=1)
+    try:
+        running = jobs.submit(URL, "ollama")
+        wait_for(running, ("bezig",))
+        jobs.submit(URL, "ollama")
+        with pytest.raises(QueueFullError):
+            jobs.submit(URL, "ollama")
+        jobs.submit(URL, "openai")  # Andere provider heeft een eigen wachtrij
+        assert jobs.pending("ollama") == 1
+        with pytest.raises(Exception, match="Onbekende provider"):
+            jobs.submit(URL, "mistral")
+    finally:
+        release.set()
+        jobs.shutdown(wait=True)
+
+
+def test_forget_keeps_newest_finished_jobs(queue, monkeypatch):
+    monkeypatch.setattr(ys, "process_video", failing_process_video)
+    submitted = [wait_for(queue.submit(URL, "openai")) for _ in range(4)]
+
+    queue.forget(2)
+    assert sorted(queue.jobs) == [job.id for job in submitted[2:]]
+    queue.forget(0)
+    assert queue.jobs == {}
+
+
+def test_chunk_calls_hold_an_llm_slot_each(monkeypatch):
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_summarize_fn(chunk, prompt, on_token=None):
+        with lock:
+            active.append(chunk)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(chunk)
+        return "notitie"
+
+    monkeypatch.setattr(ys, "get_summarize_fn", lambda *args: fake_summarize_fn)
+    monkeypatch.setattr(ys, "get_transcript_budget", lambda *args: 50)
+    text = "\n".join(f"dit is regel nummer {i} van het transcript." for i in range(40))
+    waited = []
+
+    ys.summarize(text, "ollama", llm_semaphore=threading.BoundedSemaphore(1), waited=waited)
+
+    assert max(peak) == 1  # MAX_CHUNK_WORKERS["ollama"] > 1, maar maar één slot
+    assert len(waited) == len(peak) > 2
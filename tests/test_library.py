@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+
+import youtube_samenvatting as ys
+from youtube_samenvatting import Library, TranscriptSegments
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = Library(tmp_path / "bibliotheek.sqlite3")
+    yield library
+    library.close()
+
+
+def store(library, key, video_id="abc123def45", transcript="", segments=None, **fields):
+    values = {"title": "Video", "lang": "en", "provider": "ollama", "model": None,
+              "created": "2026-01-01T12:00:00", "transcript_path": None, "summary_paths": {},
+              "summary": "", **fields}
+    return library.store(key, video_id, transcript=transcript, segments=segments, **values)
+
+
+def test_passages_get_start_of_their_segment(library, monkeypatch):
+    monkeypatch.setattr(ys, "RETRIEVAL_PASSAGE_TOKENS", 12)
+    segments = TranscriptSegments.from_entries(
+        [(i * 30.0, 30.0, f"segment {i} about topic{i} with several more words.") for i in range(6)])
+    store(library, "a", transcript="raw text", segments=segments)
+
+    hits = library.search_passages("topic4")
+    assert hits and hits[0]["start"] == 120.0
+    assert "[" not in hits[0]["text"]
+    starts = [hit["start"] for hit in library.search_passages("segment", k=10, per_video=10)]
+    assert sorted(starts) == [0.0, 30.0, 60.0, 90.0, 120.0, 150.0]
+
+
+def test_passages_without_segments_have_no_start(library):
+    store(library, "a", transcript="a transcript about bicycles")
+    assert library.search_passages("bicycles")[0]["start"] is None
+
+
+def test_search_ranks_title_and_supports_phrases_and_prefixes(library):
+    store(library, "a", "aaaaaaaaaaa", title="Fietsen in Utrecht", transcript="we praten over steden")
+    store(library, "b", "bbbbbbbbbbb", title="Steden", transcript="een lange rit op de fiets door Utrecht")
+
+    assert [hit["key"] for hit in library.search("utrecht")] == ["a", "b"]
+    assert [hit["key"] for hit in library.search('"op de fiets"')] == ["b"]
+    assert [hit["key"] for hit in library.search("fiets*")] == ["a", "b"]
+    assert library.search('"') == []
+    assert "[Utrecht]" in library.search("utrecht")[0]["snippet"]
+
+
+def test_store_same_key_replaces_row_and_fulltext(library):
+    store(library, "a", transcript="eerste versie over appels", summary_paths={"md": "/tmp/a.md"})
+    row_id = store(library, "a", transcript="tweede versie over peren", timings={"llm": 1.5})
+
+    assert len(library) == 1
+    assert library.search("appels") == []
+    hit = library.search("peren")[0]
+    assert hit["id"] == row_id
+    assert hit["timings"] == {"llm": 1.5}
+    assert hit["summary_paths"] == {}
+
+
+def test_passages_are_indexed_once_per_video(library):
+    store(library, "a", transcript="passage over zeilen")
+    store(library, "b", transcript="andere tekst over zeilen en roeien")
+    hits = library.search_passages("zeilen roeien")
+    assert [hit["text"] for hit in hits] == ["passage over zeilen"]
+
+
+def test_search_passages_limits_hits_per_video(library, monkeypatch):
+    monkeypatch.setattr(ys, "RETRIEVAL_PASSAGE_TOKENS", 5)
+    store(library, "a", "aaaaaaaaaaa", transcript="\n".join(f"kaas nummer {i}" for i in range(6)))
+    store(library, "b", "bbbbbbbbbbb", transcript="kaas uit Gouda")
+
+    hits = library.search_passages("kaas", k=4, per_video=2)
+    assert len(hits) == 3
+    assert sorted(hit["video_id"] for hit in hits) == ["aaaaaaaaaaa", "aaaaaaaaaaa", "bbbbbbbbbbb"]
+    assert library.search_passages("de het een") == []
+
+
+def test_import_files_is_idempotent(library, tmp_path):
+    output = tmp_path / "uitvoer"
+    output.mkdir()
+    base = output / "20260102_030405_Mijn video"
+    ys.write_transcript_file(Path(f"{base}_transcriptie.txt"), "Mijn video", "abc123def45", "nl",
+                             "tekst over molens")
+    blocks = ys.parse_summary("## Samenvatting\n- molens draaien")
+    Path(f"{base}_samenvatting.md").write_text(
+        ys.render_markdown(blocks, "Mijn video", "abc123def45", "ollama", "gemma2:9b"), encoding="utf-8")
+    ys.write_transcript_file(Path(f"{output}/20260102_040000_Los_transcriptie.txt"), "Los", "bbbbbbbbbbb",
+                             "en", "only a transcript")
+    (output / "notities.txt").write_text("geen transcriptie", encoding="utf-8")
+
+    assert library.import_files(output) == (2, 0)
+    assert library.import_files(output) == (0, 2)
+    assert len(library) == 2
+
+    hit = library.search("molens")[0]
+    assert (hit["title"], hit["provider"], hit["model"]) == ("Mijn video", "ollama", "gemma2:9b")
+    assert hit["created"] == "2026-01-02T03:04:05"
+    assert hit["summary_paths"] == {"md": f"{base}_samenvatting.md"}
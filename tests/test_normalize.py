@@ -0,0 +1,66 @@
+from youtube_samenvatting import TranscriptSegments, normalize_transcript
+
+
+def segments(*texts, step=2.0):
+    return TranscriptSegments.from_entries([(i * step, step, text) for i, text in enumerate(texts)])
+
+
+def test_rolling_captions_repeat_previous_line():
+    raw = segments("we gaan het hebben over\ntransformers en attention",
+                   "transformers en attention\nen waarom dat werkt",
+                   "en waarom dat werkt\nin grote modellen")
+    normalized = normalize_transcript(raw)
+    assert normalized.text == "we gaan het hebben over transformers en attention en waarom dat werkt in grote modellen"
+    assert list(normalized.starts) == [0.0, 2.0, 4.0]
+
+
+def test_growing_caption_repeats_whole_previous_segment():
+    normalized = normalize_transcript(segments("we", "we talk", "we talk about", "we talk about the model"))
+    assert normalized.text == "we talk about the model"
+
+
+def test_single_word_rolling_repeat_is_dropped():
+    normalized = normalize_transcript(segments("about", "about the model"))
+    assert normalized.text == "about the model"
+
+
+def test_repeats_at_segment_boundary_are_kept():
+    normalized = normalize_transcript(segments("well, you know,", "you know, it works"))
+    assert normalized.text == "well, you know, you know, it works"
+
+
+def test_refrain_across_segments_is_kept():
+    text = normalize_transcript(segments("sing it again sing it again", "sing it again and again")).text
+    assert text == "sing it again sing it again sing it again and again"
+
+
+def test_repeats_within_a_segment_are_kept():
+    assert normalize_transcript(segments("then then we go")).text == "then then we go"
+
+
+def test_non_speech_markers_removed_and_empty_segments_dropped():
+    normalized = normalize_transcript(segments("[Music]", "♪ hello there ♪", ">> and welcome (applause)"))
+    assert normalized.text == "hello there and welcome"
+    assert list(normalized.starts) == [2.0, 4.0]
+
+
+def test_fillers_only_removed_on_request():
+    raw = segments("uh, so we um start here")
+    assert normalize_transcript(raw).text == "uh, so we um start here"
+    assert normalize_transcript(raw, remove_fillers=True).text == "so we start here"
+
+
+def test_filler_removal_keeps_units_and_words():
+    raw = segments("the bolt is 5 mm long, hmm, with an umbrella", "Uhm the EHM part erm")
+    assert normalize_transcript(raw, remove_fillers=True).text == "the bolt is 5 mm long, with an umbrella the part"
+
+
+def test_reflow_breaks_lines_after_sentences():
+    normalized = normalize_transcript(segments("first sentence.", "second part", "goes on."))
+    assert normalized.text == "first sentence.\nsecond part goes on."
+
+
+def test_untimed_text_is_normalized_per_line():
+    normalized = normalize_transcript(TranscriptSegments("hello world\nhello world\n[Music]\nbye"))
+    assert normalized.text == "hello world bye"
+    assert len(normalized) == 0
@@ -0,0 +1,57 @@
+import pytest
+
+from youtube_samenvatting import RENDERERS, parse_summary, render_html, render_markdown, summary_output_paths
+
+SUMMARY = """## Samenvatting
+Een **korte** inleiding [1:05].
+
+### Punten
+- eerste punt
+- tweede **punt** [1:02:03]
+1. stap een
+2. stap twee
+---
+Slot <met> & tekens"""
+
+
+def test_parse_summary_blocks():
+    blocks = parse_summary(SUMMARY)
+    assert [kind for kind, _ in blocks] == ["heading1", "paragraph", "heading2", "bullet", "bullet",
+                                            "number", "number", "rule", "paragraph"]
+    assert blocks[1][1] == [("Een ", False), ("korte", True), (" inleiding [1:05].", False)]
+
+
+def test_render_markdown():
+    text = render_markdown(parse_summary(SUMMARY), "Titel", "abc123def45", "ollama", "gemma2:9b")
+    assert text.startswith("# Titel\n")
+    assert "**Model:** ollama (gemma2:9b)" in text
+    assert "[1:05](https://youtube.com/watch?v=abc123def45&t=65s)" in text
+    assert "- eerste punt\n- tweede **punt** [1:02:03](https://youtube.com/watch?v=abc123def45&t=3723s)" in text
+    assert "1. stap een\n2. stap twee" in text
+
+
+def test_render_html():
+    page = render_html(parse_summary(SUMMARY), "Titel <1>", "abc123def45", "openai", None)
+    assert "<title>Titel &lt;1&gt;</title>" in page
+    assert '<a href="https://youtube.com/watch?v=abc123def45&t=65s">[1:05]</a>' in page
+    assert "<ul>\n<li>eerste punt</li>\n<li>tweede <strong>punt</strong>" in page
+    assert "</ul>\n<ol>\n<li>stap een</li>\n<li>stap twee</li>\n</ol>\n<hr>" in page
+    assert "<p>Slot &lt;met&gt; &amp; tekens</p>" in page
+
+
+def test_render_docx():
+    pytest.importorskip("docx")
+    doc = RENDERERS["docx"][1](parse_summary(SUMMARY), "Titel", "abc123def45", "anthropic", None)
+    texts = [para.text for para in doc.paragraphs]
+    assert "Titel" in texts and "Samenvatting" in texts
+    assert "Model: anthropic" in doc.paragraphs[1].text
+    assert any(rel.reltype.endswith("/hyperlink") and rel.target_ref.endswith("&t=65s")
+               for rel in doc.part.rels.values())
+
+
+def test_summary_output_paths(tmp_path):
+    paths = summary_output_paths(tmp_path / "20260101_000000_Video", ("md", "html"), "openai")
+    assert [path.name for path in paths.values()] == ["20260101_000000_Video_samenvatting_openai.md",
+                                                      "20260101_000000_Video_samenvatting_openai.html"]
+    with pytest.raises(Exception, match="Onbekend uitvoerformaat: pdf"):
+        summary_output_paths(tmp_path / "x", ("pdf",))
@@ -0,0 +1,186 @@
+import http.client
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import server
+import youtube_samenvatting as ys
+from youtube_samenvatting import ChatHistory, Library, ProcessResult, TranscriptSegments
+
+URL = "https://youtube.com/watch?v=abc123def45"
+
+
+def fake_process_video(url, provider, api_key=None, model=None, llm_semaphore=None, **options):
+    segments = TranscriptSegments.from_entries([(0.0, 5.0, "hello world"), (65.0, 5.0, "about bicycles")])
+    with llm_semaphore:
+        return ProcessResult(url, "abc123def45", "Video", "en", segments.text, segments, "## Samenvatting",
+                             provider, model)
+
+
+def fake_chat(transcript, question, history, provider, api_key=None, model=None, on_token=None,
+              index=None, usage=None):
+    for token in ("Het ", "antwoord"):
+        if on_token:
+            on_token(token)
+    return "Het antwoord"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(ys, "process_video", fake_process_video)
+    monkeypatch.setattr(server, "chat_with_transcript", fake_chat)
+    monkeypatch.setattr(server, "SERVER_CHAT_WAIT", 0.05)
+    library = Library(tmp_path / "bibliotheek.sqlite3")
+    service = server.SummaryService({}, max_pending=5, workers={"ollama": 1}, library=library)
+    yield service
+    service.jobs.shutdown(wait=True)
+    library.close()
+
+
+@pytest.fixture
+def client(service):
+    httpd = server.create_server(service, "127.0.0.1", 0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    connection = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=5)
+    yield connection
+    connection.close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(connection, method, path, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    connection.request(method, path, data, headers or {})
+    response = connection.getresponse()
+    return response, response.read()
+
+
+def wait_for(job):
+    deadline = time.time() + 5
+    while job.status in ("wachtend", "bezig") and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def finished_job(service):
+    job = wait_for(service.submit({"url": URL}))
+    assert job.status == "klaar"
+    return job
+
+
+def test_submit_and_result_routes(client, service):
+    response, data = request(client, "POST", "/jobs", {"url": URL, "formats": ["md"]})
+    assert response.status == 202
+    job_id = json.loads(data)["id"]
+    wait_for(service.get_job(job_id))
+
+    response, data = request(client, "GET", f"/jobs/{job_id}/result?transcript=1")
+    result = json.loads(data)
+    assert response.status == 200
+    assert result["summary"] == "## Samenvatting"
+    assert result["segments"] == [[0.0, 5.0, "hello world"], [65.0, 5.0, "about bicycles"]]
+
+    response, data = request(client, "GET", "/health")
+    assert json.loads(data)["jobs"] == 1
+
+
+def test_bad_requests(client):
+    assert request(client, "POST", "/jobs", {"url": "geen url"})[0].status == 400
+    assert request(client, "GET", "/jobs/99")[0].status == 404
+    assert request(client, "GET", "/onbekend")[0].status == 404
+    assert request(client, "GET", "/library/search?q=fiets&limit=veel")[0].status == 400
+    assert request(client, "GET", "/library/search?q=fiets&limit=0")[0].status == 400
+    assert request(client, "GET", "/library/search?q=fiets&limit=5")[0].status == 200
+
+
+def test_oversized_body_closes_connection(client):
+    client.putrequest("POST", "/jobs")
+    client.putheader("Content-Length", str(server.SERVER_MAX_BODY + 1))
+    client.endheaders(b"{}")
+    response = client.getresponse()
+    response.read()
+    assert response.status == 413
+    assert response.getheader("Connection") == "close"
+
+
+def test_full_queue_answers_429_with_retry_after(client, service):
+    service.jobs.max_pending = 0
+    response, data = request(client, "POST", "/jobs", {"url": URL})
+    assert response.status == 429
+    assert response.getheader("Retry-After") == str(server.SERVER_RETRY_AFTER)
+
+
+def test_chat_streams_ndjson(client, service):
+    job = finished_job(service)
+    response, data = request(client, "POST", f"/jobs/{job.id}/chat", {"question": "Waarover?"})
+    lines = [json.loads(line) for line in data.decode().splitlines()]
+    assert response.getheader("Content-Type").startswith("application/x-ndjson")
+    assert lines[:2] == [{"token": "Het "}, {"token": "antwoord"}]
+    assert lines[-1]["done"] and lines[-1]["answer"] == "Het antwoord"
+    assert len(service.sessions[(job.id, "default")].messages) == 2
+
+
+def test_chat_shares_the_provider_limit_with_jobs(client, service, monkeypatch):
+    job = finished_job(service)
+    release = threading.Event()
+    running = threading.Event()
+
+    def slow_process_video(*args, llm_semaphore=None, **kwargs):
+        with llm_semaphore:
+            running.set()
+            release.wait(5)
+        return fake_process_video(*args, llm_semaphore=llm_semaphore, **kwargs)
+
+    monkeypatch.setattr(ys, "process_video", slow_process_video)
+    slow_job = service.submit({"url": URL})
+    assert running.wait(5)
+    response, data = request(client, "POST", f"/jobs/{job.id}/chat", {"question": "Waarover?"})
+    assert response.status == 429
+    assert response.getheader("Retry-After") == str(server.SERVER_RETRY_AFTER)
+
+    release.set()
+    wait_for(slow_job)
+    response, data = request(client, "POST", f"/jobs/{job.id}/chat", {"question": "Waarover?", "stream": False})
+    assert response.status == 200
+    assert json.loads(data)["answer"] == "Het antwoord"
+
+
+def test_history_compaction_takes_an_llm_slot(service):
+    slot = service.jobs.llm_semaphores["ollama"]
+    held = []
+
+    def summarize_fn(text, prompt, on_token=None):
+        held.append(not slot.acquire(blocking=False))
+        return "Eerdere vragen"
+
+    history = ChatHistory("ollama")
+    for i in range(3):
+        history.add(f"vraag {i}", "antwoord " * 5000)
+
+    slot.acquire()
+    service.compact(history, summarize_fn, "ollama")  # Geen slot vrij: overgeslagen
+    assert held == [] and not history.summary
+    slot.release()
+
+    service.compact(history, summarize_fn, "ollama")
+    assert held == [True]
+    assert history.summary == "Eerdere vragen"
+
+
+def test_retry_on_full_queue_answers_429(client, service, monkeypatch, caplog):
+    def failing_process_video(*args, **kwargs):
+        raise Exception("netwerkfout")
+
+    monkeypatch.setattr(ys, "process_video", failing_process_video)
+    job = wait_for(service.submit({"url": URL}))
+    assert job.status == "fout"
+
+    service.jobs.max_pending = 0
+    monkeypatch.setattr(logging.getLogger(), "level", logging.ERROR)  # Zoals in main()
+    response, data = request(client, "POST", f"/jobs/{job.id}/retry")
+    assert response.status == 429
+    assert job.status == "fout"
+    assert any(f"/jobs/{job.id}/retry" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,95 @@
+import sys
+import threading
+import types
+
+import pytest
+
+import youtube_samenvatting as ys
+from youtube_samenvatting import (
+    MIN_TRANSCRIPT_TOKENS, count_tokens, fit_to_tokens, get_transcript_budget, split_transcript
+)
+
+
+def test_short_transcript_is_one_chunk():
+    assert split_transcript("regel een\nregel twee", 100) == ["regel een\nregel twee"]
+
+
+def test_chunks_fit_the_budget_and_keep_all_text():
+    lines = [f"dit is regel nummer {i} van het transcript." for i in range(200)]
+    text = "\n".join(lines)
+    chunks = split_transcript(text, 60)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 60 for chunk in chunks)
+    assert "\n".join(chunks) == text  # Geknipt op regelgrenzen
+
+
+def test_long_line_is_split_on_sentences():
+    line = " ".join(f"Zin nummer {i} gaat over iets." for i in range(40))
+    chunks = split_transcript(line, 40)
+
+    assert all(count_tokens(chunk) <= 40 for chunk in chunks)
+    assert all(piece.endswith(".") for chunk in chunks for piece in chunk.split("\n"))
+    assert " ".join(" ".join(chunk.split("\n")) for chunk in chunks) == line
+
+
+def test_overlong_sentence_is_cut_hard():
+    sentence = "woord " * 500
+    chunks = split_transcript(sentence, 50)
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert "".join(chunk.replace("\n", "") for chunk in chunks).split() == sentence.split()
+
+
+def test_empty_chunks_are_dropped():
+    assert split_transcript("\n\n   \n", 10) == []
+
+
+def test_fit_to_tokens_and_budget():
+    text = "woord " * 1000
+    assert count_tokens(fit_to_tokens(text, 100)) <= 100
+    assert fit_to_tokens("kort", 100) == "kort"
+    assert get_transcript_budget("openai", None, "summary") <= 25000
+    assert get_transcript_budget("ollama", "gemma2:9b", "summary", prompt_tokens=100_000) == MIN_TRANSCRIPT_TOKENS
+
+
+def test_tokenizer_download_does_not_block_counting(monkeypatch):
+    release = threading.Event()
+
+    class FakeEncoding:
+        def encode(self, text, disallowed_special=()):
+            return text.split()
+
+    fake_tiktoken = types.ModuleType("tiktoken")
+    fake_tiktoken.get_encoding = lambda name: release.wait(5) and FakeEncoding()
+    monkeypatch.setitem(sys.modules, "tiktoken", fake_tiktoken)
+    monkeypatch.setattr(ys, "_tokenizer", None)
+    monkeypatch.setattr(ys, "_tokenizer_loaded", False)
+    monkeypatch.setattr(ys, "_tokenizer_ready", threading.Event())
+    monkeypatch.setattr(ys, "TOKENIZER_LOAD_TIMEOUT", 0.05)
+
+    assert ys.get_tokenizer() is None  # Download loopt nog: schatten
+    assert count_tokens("een twee drie") == ys.estimate_tokens("een twee drie")
+
+    release.set()
+    assert ys._tokenizer_ready.wait(5)
+    assert count_tokens("een twee drie") == 3
+
+
+def test_chunked_summary_repeats_map_passes_until_notes_fit():
+    reduced = []
+
+    def summarize_fn(text, prompt, on_token=None):
+        if prompt == ys.REDUCE_PROMPT:
+            reduced.append(text)
+            return "samenvatting"
+        return " ".join(text.split()[:12])
+
+    text = "\n".join(f"dit is regel nummer {i} van het transcript." for i in range(400))
+    assert ys.summarize_chunked(text, summarize_fn, 60, 40, 4) == "samenvatting"
+    assert count_tokens(reduced[0]) <= 40
+
+
+def test_chunked_summary_raises_when_notes_do_not_shrink():
+    text = "\n".join(f"dit is regel nummer {i} van het transcript." for i in range(100))
+    with pytest.raises(Exception, match="te lang"):
+        ys.summarize_chunked(text, lambda chunk, prompt, on_token=None: chunk, 60, 40, 4)
@@ -6,16 +6,30 @@ Haalt transcripties op van YouTube videos en maakt samenvattingen.
 import os
 import re
 import json
+import math
+import time
+import html
+import hashlib
+import queue
+import sqlite3
 import logging
+import importlib
+import bisect
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
-import requests
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from typing import Optional, Tuple, TYPE_CHECKING
+
+# requests, youtube_transcript_api en python-docx worden pas bij eerste gebruik
+# geïmporteerd, zodat de GUI zijn venster toont voordat deze geladen zijn
+if TYPE_CHECKING:
+    import requests
+    from docx.document import Document
+    from youtube_transcript_api import YouTubeTranscriptApi
 
 # Setup logging
 LOG_FILE = Path.home() / ".youtube_samenvatting.log"
@@ -24,6 +38,9 @@ logging.basicConfig(
     level=logging.ERROR,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
+# Prestatiemetingen (Ollama prefill/decode, tokenizer) komen ook in het logbestand, op INFO niveau
+perf_logger = logging.getLogger("youtube_samenvatting.perf")
+perf_logger.setLevel(logging.INFO)
 
 # Load .env file if it exists
 try:
@@ -35,30 +52,463 @@ try:
 except ImportError:
     pass
 
+# Zware dependencies die preload_dependencies() alvast op de achtergrond laadt
+HEAVY_MODULES = ("requests", "youtube_transcript_api", "docx")
+
+# Uitvoerformaten voor de samenvatting (zie RENDERERS); alleen gevraagde formaten worden gemaakt
+DEFAULT_OUTPUT_FORMATS = ("docx",)
+
+# Metrics: tijden per stap van process_video als JSON regels (met --metrics)
+METRICS_FILE = Path.home() / ".youtube_samenvatting_metrics.jsonl"
+
 # Output directory
 OUTPUT_DIR = Path.home() / "Documents" / "YouTube-Samenvattingen"
 
-# Transcript limieten per provider (karakters) - dit zijn TOTALE context limieten
-# De effectieve transcript limiet = totaal - prompt lengte - output buffer
-TRANSCRIPT_LIMITS = {
-    "ollama_gpt-oss_summary": 50000,   # gpt-oss:20b heeft groter context window
-    "ollama_gpt-oss_chat": 30000,
-    "ollama_gemma2_summary": 20000,    # gemma2:9b heeft 8K context (~30 min video)
-    "ollama_gemma2_chat": 12000,
-    "openai_summary": 100000,          # GPT-4o-mini heeft 128k context
-    "openai_chat": 80000,
-    "anthropic_summary": 150000,       # Claude heeft 200k context
-    "anthropic_chat": 120000,
+# Lokale Ollama server
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+
+# Gedeelde verbindingen: pool grootte per host en keep-alive voor SDK clients
+HTTP_POOL_CONNECTIONS = 4    # Aantal hosts met een eigen pool per sessie
+HTTP_POOL_MAXSIZE = 10       # Open verbindingen per host (>= aantal worker threads)
+HTTP_KEEPALIVE_SECONDS = 120  # Inactieve SDK verbindingen zo lang openhouden
+
+# Cache voor transcripties en titels (hergebruik bij opnieuw samenvatten)
+CACHE_DIR = OUTPUT_DIR / ".cache"
+TRANSCRIPT_CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+TRANSCRIPT_CACHE_TTL = 30 * 24 * 3600           # 30 dagen (seconden)
+SUMMARY_CACHE_MAX_BYTES = 50 * 1024 * 1024      # 50 MB
+SUMMARY_CACHE_TTL = 90 * 24 * 3600              # 90 dagen (seconden)
+
+# Tijdstempels: om de zoveel seconden een [m:ss] markering in de tekst die naar het model gaat,
+# zodat samenvatting en chat naar plekken in de video kunnen verwijzen (~4 tokens per markering)
+TIMESTAMP_INTERVAL = 60
+
+# Opschonen van de transcriptie voor het naar een model gaat: dubbele regels van
+# meelopende ondertitels, [Music]/[Applause] en losse regelovergangen eruit.
+# Stopwoorden (uh, ehm) alleen op verzoek, ze horen soms bij een citaat.
+NORMALIZE_FILLERS = False
+# Na een zin, of zo lang, begint een nieuwe regel (split_transcript knipt op regels)
+NORMALIZE_LINE_CHARS = 500
+
+# Bibliotheek: SQLite catalogus met full-text index van alle verwerkte video's
+LIBRARY_DB = OUTPUT_DIR / ".bibliotheek.sqlite3"
+LIBRARY_SEARCH_LIMIT = 20
+# Chat over de hele bibliotheek: relevantste passages over alle video's, met bronvermelding
+LIBRARY_CHAT_TOP_K = 10
+LIBRARY_CHAT_PER_VIDEO = 3  # Maximaal aantal passages uit één video
+
+# Standaard model per provider
+DEFAULT_MODELS = {
+    "ollama": "gpt-oss:20b",
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-sonnet-4-20250514",
+}
+
+# Generatie-instellingen voor samenvattingen (onderdeel van de cache sleutel)
+SUMMARY_OPTIONS = {
+    "ollama": {"temperature": 0.3, "num_predict": 2000},
+    "openai": {"temperature": 0.3, "max_tokens": 4000},
+    "anthropic": {"max_tokens": 4000},
+}
+
+# Generatie-instellingen voor chat
+CHAT_OPTIONS = {
+    "ollama": {"temperature": 0.3, "num_predict": 1500},
+    "openai": {"temperature": 0.3, "max_tokens": 1500},
+    "anthropic": {"max_tokens": 1500},
+}
+
+# Context window (tokens) per model. Voor Ollama wordt dit als num_ctx meegestuurd,
+# voor samenvatting en chat dezelfde waarde zodat Ollama het model niet herlaadt.
+CONTEXT_TOKENS = {
+    "ollama_gpt-oss": 16384,   # gpt-oss:20b kan meer, maar een groter num_ctx kost veel geheugen
+    "ollama_gemma2": 8192,     # gemma2:9b heeft 8K context
+    "openai": 128000,          # GPT-4o-mini heeft 128k context
+    "anthropic": 200000,       # Claude heeft 200k context
+}
+
+# Maximaal aantal transcriptie tokens per verzoek voor cloud providers (kosten en
+# wachttijd); langere transcripties gaan via map-reduce
+TRANSCRIPT_TOKEN_LIMITS = {
+    "openai_summary": 25000,
+    "openai_chat": 20000,
+    "anthropic_summary": 40000,
+    "anthropic_chat": 30000,
 }
 
-# Buffer voor prompt overhead en output
-PROMPT_OVERHEAD = 3000  # ~prompt lengte + wat buffer
+# Marge voor verschillen tussen onze telling en de tokenizer van het model
+TOKEN_SAFETY_MARGIN = 0.05
+MIN_TRANSCRIPT_TOKENS = 500
+
+# Schatting zonder tokenizer: letters ~4 per token, cijfers ~3 per token, leestekens 1
+ESTIMATE_CHARS_PER_TOKEN = 4
+ESTIMATE_DIGITS_PER_TOKEN = 3
+TOKEN_COUNT_CACHE_SIZE = 256
+# Seconden wachten op het laden van de tokenizer (eerste keer een download); daarna schatten
+TOKENIZER_LOAD_TIMEOUT = 2
+
+
+# Map-reduce: aantal delen dat tegelijk wordt samengevat per provider
+# (lokale Ollama verwerkt verzoeken grotendeels na elkaar, cloud API's niet).
+# Met een llm_semaphore houdt elke aanroep zelf een slot, dus die limiet geldt altijd.
+MAX_CHUNK_WORKERS = {
+    "ollama": 2,
+    "openai": 4,
+    "anthropic": 4,
+}
+
+# Batch modus: gelijktijdige YouTube verzoeken en LLM verzoeken (apart begrensd)
+BATCH_FETCH_WORKERS = 4
+BATCH_LLM_WORKERS = {
+    "ollama": 1,
+    "openai": 3,
+    "anthropic": 3,
+}
+# Maximaal aantal video's dat al opgehaald is en op een LLM slot wacht
+BATCH_MAX_PENDING = 8
+
+# Retrieval chat: transcript in passages, per vraag alleen de relevantste meesturen
+RETRIEVAL_PASSAGE_TOKENS = 300
+RETRIEVAL_TOP_K = 8
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Anthropic prompt caching: transcript als cachebaar blok. De cache verloopt na
+# 5 minuten zonder gebruik; de GUI houdt hem warm zolang de chat actief is.
+ANTHROPIC_CACHE_CONTROL = {"type": "ephemeral"}
+ANTHROPIC_CACHE_WARM_SECONDS = 4 * 60       # Interval voor keep-warm verzoeken
+ANTHROPIC_CACHE_WARM_MAX_IDLE = 30 * 60     # Stop met warm houden na zo lang zonder vraag
+
+# Ollama chat: model en KV-cache zo lang geladen houden tussen vragen, zodat het
+# transcript (vaste prefix van de berichten) niet bij elke vraag opnieuw wordt verwerkt
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Vaste ruimte voor chatgeschiedenis + vraag, zodat het transcript in de system prompt
+# per vraag gelijk blijft (stabiele prefix voor de KV-cache en prompt caching)
+CHAT_HISTORY_TOKENS = 3000
+
+# Chatgeschiedenis: recente beurten letterlijk, oudere in een doorlopende samenvatting.
+# Samenvatten zodra de letterlijke berichten een deel van de reservering innemen.
+HISTORY_SUMMARY_TOKENS = 500
+HISTORY_COMPACT_RATIO = 0.75
+
+# Token telling uit API responses (worden opgeteld in een usage dict)
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+USAGE_ALIASES = {"prompt_tokens": "input_tokens", "completion_tokens": "output_tokens"}  # OpenAI namen
+
+# Prijs in USD per miljoen tokens (invoer, uitvoer) van de standaardmodellen; Ollama is gratis.
+# Anthropic cache: schrijven kost 1.25x en lezen 0.1x de invoerprijs.
+TOKEN_PRICES = {
+    "openai": (0.15, 0.60),      # gpt-4o-mini
+    "anthropic": (3.00, 15.00),  # claude-sonnet-4
+}
+ANTHROPIC_CACHE_WRITE_FACTOR = 1.25
+ANTHROPIC_CACHE_READ_FACTOR = 0.1
+
+# Vergelijken van providers: standaard doelen als provider[:model]
+DEFAULT_COMPARE_TARGETS = ("ollama:gpt-oss:20b", "ollama:gemma2:9b", "openai", "anthropic")
+
+# Woorden die niets zeggen over relevantie (Nederlands en Engels)
+STOPWORDS = frozenset("""
+de het een en of van in op te is zijn was waren dat die dit deze er om aan met voor naar bij uit
+ook als dan maar niet geen wel nog al zo hoe wat wie waar waarom wanneer welke je jij u ik we wij
+hij zij ze hun hem haar mijn ons onze jullie men heeft hebben had kan kunnen moet moeten wordt
+worden werd zal zullen zou zouden over door tot tegen heel veel meer dus want omdat the a an and
+or of in on to is are was were be been that this these those it its for with as at by from about
+what who where why when which how do does did you your we our they their he she his her i my me
+not no yes so if but can could would should will just there here than then into out up down
+""".split())
+
+class DiskCache:
+    """
+    JSON cache on disk with a TTL and size-based LRU eviction.
+    Entries are stored as <sha256(key)>.json; the file mtime marks the last use.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, ttl: float):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return self.directory / f"{digest}.json"
+
+    def get(self, key: str):
+        """Return the cached value for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path, None)  # Markeer als recent gebruikt (LRU)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value and evict old entries if needed."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"key": key, "created": time.time(), "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError:
+            logging.warning(f"Kan cache niet schrijven in {self.directory}", exc_info=True)
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+# Token telling: echte tokenizer (tiktoken) als die lokaal beschikbaar is, anders een schatting
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+_tokenizer_ready = threading.Event()
+_token_counts = OrderedDict()  # sha1(tekst) -> aantal tokens (LRU)
+_token_counts_lock = threading.Lock()
+_TOKEN_ESTIMATE_PATTERN = re.compile(r"[^\W\d_]+|\d+|\S")
 
 
-def get_effective_limit(base_limit: int, prompt_length: int = 0) -> int:
-    """Bereken effectieve transcript limiet minus prompt overhead."""
-    effective = base_limit - PROMPT_OVERHEAD - prompt_length
-    return max(effective, 1000)  # Minimaal 1000 karakters
+def _load_tokenizer():
+    global _tokenizer
+    try:
+        import tiktoken
+        # Downloadt de encoding bij het eerste gebruik (zonder timeout)
+        tokenizer = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        perf_logger.info("Geen tokenizer beschikbaar, tokens worden geschat")
+    else:
+        _tokenizer = tokenizer
+        with _token_counts_lock:
+            _token_counts.clear()  # Geschatte tellingen niet meer gebruiken
+    finally:
+        _tokenizer_ready.set()
+
+
+def get_tokenizer():
+    """
+    Return the tiktoken o200k_base encoding, or None if it isn't available (yet).
+    The encoding is loaded on a background thread; the first caller waits at
+    most TOKENIZER_LOAD_TIMEOUT seconds for it, after that tokens are
+    estimated until the load finishes.
+    """
+    global _tokenizer_loaded
+    with _tokenizer_lock:
+        start = not _tokenizer_loaded
+        _tokenizer_loaded = True
+    if start:
+        threading.Thread(target=_load_tokenizer, daemon=True).start()
+        _tokenizer_ready.wait(TOKENIZER_LOAD_TIMEOUT)
+    return _tokenizer
+
+
+def _estimate_piece_tokens(piece: str) -> int:
+    if piece[0].isdigit():
+        return -(-len(piece) // ESTIMATE_DIGITS_PER_TOKEN)
+    if piece[0].isalpha():
+        return -(-len(piece) // ESTIMATE_CHARS_PER_TOKEN)
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text without a tokenizer (linear time)."""
+    return sum(_estimate_piece_tokens(m.group()) for m in _TOKEN_ESTIMATE_PATTERN.finditer(text))
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text with the local tokenizer, or estimate them.
+    Counts of long texts (transcripts) are cached.
+    """
+    if len(text) < 1000:
+        tokenizer = get_tokenizer()
+        return len(tokenizer.encode(text, disallowed_special=())) if tokenizer else estimate_tokens(text)
+
+    key = hashlib.sha1(text.encode('utf-8')).digest()
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+
+    tokenizer = get_tokenizer()
+    count = len(tokenizer.encode(text, disallowed_special=())) if tokenizer else estimate_tokens(text)
+
+    with _token_counts_lock:
+        _token_counts[key] = count
+        while len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+
+def fit_to_tokens(text: str, max_tokens: int) -> str:
+    """Return the longest prefix of text that fits in max_tokens, cut on a line boundary if possible."""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    tokenizer = get_tokenizer()
+    if tokenizer:
+        cut = len(tokenizer.decode(tokenizer.encode(text, disallowed_special=())[:max_tokens]))
+    else:
+        used = 0
+        cut = len(text)
+        for match in _TOKEN_ESTIMATE_PATTERN.finditer(text):
+            used += _estimate_piece_tokens(match.group())
+            if used > max_tokens:
+                cut = match.start()
+                break
+
+    boundary = text.rfind('\n', 0, cut)
+    if boundary > cut * 0.9:
+        cut = boundary
+    return text[:cut]
+
+
+def model_key(provider: str, model: Optional[str] = None) -> str:
+    """Key into CONTEXT_TOKENS / TRANSCRIPT_TOKEN_LIMITS for a provider and model."""
+    if provider == "ollama":
+        return "ollama_gemma2" if "gemma" in (model or "").lower() else "ollama_gpt-oss"
+    return provider
+
+
+def get_transcript_budget(provider: str, model: Optional[str], purpose: str, prompt_tokens: int = 0) -> int:
+    """
+    Number of transcript tokens that fit in one request.
+    purpose is "summary" or "chat"; prompt_tokens counts everything else in
+    the request (instructions, chat history, question). The model's output
+    tokens and a safety margin are reserved as well.
+    """
+    key = model_key(provider, model)
+    options = (SUMMARY_OPTIONS if purpose == "summary" else CHAT_OPTIONS)[provider]
+    output_tokens = options.get("num_predict") or options.get("max_tokens", 0)
+
+    budget = int(CONTEXT_TOKENS[key] * (1 - TOKEN_SAFETY_MARGIN)) - output_tokens - prompt_tokens
+    limit = TRANSCRIPT_TOKEN_LIMITS.get(f"{key}_{purpose}")
+    if limit:
+        budget = min(budget, limit)
+    return max(budget, MIN_TRANSCRIPT_TOKENS)
+
+
+def ollama_options(options: dict, model: Optional[str]) -> dict:
+    """Generation options for Ollama including the context window (num_ctx)."""
+    return {**options, "num_ctx": CONTEXT_TOKENS[model_key("ollama", model)]}
+
+
+# Client registry: gedeelde requests sessies en SDK clients (per API key)
+_clients = {}
+_clients_lock = threading.RLock()
+
+
+def _get_client(key: tuple, factory):
+    """Return the shared client for key, creating it once with factory()."""
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def preload_dependencies():
+    """Import the heavy dependencies ahead of first use (meant for a background thread)."""
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            logging.warning(f"Kan {name} niet laden", exc_info=True)
+
+
+def get_http_session(name: str = "default") -> "requests.Session":
+    """Return a shared, pooled requests.Session (one per name, keep-alive)."""
+    def create():
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                                pool_maxsize=HTTP_POOL_MAXSIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    return _get_client(("http", name), create)
+
+
+def get_transcript_api() -> "YouTubeTranscriptApi":
+    """Return a shared YouTubeTranscriptApi that uses a pooled session."""
+    def create():
+        from youtube_transcript_api import YouTubeTranscriptApi
+        return YouTubeTranscriptApi(http_client=get_http_session("youtube"))
+    return _get_client(("youtube_transcript_api",), create)
+
+
+def _sdk_http_client(client_class):
+    """
+    Build the SDK's default httpx client with our pool size and keep-alive.
+    Returns None (SDK defaults) when httpx itself can't be imported.
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return client_class(limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE,
+                                            max_keepalive_connections=HTTP_POOL_MAXSIZE,
+                                            keepalive_expiry=HTTP_KEEPALIVE_SECONDS))
+
+
+def get_openai_client(api_key: str):
+    """Return a cached OpenAI client for this API key."""
+    def create():
+        from openai import OpenAI, DefaultHttpxClient
+        return OpenAI(api_key=api_key, http_client=_sdk_http_client(DefaultHttpxClient))
+    return _get_client(("openai", api_key), create)
+
+
+def get_anthropic_client(api_key: str):
+    """Return a cached Anthropic client for this API key."""
+    def create():
+        import anthropic
+        return anthropic.Anthropic(api_key=api_key, http_client=_sdk_http_client(anthropic.DefaultHttpxClient))
+    return _get_client(("anthropic", api_key), create)
+
+
+TRANSCRIPT_CACHE = DiskCache(CACHE_DIR / "transcripts", TRANSCRIPT_CACHE_MAX_BYTES, TRANSCRIPT_CACHE_TTL)
+SUMMARY_CACHE = DiskCache(CACHE_DIR / "summaries", SUMMARY_CACHE_MAX_BYTES, SUMMARY_CACHE_TTL)
 
 # Samenvatting prompt - "Granulaire Systeem-Analist"
 SUMMARY_PROMPT = """BELANGRIJK: Schrijf de VOLLEDIGE samenvatting in het NEDERLANDS.
@@ -68,6 +518,9 @@ Rol: Treed op als een Senior Technical Lead en Systeemarchitect. Je doel is om e
 Gouden Regel voor Specificiteit:
 Vermijd vage generalisaties (zoals "men bespreekt AI-modellen" of "er is vooruitgang"). Gebruik in plaats daarvan de exacte eigennamen, versienummers, tools, bibliotheken en wetenschappelijke parameters die in de video worden genoemd. Als er wordt gesproken over "Claude Code in VS Code om een agent te bouwen", noteer dan exact die combinatie.
 
+Tijdstempels: als de transcriptie markeringen als [12:34] bevat, zet dan bij de belangrijkste punten
+het tijdstip waarop het in de video besproken wordt, in precies die vorm (bijv. [12:34] of [1:02:03]).
+
 Hanteer deze structuur:
 
 ## Core Thesis (Het Fundament)
@@ -95,6 +548,26 @@ Negatieve Constraints (Wat NIET te doen):
 """
 
 
+# Map-stap: notities per deel van een lange transcriptie
+CHUNK_PROMPT = """BELANGRIJK: Schrijf in het NEDERLANDS.
+
+Je krijgt één deel van een langere transcriptie. De delen worden later samengevoegd tot één samenvatting.
+Maak compacte notities van dit deel (maximaal ~400 woorden):
+- Noem alle specifieke tools, modellen, API's, versienummers, namen en getallen letterlijk
+- Beschrijf concrete workflows, technische uitleg en genoemde beperkingen
+- Noteer voorspellingen of conclusies
+- Neem tijdmarkeringen als [12:34] over bij de punten waar ze bij horen
+- Geen inleiding, geen afsluiting, geen grappen of bantering
+"""
+
+# Reduce-stap: notities van alle delen samenvoegen tot de vaste structuur
+REDUCE_PROMPT = SUMMARY_PROMPT + """
+---
+LET OP: Hieronder staat geen ruwe transcriptie, maar notities van opeenvolgende delen van dezelfde video (in chronologische volgorde).
+Voeg ze samen tot één samenhangende samenvatting volgens bovenstaande structuur. Verwijder dubbelingen en behoud alle specifieke namen, versies en getallen.
+"""
+
+
 def extract_video_id(url: str) -> Optional[str]:
     """Extract video ID from various YouTube URL formats."""
     patterns = [
@@ -108,27 +581,257 @@ def extract_video_id(url: str) -> Optional[str]:
     return None
 
 
-def get_video_title(video_id: str) -> str:
+def get_video_title(video_id: str, use_cache: bool = True) -> str:
     """Get video title from YouTube (basic method without API key)."""
+    if use_cache:
+        cached = TRANSCRIPT_CACHE.get(f"title:{video_id}")
+        if cached:
+            return cached
+
     try:
         url = f"https://www.youtube.com/watch?v={video_id}"
-        response = requests.get(url, timeout=10)
+        response = get_http_session("youtube").get(url, timeout=10)
         match = re.search(r'<title>(.+?) - YouTube</title>', response.text)
         if match:
             title = match.group(1)
             # Clean title for filename
-            return re.sub(r'[<>:"/\\|?*]', '', title)[:100]
+            title = re.sub(r'[<>:"/\\|?*]', '', title)[:100]
+            if use_cache:
+                TRANSCRIPT_CACHE.set(f"title:{video_id}", title)
+            return title
     except Exception:
         pass
     return f"video_{video_id}"
 
 
-def get_transcript(video_id: str) -> Tuple[str, str]:
+def get_cached_transcript(video_id: str) -> Optional[Tuple[str, str]]:
+    """Return (transcript_text, language) from the transcript cache, or None."""
+    # De taalkeuze hangt af van wat YouTube aanbiedt; onthoud welke taal gekozen is
+    lang = TRANSCRIPT_CACHE.get(f"transcript:{video_id}")
+    if not lang:
+        return None
+    text = TRANSCRIPT_CACHE.get(f"transcript:{video_id}:{lang}")
+    if text is None:
+        return None
+    return text, lang
+
+
+_TIMESTAMP_PATTERN = re.compile(r'\[(\d{1,2}(?::\d{2}){1,2})\]')
+_SENTENCE_ENDS = ('.', '!', '?', '…', '."', '?"', '!"')
+# Geluidsmarkeringen als [Music], [Muziek], (applause), ♪ en >> (sprekerwissel)
+_NON_SPEECH_PATTERN = re.compile(
+    r'\[[^\]\d]*\]|\((?:music|muziek|applause|applaus|laughter|gelach|lacht|inaudible|onverstaanbaar)\)|[♪♫]+|>>',
+    re.IGNORECASE)
+_FILLER_PATTERN = re.compile(r'\b(?:u+h+|u+m+|uhm+|erm|e+h+m*|euh+|hmm+)\b[,.]?', re.IGNORECASE)
+_WORD_KEY_PATTERN = re.compile(r'\W+')
+
+
+def format_timestamp(seconds: float) -> str:
+    """Video position as m:ss or h:mm:ss."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+def parse_timestamp(text: str) -> int:
+    """Seconds of an m:ss or h:mm:ss timestamp."""
+    seconds = 0
+    for part in text.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+
+def timestamp_url(video_id: str, seconds: float) -> str:
+    """Link to a position in the video."""
+    return f"https://youtube.com/watch?v={video_id}&t={int(seconds)}s"
+
+
+class TranscriptSegments:
+    """
+    Timed transcript segments in compact form: the joined transcript text
+    (segments separated by newlines, as get_transcript returns it) plus
+    parallel arrays with the text offset, start and duration per segment,
+    instead of an object per segment. Indexing and iteration still give
+    (start, duration, text) tuples; time_at() maps a text offset to its
+    timestamp by binary search.
+    """
+    __slots__ = ("text", "offsets", "starts", "durations")
+
+    def __init__(self, text: str = "", offsets=(), starts=(), durations=()):
+        self.text = text
+        self.offsets = array('q', offsets)
+        self.starts = array('d', starts)
+        self.durations = array('d', durations)
+
+    @classmethod
+    def from_entries(cls, entries, reflow: bool = False) -> "TranscriptSegments":
+        """
+        Build from (start, duration, text) entries or transcript snippets (one
+        pass). Segments are separated by newlines, or with reflow by spaces
+        with a newline after each sentence (or NORMALIZE_LINE_CHARS).
+        """
+        segments = cls()
+        parts = []
+        offset = 0
+        line_start = 0
+        for entry in entries:
+            start, duration, text = entry if isinstance(entry, (tuple, list)) else (entry.start, entry.duration, entry.text)
+            if parts:
+                newline = not reflow or parts[-1].endswith(_SENTENCE_ENDS) or offset - line_start >= NORMALIZE_LINE_CHARS
+                parts.append("\n" if newline else " ")
+                offset += 1
+                if newline:
+                    line_start = offset
+            segments.offsets.append(offset)
+            segments.starts.append(start)
+            segments.durations.append(duration)
+            parts.append(text)
+            offset += len(text)
+        segments.text = "".join(parts)
+        return segments
+
+    @classmethod
+    def from_cache(cls, text: str, data) -> "TranscriptSegments":
+        """Rebuild from a cached transcript and to_cache() data (or an older list of entries)."""
+        if isinstance(data, list):
+            return cls.from_entries(data)
+        return cls(text, data["offsets"], data["starts"], data["durations"])
+
+    def to_cache(self) -> dict:
+        """Offsets/starts/durations for the JSON cache (the text is cached separately)."""
+        return {"offsets": self.offsets.tolist(), "starts": self.starts.tolist(),
+                "durations": self.durations.tolist()}
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, i: int) -> Tuple[float, float, str]:
+        if i < 0:
+            i += len(self)
+        end = self.offsets[i + 1] - 1 if i + 1 < len(self) else len(self.text)
+        return self.starts[i], self.durations[i], self.text[self.offsets[i]:end]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def index_at(self, offset: int) -> int:
+        """Index of the segment containing text offset."""
+        return max(bisect.bisect_right(self.offsets, offset) - 1, 0)
+
+    def time_at(self, offset: int) -> Optional[float]:
+        """Start time (seconds) of the segment containing text offset."""
+        return self.starts[self.index_at(offset)] if len(self) else None
+
+    def timed_text(self, interval: int = TIMESTAMP_INTERVAL) -> str:
+        """The text with a [m:ss] marker before the first segment of every interval seconds."""
+        if not len(self):
+            return self.text
+        parts = []
+        position = 0
+        next_mark = 0.0
+        for i in range(len(self)):
+            if self.starts[i] >= next_mark:
+                offset = self.offsets[i]
+                parts.append(self.text[position:offset])
+                parts.append(f"[{format_timestamp(self.starts[i])}] ")
+                position = offset
+                next_mark = (self.starts[i] // interval + 1) * interval
+        parts.append(self.text[position:])
+        return "".join(parts)
+
+
+def timed_transcript(transcript: str, segments) -> str:
+    """transcript with [m:ss] markers when its timed segments are known, else unchanged."""
+    if isinstance(segments, TranscriptSegments) and len(segments) and segments.text == transcript:
+        return segments.timed_text()
+    return transcript
+
+
+def _repeated_prefix(previous: str, keys: list) -> int:
+    """
+    Number of leading words of a segment (comparison keys) that repeat the
+    previous segment: its last caption line or the whole segment, as
+    rolling auto-captions show them again. Shorter overlaps are kept, they
+    are usually real repetitions ("you know, you know").
+    """
+    lines = [line.split() for line in previous.split("\n") if line.strip()]
+    candidates = [[word for line in lines for word in line]] + lines[-1:]
+    for words in candidates:
+        repeated = [_WORD_KEY_PATTERN.sub("", word.lower()) for word in words]
+        if repeated and keys[:len(repeated)] == repeated:
+            return len(repeated)
+    return 0
+
+
+def normalize_transcript(segments: TranscriptSegments, remove_fillers: bool = NORMALIZE_FILLERS) -> TranscriptSegments:
+    """
+    Clean a transcript before it goes to a model, in one pass over the
+    segments: strip non-speech markers ([Music], ♪, >>) and optionally
+    fillers (uh, ehm), drop words that repeat the last line of the previous
+    segment (rolling auto-captions) and reflow the lines into sentences.
+    Segment timestamps are kept; segments left empty are dropped. Returns
+    new TranscriptSegments (text only when segments has no timings).
+    """
+    timed = len(segments) > 0
+    entries = segments if timed else ((0.0, 0.0, line) for line in segments.text.split("\n"))
+
+    def clean(entries):
+        previous = ""
+        for start, duration, text in entries:
+            text = _NON_SPEECH_PATTERN.sub(" ", text)
+            if remove_fillers:
+                text = _FILLER_PATTERN.sub(" ", text)
+            words = text.split()
+            if not words:
+                continue
+            keys = [_WORD_KEY_PATTERN.sub("", word.lower()) for word in words]
+            repeated = _repeated_prefix(previous, keys)
+            previous = text
+            if words[repeated:]:
+                yield start, duration, " ".join(words[repeated:])
+
+    normalized = TranscriptSegments.from_entries(clean(entries), reflow=True)
+    return normalized if timed else TranscriptSegments(normalized.text)
+
+
+def get_cached_segments(video_id: str, lang: str, text: str) -> TranscriptSegments:
+    """Timed segments of a cached transcript (empty for older cache entries)."""
+    data = TRANSCRIPT_CACHE.get(f"segments:{video_id}:{lang}")
+    if not data:
+        return TranscriptSegments(text)
+    return TranscriptSegments.from_cache(text, data)
+
+
+def cache_transcript(video_id: str, text: str, lang: str, segments: Optional[TranscriptSegments] = None):
+    """Store a transcript (and its timed segments) in the cache, keyed by video ID and language."""
+    TRANSCRIPT_CACHE.set(f"transcript:{video_id}:{lang}", text)
+    if segments:
+        TRANSCRIPT_CACHE.set(f"segments:{video_id}:{lang}", segments.to_cache())
+    TRANSCRIPT_CACHE.set(f"transcript:{video_id}", lang)
+
+
+def get_transcript(video_id: str, use_cache: bool = True) -> Tuple[str, str]:
     """
     Get transcript from YouTube video.
     Returns (transcript_text, language)
+    Uses the on-disk transcript cache first unless use_cache is False.
+    """
+    text, lang, _ = get_transcript_with_segments(video_id, use_cache)
+    return text, lang
+
+
+def get_transcript_with_segments(video_id: str, use_cache: bool = True) -> Tuple[str, str, TranscriptSegments]:
+    """
+    Get transcript from YouTube video with its timed segments.
+    Returns (transcript_text, language, TranscriptSegments); the text is segments.text.
     """
-    api = YouTubeTranscriptApi()
+    if use_cache:
+        cached = get_cached_transcript(video_id)
+        if cached:
+            return cached[0], cached[1], get_cached_segments(video_id, cached[1], cached[0])
+
+    from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+    api = get_transcript_api()
 
     try:
         # Get list of available transcripts
@@ -159,8 +862,11 @@ def get_transcript(video_id: str) -> Tuple[str, str]:
 
         # Fetch the transcript
         data = api.fetch(video_id, languages=[lang])
-        full_text = "\n".join([entry.text for entry in data])
-        return full_text, lang
+        segments = TranscriptSegments.from_entries(data)
+        full_text = segments.text
+        if use_cache:
+            cache_transcript(video_id, full_text, lang, segments)
+        return full_text, lang, segments
 
     except TranscriptsDisabled:
         logging.warning(f"Transcripties uitgeschakeld voor video {video_id}")
@@ -173,18 +879,87 @@ def get_transcript(video_id: str) -> Tuple[str, str]:
         raise Exception(f"Fout bij ophalen transcriptie: {type(e).__name__}: {str(e)}")
 
 
-def summarize_with_ollama(text: str, model: str = "gpt-oss:20b") -> str:
-    """Summarize text using local Ollama."""
-    # Use model-specific limit, minus prompt overhead
-    if "gemma" in model.lower():
-        base_limit = TRANSCRIPT_LIMITS["ollama_gemma2_summary"]
-    else:
-        base_limit = TRANSCRIPT_LIMITS["ollama_gpt-oss_summary"]
+def ollama_request(endpoint: str, payload: dict, timeout: int, on_token=None) -> Tuple[str, dict]:
+    """
+    POST to an Ollama endpoint (/api/generate or /api/chat).
+    Returns (text, final_response); the final response holds Ollama's
+    timing fields. With on_token, the NDJSON stream is consumed and every
+    token is passed to on_token(token) as soon as it arrives.
+    """
+    url = f"{OLLAMA_URL}{endpoint}"
+    session = get_http_session("ollama")
+    if on_token is None:
+        response = session.post(url, json={**payload, "stream": False}, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+        return _ollama_text(data), data
+
+    parts = []
+    data = {}
+    with session.post(url, json={**payload, "stream": True}, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if data.get("error"):
+                raise Exception(data["error"])
+            token = _ollama_text(data)
+            if token:
+                parts.append(token)
+                on_token(token)
+            if data.get("done"):
+                break
+    return "".join(parts), data
+
+
+def _ollama_text(data: dict) -> str:
+    """Text of one Ollama response chunk (generate: "response", chat: "message.content")."""
+    if "message" in data:
+        return data["message"].get("content", "")
+    return data.get("response", "")
+
 
-    effective_limit = get_effective_limit(base_limit, len(SUMMARY_PROMPT))
-    truncated_text = text[:effective_limit]
+def ollama_generate(payload: dict, timeout: int, on_token=None) -> str:
+    """Call Ollama /api/generate and return the generated text."""
+    return ollama_request("/api/generate", payload, timeout, on_token)[0]
 
-    prompt = f"""{SUMMARY_PROMPT}
+
+def add_ollama_timing(usage: Optional[dict], data: dict):
+    """
+    Add the token counts and prefill timing of a final Ollama response to usage.
+    prompt_eval_count only counts prompt tokens that were not in the KV-cache,
+    so on follow-up questions both the count and the prefill time drop.
+    """
+    prefill_ms = data.get("prompt_eval_duration", 0) / 1e6
+    prefill_tokens = data.get("prompt_eval_count", 0)
+    eval_seconds = data.get("eval_duration", 0) / 1e9
+    eval_tokens = data.get("eval_count", 0)
+    perf_logger.info(f"Ollama chat: prefill {prefill_tokens} tokens in {prefill_ms:.0f} ms, "
+                     f"{eval_tokens} tokens gegenereerd in {eval_seconds:.1f} s")
+    if usage is None:
+        return
+    add_usage(usage, {"input_tokens": prefill_tokens, "output_tokens": eval_tokens})
+    usage["last_prefill_ms"] = prefill_ms
+    usage["last_prefill_tokens"] = prefill_tokens
+    usage.setdefault("first_prefill_ms", prefill_ms)
+    usage.setdefault("first_prefill_tokens", prefill_tokens)
+    if eval_seconds:
+        usage["last_tokens_per_second"] = eval_tokens / eval_seconds
+
+
+def summarize_with_ollama(text: str, model: str = "gpt-oss:20b", prompt: str = SUMMARY_PROMPT,
+                          on_token=None, usage: Optional[dict] = None) -> str:
+    """
+    Summarize text using local Ollama (streams tokens to on_token when given).
+    Token counts are added to usage when given.
+    """
+    import requests
+    # Use model-specific token budget, minus prompt
+    budget = get_transcript_budget("ollama", model, "summary", count_tokens(prompt))
+    truncated_text = fit_to_tokens(text, budget)
+
+    full_prompt = f"""{prompt}
 
 ---
 TRANSCRIPTIE:
@@ -192,21 +967,19 @@ TRANSCRIPTIE:
 """
 
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
+        summary, final = ollama_request(
+            "/api/generate",
+            {
                 "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,
-                    "num_predict": 2000
-                }
+                "prompt": full_prompt,
+                "options": ollama_options(SUMMARY_OPTIONS["ollama"], model),
+                "keep_alive": OLLAMA_KEEP_ALIVE
             },
-            timeout=300  # 5 minutes timeout for local model
+            timeout=300,  # 5 minutes timeout for local model
+            on_token=on_token
         )
-        response.raise_for_status()
-        return response.json()["response"]
+        add_usage(usage, {"input_tokens": final.get("prompt_eval_count"), "output_tokens": final.get("eval_count")})
+        return summary
     except requests.exceptions.ConnectionError:
         logging.error("Kan geen verbinding maken met Ollama")
         raise Exception("Kan geen verbinding maken met Ollama. Is Ollama actief?")
@@ -218,71 +991,287 @@ TRANSCRIPTIE:
         raise Exception(f"Ollama fout: {type(e).__name__}: {str(e)}")
 
 
-def summarize_with_openai(text: str, api_key: str) -> str:
-    """Summarize text using OpenAI API."""
-    from openai import OpenAI
+def stream_openai_text(client, usage: Optional[dict] = None, **request):
+    """
+    Yield text deltas from a streaming OpenAI chat completion.
+    The token usage (sent in a last chunk) is added to usage when given.
+    """
+    if usage is not None:
+        request["stream_options"] = {"include_usage": True}
+    for chunk in client.chat.completions.create(stream=True, **request):
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+        if usage is not None and getattr(chunk, "usage", None):
+            add_usage(usage, chunk.usage)
+
 
-    client = OpenAI(api_key=api_key)
-    effective_limit = get_effective_limit(TRANSCRIPT_LIMITS["openai_summary"], len(SUMMARY_PROMPT))
-    truncated_text = text[:effective_limit]
+def stream_anthropic_text(client, usage: Optional[dict] = None, **request):
+    """
+    Yield text deltas from a streaming Anthropic message.
+    The token usage of the final message is added to usage when given.
+    """
+    with client.messages.stream(**request) as stream:
+        yield from stream.text_stream
+        if usage is not None:
+            add_usage(usage, stream.get_final_message().usage)
+
+
+_usage_lock = threading.Lock()
+
+
+def add_usage(usage: Optional[dict], counts):
+    """
+    Add the token counts of an API response (object or dict) to a usage dict.
+    Thread-safe, so parallel map-reduce calls can share one usage dict.
+    """
+    if usage is None or counts is None:
+        return
+    with _usage_lock:
+        for name in USAGE_FIELDS + tuple(USAGE_ALIASES):
+            value = counts.get(name) if isinstance(counts, dict) else getattr(counts, name, None)
+            if isinstance(value, int) and value:
+                field = USAGE_ALIASES.get(name, name)
+                usage[field] = usage.get(field, 0) + value
+        usage["requests"] = usage.get("requests", 0) + 1
+
+
+def estimate_cost(provider: str, usage: dict) -> float:
+    """Estimated cost in USD of the token counts in usage (see TOKEN_PRICES)."""
+    input_price, output_price = TOKEN_PRICES.get(provider, (0.0, 0.0))
+    input_tokens = (usage.get("input_tokens", 0)
+                    + usage.get("cache_creation_input_tokens", 0) * ANTHROPIC_CACHE_WRITE_FACTOR
+                    + usage.get("cache_read_input_tokens", 0) * ANTHROPIC_CACHE_READ_FACTOR)
+    return (input_tokens * input_price + usage.get("output_tokens", 0) * output_price) / 1e6
+
+
+def collect_stream(deltas, on_token) -> str:
+    """Pass every text delta to on_token and return the assembled text."""
+    parts = []
+    for delta in deltas:
+        parts.append(delta)
+        on_token(delta)
+    return "".join(parts)
+
+
+def summarize_with_openai(text: str, api_key: str, prompt: str = SUMMARY_PROMPT, on_token=None,
+                          usage: Optional[dict] = None) -> str:
+    """
+    Summarize text using OpenAI API (streams tokens to on_token when given).
+    Token counts are added to usage when given.
+    """
+    client = get_openai_client(api_key)
+    budget = get_transcript_budget("openai", None, "summary", count_tokens(prompt))
+    truncated_text = fit_to_tokens(text, budget)
+
+    request = dict(
+        model=DEFAULT_MODELS["openai"],
+        messages=[
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": f"TRANSCRIPTIE:\n{truncated_text}"}
+        ],
+        **SUMMARY_OPTIONS["openai"]
+    )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": SUMMARY_PROMPT},
-                {"role": "user", "content": f"TRANSCRIPTIE:\n{truncated_text}"}
-            ],
-            temperature=0.3,
-            max_tokens=4000
-        )
+        if on_token:
+            return collect_stream(stream_openai_text(client, usage, **request), on_token)
+        response = client.chat.completions.create(**request)
+        add_usage(usage, response.usage)
         return response.choices[0].message.content
     except Exception as e:
         logging.error("OpenAI API fout", exc_info=True)
         raise Exception(f"OpenAI fout: {type(e).__name__}: {str(e)}")
 
 
-def summarize_with_anthropic(text: str, api_key: str) -> str:
-    """Summarize text using Anthropic API."""
-    import anthropic
-
-    client = anthropic.Anthropic(api_key=api_key)
-    effective_limit = get_effective_limit(TRANSCRIPT_LIMITS["anthropic_summary"], len(SUMMARY_PROMPT))
-    truncated_text = text[:effective_limit]
+def summarize_with_anthropic(text: str, api_key: str, prompt: str = SUMMARY_PROMPT, on_token=None,
+                             usage: Optional[dict] = None) -> str:
+    """
+    Summarize text using Anthropic API (streams tokens to on_token when given).
+    Token counts are added to usage when given.
+    """
+    client = get_anthropic_client(api_key)
+    budget = get_transcript_budget("anthropic", None, "summary", count_tokens(prompt))
+    truncated_text = fit_to_tokens(text, budget)
+
+    request = dict(
+        model=DEFAULT_MODELS["anthropic"],
+        messages=[
+            {
+                "role": "user",
+                "content": f"{prompt}\n\n---\nTRANSCRIPTIE:\n{truncated_text}"
+            }
+        ],
+        **SUMMARY_OPTIONS["anthropic"]
+    )
 
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"{SUMMARY_PROMPT}\n\n---\nTRANSCRIPTIE:\n{truncated_text}"
-                }
-            ]
-        )
+        if on_token:
+            return collect_stream(stream_anthropic_text(client, usage, **request), on_token)
+        response = client.messages.create(**request)
+        add_usage(usage, response.usage)
         return response.content[0].text
     except Exception as e:
         logging.error("Anthropic API fout", exc_info=True)
         raise Exception(f"Anthropic fout: {type(e).__name__}: {str(e)}")
 
 
-def summarize(text: str, provider: str, api_key: Optional[str] = None, model: str = None) -> str:
-    """Summarize text using specified provider."""
+def split_transcript(text: str, max_tokens: int) -> list:
+    """
+    Split a transcript into chunks of at most max_tokens tokens.
+    Splits on segment (line) boundaries, falls back to sentence boundaries
+    and only cuts hard inside a sentence when a single sentence is too long.
+    """
+    pieces = []
+    for line in text.split('\n'):
+        line_tokens = count_tokens(line)
+        if line_tokens <= max_tokens:
+            pieces.append((line, line_tokens))
+            continue
+        for sentence in re.split(r'(?<=[.!?])\s+', line):
+            while count_tokens(sentence) > max_tokens:
+                head = fit_to_tokens(sentence, max_tokens) or sentence[:max_tokens]
+                pieces.append((head, count_tokens(head)))
+                sentence = sentence[len(head):]
+            pieces.append((sentence, count_tokens(sentence)))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece, piece_tokens in pieces:
+        if current and current_tokens + piece_tokens + 1 > max_tokens:
+            chunks.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def summarize_chunked(text: str, summarize_fn, chunk_tokens: int, reduce_tokens: int, workers: int,
+                      progress_callback=None, on_token=None) -> str:
+    """
+    Map-reduce summary for transcripts that don't fit in one request.
+    summarize_fn(text, prompt, on_token=None) does a single provider call.
+    The chunks (at most chunk_tokens each) are summarized in parallel (at
+    most `workers` at a time), then the notes are merged into the
+    SUMMARY_PROMPT structure with REDUCE_PROMPT (input at most reduce_tokens).
+    Notes that are still too long get another map pass over the notes;
+    raises when a pass doesn't make them shorter.
+    Only the final reduce pass is streamed to on_token.
+    """
+    while True:
+        chunks = split_transcript(text, chunk_tokens)
+
+        notes = [None] * len(chunks)
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as pool:
+            futures = {pool.submit(summarize_fn, chunk, CHUNK_PROMPT): i for i, chunk in enumerate(chunks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                notes[futures[future]] = future.result()
+                if progress_callback:
+                    progress_callback(f"Deel {done}/{len(chunks)} samengevat...")
+
+        combined = "\n\n".join(f"### Deel {i}\n{note.strip()}" for i, note in enumerate(notes, 1))
+        combined_tokens = count_tokens(combined)
+        if combined_tokens <= reduce_tokens:
+            break
+        # Notities nog te lang voor de reduce-stap: nog een map-ronde over de notities
+        if combined_tokens >= count_tokens(text):
+            raise Exception(f"Notities blijven te lang om samen te voegen ({combined_tokens} tokens, "
+                            f"maximaal {reduce_tokens}).")
+        if progress_callback:
+            progress_callback(f"Notities nog te lang ({combined_tokens} tokens), opnieuw samenvatten...")
+        text = combined
+
+    if progress_callback:
+        progress_callback("Delen samenvoegen tot één samenvatting...")
+    return summarize_fn(combined, REDUCE_PROMPT, on_token=on_token)
+
+
+def get_summarize_fn(provider: str, api_key: Optional[str] = None, model: str = None,
+                     usage: Optional[dict] = None):
+    """
+    Return summarize_fn(text, prompt, on_token=None) doing a single call to the provider.
+    Token counts of every call are added to usage when given.
+    """
     if provider == "ollama":
-        return summarize_with_ollama(text, model or "gpt-oss:20b")
+        model = model or DEFAULT_MODELS["ollama"]
+        return lambda chunk, prompt, on_token=None: summarize_with_ollama(chunk, model, prompt, on_token, usage)
     elif provider == "openai":
         if not api_key:
             raise Exception("OpenAI API key is vereist.")
-        return summarize_with_openai(text, api_key)
+        return lambda chunk, prompt, on_token=None: summarize_with_openai(chunk, api_key, prompt, on_token, usage)
     elif provider == "anthropic":
         if not api_key:
             raise Exception("Anthropic API key is vereist.")
-        return summarize_with_anthropic(text, api_key)
+        return lambda chunk, prompt, on_token=None: summarize_with_anthropic(chunk, api_key, prompt, on_token, usage)
     else:
         raise Exception(f"Onbekende provider: {provider}")
 
 
+def limit_summarize_fn(summarize_fn, semaphore, waited: Optional[list] = None):
+    """
+    Wrap summarize_fn so every provider call holds a slot of semaphore.
+    The seconds each call waited for its slot are appended to waited.
+    """
+    def call(chunk, prompt, on_token=None):
+        start = time.perf_counter()
+        with semaphore:
+            if waited is not None:
+                waited.append(time.perf_counter() - start)
+            return summarize_fn(chunk, prompt, on_token=on_token)
+    return call
+
+
+def summarize(text: str, provider: str, api_key: Optional[str] = None, model: str = None,
+              chunked: bool = True, progress_callback=None, on_token=None,
+              usage: Optional[dict] = None, llm_semaphore=None, waited: Optional[list] = None) -> str:
+    """
+    Summarize text using specified provider.
+    Transcripts longer than the provider token budget are summarized in parts
+    (map-reduce) when chunked is True, otherwise they are truncated.
+    With on_token, the final summary is streamed token by token.
+    Token counts of all calls are added to usage when given.
+    With llm_semaphore, every single provider call (also each chunk of a
+    map-reduce) holds one of its slots; wait times are appended to waited.
+    """
+    summarize_fn = get_summarize_fn(provider, api_key, model, usage)
+    if llm_semaphore is not None:
+        summarize_fn = limit_summarize_fn(summarize_fn, llm_semaphore, waited)
+    budget = get_transcript_budget(provider, model, "summary", count_tokens(SUMMARY_PROMPT))
+    if not chunked or count_tokens(text) <= budget:
+        return summarize_fn(text, SUMMARY_PROMPT, on_token=on_token)
+
+    chunk_tokens = get_transcript_budget(provider, model, "summary", count_tokens(CHUNK_PROMPT))
+    reduce_tokens = get_transcript_budget(provider, model, "summary", count_tokens(REDUCE_PROMPT))
+    return summarize_chunked(text, summarize_fn, chunk_tokens, reduce_tokens, MAX_CHUNK_WORKERS[provider],
+                             progress_callback, on_token=on_token)
+
+
+def summary_cache_key(transcript: str, provider: str, model: Optional[str] = None,
+                      chunked: bool = True) -> str:
+    """
+    Build the summary cache key: a hash of the transcript, provider, model,
+    prompt text and generation options.
+    """
+    prompt = SUMMARY_PROMPT + (CHUNK_PROMPT + REDUCE_PROMPT if chunked else "")
+    # OpenAI/Anthropic gebruiken altijd hun standaard model
+    if provider != "ollama" or not model:
+        model = DEFAULT_MODELS.get(provider, model)
+    payload = {
+        "transcript": hashlib.sha256(transcript.encode('utf-8')).hexdigest(),
+        "provider": provider,
+        "model": model,
+        "prompt": hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        "options": SUMMARY_OPTIONS.get(provider),
+        "budget": get_transcript_budget(provider, model, "summary"),
+        "chunked": chunked,
+    }
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"summary:{digest}"
+
+
 # Chat system prompt - strikt gebaseerd op transcript
 CHAT_SYSTEM_PROMPT = """Je bent een Nederlandstalige assistent die vragen beantwoordt over een YouTube video.
 Je hebt ALLEEN toegang tot het transcript hieronder.
@@ -292,6 +1281,7 @@ STRIKTE REGELS:
 - Baseer je antwoord UITSLUITEND op het transcript
 - Als het antwoord niet in het transcript staat, zeg: "Dit staat niet in de video."
 - Citeer relevante passages uit het transcript waar mogelijk
+- Bevat het transcript tijdmarkeringen als [12:34], noem dan het tijdstip in die vorm bij je antwoord
 - Verzin NOOIT informatie die niet in het transcript staat
 - Als je onzeker bent, geef dat aan
 
@@ -299,42 +1289,313 @@ TRANSCRIPT:
 {transcript}"""
 
 
-def chat_with_ollama(transcript: str, question: str, chat_history: list, model: str = "gpt-oss:20b") -> str:
-    """Chat about transcript using local Ollama."""
-    # Use model-specific limit, minus prompt overhead
-    if "gemma" in model.lower():
-        base_limit = TRANSCRIPT_LIMITS["ollama_gemma2_chat"]
+# Chat system prompt voor retrieval: de passages staan bij elke vraag in het gebruikersbericht
+CHAT_RETRIEVAL_SYSTEM_PROMPT = """Je bent een Nederlandstalige assistent die vragen beantwoordt over een YouTube video.
+Bij elke vraag krijg je de relevantste FRAGMENTEN uit het transcript van de video. Je hebt ALLEEN toegang tot die fragmenten.
+
+STRIKTE REGELS:
+- Antwoord ALTIJD in het Nederlands
+- Baseer je antwoord UITSLUITEND op de fragmenten
+- Als het antwoord niet in de fragmenten staat, zeg: "Dit staat niet in de video."
+- Citeer relevante passages uit de fragmenten waar mogelijk
+- Bevatten de fragmenten tijdmarkeringen als [12:34], noem dan het tijdstip in die vorm bij je antwoord
+- Verzin NOOIT informatie die niet in de fragmenten staat
+- Als je onzeker bent, geef dat aan"""
+
+
+# Chat system prompt voor de bibliotheek: passages uit meerdere video's, genummerd als bron
+LIBRARY_CHAT_SYSTEM_PROMPT = """Je bent een Nederlandstalige assistent die vragen beantwoordt over een verzameling YouTube video's.
+Bij elke vraag krijg je genummerde FRAGMENTEN uit de transcripten, met de titel en het ID van de video en waar het fragment begint. Je hebt ALLEEN toegang tot die fragmenten.
+
+STRIKTE REGELS:
+- Antwoord ALTIJD in het Nederlands
+- Baseer je antwoord UITSLUITEND op de fragmenten
+- Zet na elke bewering de bron(nen) als [nummer], bijv. [2] of [1][4]
+- Noem per video wat erover gezegd wordt als de vraag meerdere video's betreft
+- Als het antwoord niet in de fragmenten staat, zeg: "Dit staat niet in de bibliotheek."
+- Verzin NOOIT informatie die niet in de fragmenten staat"""
+
+
+# Oudere chatbeurten samenvatten (incrementeel: vorige samenvatting + nieuwe beurten)
+HISTORY_SUMMARY_PROMPT = """BELANGRIJK: Schrijf in het NEDERLANDS.
+
+LET OP: Hieronder staat geen transcriptie, maar het begin van een chatgesprek over een YouTube video,
+eventueel voorafgegaan door de samenvatting van nog eerdere beurten.
+Werk de samenvatting van het gesprek bij (maximaal ~250 woorden):
+- Welke vragen zijn gesteld en wat waren de antwoorden in het kort
+- Behoud genoemde namen, tools, versies en getallen letterlijk
+- Noteer afspraken of voorkeuren van de gebruiker (bijv. gewenste vorm van antwoorden)
+- Geen inleiding of afsluiting, alleen de samenvatting
+"""
+
+
+def tokenize_terms(text: str) -> list:
+    """Lowercase search terms of text without stopwords (for BM25)."""
+    return [term for term in re.findall(r'\w+', text.lower())
+            if len(term) > 1 and term not in STOPWORDS]
+
+
+class TranscriptIndex:
+    """
+    In-memory BM25 index over the passages of one transcript.
+    Built once per video; each search only touches the posting lists of the
+    query terms.
+    """
+
+    def __init__(self, transcript: str, passage_tokens: int = RETRIEVAL_PASSAGE_TOKENS):
+        self.passages = split_transcript(transcript, passage_tokens)
+        self.postings = {}  # term -> [(passage index, term frequency)]
+        self.lengths = []
+        for i, passage in enumerate(self.passages):
+            terms = Counter(tokenize_terms(passage))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((i, tf))
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> list:
+        """Return the indices of the k best matching passages, best first."""
+        scores = {}
+        n = len(self.passages)
+        for term in set(tokenize_terms(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[i] / (self.avg_length or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def chat_history_budget(provider: str, model: Optional[str] = None) -> int:
+    """Tokens reserved for chat history and question in a chat request."""
+    return min(CHAT_HISTORY_TOKENS, CONTEXT_TOKENS[model_key(provider, model)] // 4)
+
+
+class ChatHistory:
+    """
+    Conversation of one chat session. Recent messages are kept verbatim;
+    compact() rolls older turns into a running summary, one summarize call
+    per compaction over only the previous summary and the new turns.
+    """
+
+    def __init__(self, provider: str, model: Optional[str] = None):
+        self.provider = provider
+        self.model = model
+        self.summary = ""
+        self.messages = []  # Letterlijke berichten die nog niet in de samenvatting zitten
+        self._tokens = []   # Aantal tokens per bericht in messages
+        self._compacting = False
+        self._lock = threading.Lock()
+
+    def add(self, question: str, answer: str):
+        """Append a question/answer turn."""
+        with self._lock:
+            for role, content in (("user", question), ("assistant", answer)):
+                self.messages.append({"role": role, "content": content})
+                self._tokens.append(count_tokens(content))
+
+    def snapshot(self) -> Tuple[str, list]:
+        """(summary, verbatim messages) as a consistent copy."""
+        with self._lock:
+            return self.summary, list(self.messages)
+
+    def _verbatim_budget(self) -> int:
+        return chat_history_budget(self.provider, self.model) - HISTORY_SUMMARY_TOKENS
+
+    def needs_compaction(self) -> bool:
+        """True when the verbatim messages take up too much of the history reserve."""
+        with self._lock:
+            return (not self._compacting and len(self.messages) > 2
+                    and sum(self._tokens) > self._verbatim_budget() * HISTORY_COMPACT_RATIO)
+
+    def compact(self, summarize_fn):
+        """
+        Fold the oldest turns into the summary until the verbatim messages use
+        at most half their budget; the last turn always stays verbatim.
+        summarize_fn(text, prompt) is a single provider call (see get_summarize_fn).
+        """
+        with self._lock:
+            if self._compacting:
+                return
+            remaining = sum(self._tokens)
+            fold = 0
+            # Hele beurten (vraag + antwoord) samenvatten
+            while fold < len(self.messages) - 2 and remaining > self._verbatim_budget() // 2:
+                remaining -= self._tokens[fold] + self._tokens[fold + 1]
+                fold += 2
+            if not fold:
+                return
+            self._compacting = True
+            previous, folded = self.summary, self.messages[:fold]
+
+        try:
+            text = "\n\n".join(("Gebruiker: " if msg["role"] == "user" else "Assistent: ") + msg["content"]
+                                for msg in folded)
+            if previous:
+                text = f"SAMENVATTING TOT NU TOE:\n{previous}\n\nNIEUWE BEURTEN:\n{text}"
+            summary = fit_to_tokens(summarize_fn(text, HISTORY_SUMMARY_PROMPT).strip(), HISTORY_SUMMARY_TOKENS)
+        except Exception:
+            logging.warning("Chatgeschiedenis samenvatten mislukt", exc_info=True)
+            with self._lock:
+                self._compacting = False
+            return
+
+        with self._lock:
+            # Nieuwe beurten zijn alleen achteraan toegevoegd; de eerste `fold` berichten zijn de samengevatte
+            self.summary = summary
+            del self.messages[:fold]
+            del self._tokens[:fold]
+            self._compacting = False
+
+
+def select_chat_history(chat_history, question: str, provider: str, model: Optional[str] = None) -> Tuple[str, list]:
+    """
+    (summary of older turns, recent messages) that fit in the history reserve
+    next to the question. chat_history is a ChatHistory or a list of messages.
+    """
+    if isinstance(chat_history, ChatHistory):
+        summary, messages = chat_history.snapshot()
     else:
-        base_limit = TRANSCRIPT_LIMITS["ollama_gpt-oss_chat"]
+        summary, messages = "", chat_history
 
-    # Chat prompt is kleiner dan summary prompt
-    chat_prompt_base_len = len(CHAT_SYSTEM_PROMPT) - len("{transcript}")
-    effective_limit = get_effective_limit(base_limit, chat_prompt_base_len)
-    system_prompt = CHAT_SYSTEM_PROMPT.format(transcript=transcript[:effective_limit])
+    budget = chat_history_budget(provider, model) - count_tokens(question)
+    if summary:
+        summary = fit_to_tokens(summary, max(min(HISTORY_SUMMARY_TOKENS, budget), 0))
+        budget -= count_tokens(summary)
 
-    # Build conversation context
-    messages_text = f"{system_prompt}\n\n"
-    for msg in chat_history[-10:]:  # Last 10 messages for context
-        role = "Gebruiker" if msg["role"] == "user" else "Assistent"
-        messages_text += f"{role}: {msg['content']}\n\n"
-    messages_text += f"Gebruiker: {question}\n\nAssistent:"
+    selected = []
+    for msg in reversed(messages):
+        budget -= count_tokens(msg["content"])
+        if budget < 0:
+            break
+        selected.append(msg)
+    selected.reverse()
+    # Altijd beginnen met een vraag van de gebruiker
+    while selected and selected[0]["role"] != "user":
+        selected.pop(0)
+    return summary, selected
+
+
+def history_summary_text(summary: str) -> str:
+    """Extra system text with the summary of earlier turns."""
+    return f"SAMENVATTING VAN HET EERDERE GESPREK:\n{summary}"
+
+
+def chat_uses_retrieval(transcript: str, provider: str, model: Optional[str] = None) -> bool:
+    """
+    Whether chat about transcript should send retrieved passages (when
+    retrieval is on) instead of the whole transcript. Anthropic caches the
+    transcript prompt, so follow-up questions hardly prefill it: there only
+    a transcript that doesn't fit the chat budget uses retrieval.
+    """
+    if provider != "anthropic":
+        return True
+    prompt_tokens = count_tokens(CHAT_SYSTEM_PROMPT) + chat_history_budget(provider, model)
+    return count_tokens(transcript) > get_transcript_budget(provider, model, "chat", prompt_tokens)
+
+
+def build_chat_prompt(transcript: str, question: str, history: list, provider: str,
+                      model: Optional[str] = None, index: Optional[TranscriptIndex] = None) -> Tuple[str, str]:
+    """
+    Build (system_prompt, user_message) for a chat turn.
+    A LibraryIndex gives a library-wide prompt (see build_library_prompt).
+    Without an index (or for a short transcript) the system prompt holds as
+    much transcript as fits next to a fixed history reserve, so it is the
+    same for every turn of the conversation. With an index only
+    the best matching passages are sent, in the user message, so the prompt
+    size per turn stays flat regardless of the video length.
+    """
+    if isinstance(index, LibraryIndex):
+        return build_library_prompt(question, history, provider, model, index)
+    if index is None or len(index.passages) <= RETRIEVAL_TOP_K:
+        # Vaste reservering i.p.v. de echte lengte: zo blijft het transcript deel gelijk
+        prompt_tokens = count_tokens(CHAT_SYSTEM_PROMPT) + chat_history_budget(provider, model)
+        budget = get_transcript_budget(provider, model, "chat", prompt_tokens)
+        return CHAT_SYSTEM_PROMPT.format(transcript=fit_to_tokens(transcript, budget)), question
+
+    # Vorige vraag meenemen zodat vervolgvragen ("en daarna?") ook passages vinden
+    previous = [msg["content"] for msg in history if msg["role"] == "user"][-1:]
+    hits = index.search(" ".join(previous + [question]))
+
+    prompt_tokens = count_tokens(CHAT_RETRIEVAL_SYSTEM_PROMPT) + chat_history_budget(provider, model)
+    budget = get_transcript_budget(provider, model, "chat", prompt_tokens)
+    selected = []
+    for i in hits:
+        budget -= count_tokens(index.passages[i])
+        if budget < 0:
+            break
+        selected.append(i)
+
+    # In transcriptvolgorde, zodat het model de samenhang ziet
+    fragments = "\n\n".join(f"[{n}] {index.passages[i]}" for n, i in enumerate(sorted(selected), 1))
+    if not fragments:
+        fragments = "(geen relevante fragmenten gevonden)"
+    return CHAT_RETRIEVAL_SYSTEM_PROMPT, f"FRAGMENTEN UIT HET TRANSCRIPT:\n{fragments}\n\nVRAAG: {question}"
+
+
+def build_library_prompt(question: str, history: list, provider: str, model: Optional[str],
+                         index: "LibraryIndex") -> Tuple[str, str]:
+    """
+    (system_prompt, user_message) with the best passages from the whole
+    library, numbered as sources; index.sources gets the cited videos.
+    """
+    previous = [msg["content"] for msg in history if msg["role"] == "user"][-1:]
+    hits = index.search(" ".join(previous + [question]))
+
+    prompt_tokens = count_tokens(LIBRARY_CHAT_SYSTEM_PROMPT) + chat_history_budget(provider, model)
+    budget = get_transcript_budget(provider, model, "chat", prompt_tokens)
+    fragments = []
+    index.sources = []
+    for hit in hits:
+        at = f", {format_timestamp(hit['start'])}" if hit.get("start") is not None else ""
+        header = f"[{len(fragments) + 1}] {hit['title']} (video {hit['video_id']}{at})"
+        budget -= count_tokens(header) + count_tokens(hit["text"])
+        if budget < 0:
+            break
+        fragments.append(f"{header}\n{hit['text']}")
+        index.sources.append(hit)
+
+    text = "\n\n".join(fragments) or "(geen relevante fragmenten gevonden)"
+    return LIBRARY_CHAT_SYSTEM_PROMPT, f"FRAGMENTEN UIT DE BIBLIOTHEEK:\n{text}\n\nVRAAG: {question}"
+
+
+def chat_with_ollama(transcript: str, question: str, chat_history, model: str = "gpt-oss:20b",
+                     on_token=None, index: Optional[TranscriptIndex] = None,
+                     usage: Optional[dict] = None) -> str:
+    """
+    Chat about transcript using local Ollama /api/chat (streams tokens to on_token when given).
+    The system message with the transcript is identical for every question
+    and the model is kept loaded, so Ollama reuses its KV-cache for that
+    prefix and only prefills the new messages. Token counts and prefill
+    timing are added to usage when given.
+    """
+    import requests
+    summary, history = select_chat_history(chat_history, question, "ollama", model)
+    system_prompt, user_message = build_chat_prompt(transcript, question, history, "ollama", model, index)
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": history_summary_text(summary)})
+    for msg in history:
+        messages.append({"role": msg["role"], "content": msg["content"]})
+    messages.append({"role": "user", "content": user_message})
 
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
+        answer, final = ollama_request(
+            "/api/chat",
+            {
                 "model": model,
-                "prompt": messages_text,
-                "stream": False,
-                "options": {
-                    "temperature": 0.3,
-                    "num_predict": 1500
-                }
+                "messages": messages,
+                "options": ollama_options(CHAT_OPTIONS["ollama"], model),
+                "keep_alive": OLLAMA_KEEP_ALIVE
             },
-            timeout=180
+            timeout=180,
+            on_token=on_token
         )
-        response.raise_for_status()
-        return response.json()["response"]
+        add_ollama_timing(usage, final)
+        return answer
     except requests.exceptions.ConnectionError:
         logging.error("Kan geen verbinding maken met Ollama (chat)")
         raise Exception("Kan geen verbinding maken met Ollama. Is Ollama actief?")
@@ -346,62 +1607,192 @@ def chat_with_ollama(transcript: str, question: str, chat_history: list, model:
         raise Exception(f"Ollama fout: {type(e).__name__}: {str(e)}")
 
 
-def chat_with_openai(transcript: str, question: str, chat_history: list, api_key: str) -> str:
-    """Chat about transcript using OpenAI API."""
-    from openai import OpenAI
-
-    client = OpenAI(api_key=api_key)
-    chat_prompt_base_len = len(CHAT_SYSTEM_PROMPT) - len("{transcript}")
-    effective_limit = get_effective_limit(TRANSCRIPT_LIMITS["openai_chat"], chat_prompt_base_len)
-    system_prompt = CHAT_SYSTEM_PROMPT.format(transcript=transcript[:effective_limit])
+def chat_with_openai(transcript: str, question: str, chat_history, api_key: str,
+                     on_token=None, index: Optional[TranscriptIndex] = None,
+                     usage: Optional[dict] = None) -> str:
+    """
+    Chat about transcript using OpenAI API (streams tokens to on_token when given).
+    Token counts are added to usage when given.
+    """
+    client = get_openai_client(api_key)
+    summary, history = select_chat_history(chat_history, question, "openai")
+    system_prompt, user_message = build_chat_prompt(transcript, question, history, "openai", index=index)
 
     messages = [{"role": "system", "content": system_prompt}]
-    for msg in chat_history[-10:]:
+    if summary:
+        messages.append({"role": "system", "content": history_summary_text(summary)})
+    for msg in history:
         messages.append({"role": msg["role"], "content": msg["content"]})
-    messages.append({"role": "user", "content": question})
+    messages.append({"role": "user", "content": user_message})
+
+    request = dict(
+        model=DEFAULT_MODELS["openai"],
+        messages=messages,
+        **CHAT_OPTIONS["openai"]
+    )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages,
-            temperature=0.3,
-            max_tokens=1500
-        )
+        if on_token:
+            return collect_stream(stream_openai_text(client, usage, **request), on_token)
+        response = client.chat.completions.create(**request)
+        add_usage(usage, response.usage)
         return response.choices[0].message.content
     except Exception as e:
         logging.error("OpenAI chat fout", exc_info=True)
         raise Exception(f"OpenAI fout: {type(e).__name__}: {str(e)}")
 
 
-def chat_with_anthropic(transcript: str, question: str, chat_history: list, api_key: str) -> str:
-    """Chat about transcript using Anthropic API."""
-    import anthropic
-
-    client = anthropic.Anthropic(api_key=api_key)
-    chat_prompt_base_len = len(CHAT_SYSTEM_PROMPT) - len("{transcript}")
-    effective_limit = get_effective_limit(TRANSCRIPT_LIMITS["anthropic_chat"], chat_prompt_base_len)
-    system_prompt = CHAT_SYSTEM_PROMPT.format(transcript=transcript[:effective_limit])
-
-    messages = []
-    for msg in chat_history[-10:]:
-        messages.append({"role": msg["role"], "content": msg["content"]})
-    messages.append({"role": "user", "content": question})
+def anthropic_chat_request(system_prompt: str, history: list, user_message: str, max_tokens: int,
+                           summary: str = "") -> dict:
+    """
+    Build a Messages API request with prompt caching: the system prompt (with
+    the transcript) and the conversation so far are marked as cacheable, so
+    follow-up questions only prefill the new message. The summary of earlier
+    turns goes in a separate system block after the cached transcript.
+    """
+    messages = [{"role": msg["role"], "content": msg["content"]} for msg in history]
+    if messages:
+        messages[-1]["content"] = [{"type": "text", "text": messages[-1]["content"],
+                                    "cache_control": ANTHROPIC_CACHE_CONTROL}]
+    messages.append({"role": "user", "content": user_message})
+
+    system = [{"type": "text", "text": system_prompt, "cache_control": ANTHROPIC_CACHE_CONTROL}]
+    if summary:
+        system.append({"type": "text", "text": history_summary_text(summary)})
+
+    return dict(
+        model=DEFAULT_MODELS["anthropic"],
+        system=system,
+        messages=messages,
+        max_tokens=max_tokens
+    )
+
+
+def chat_with_anthropic(transcript: str, question: str, chat_history, api_key: str,
+                        on_token=None, index: Optional[TranscriptIndex] = None,
+                        usage: Optional[dict] = None) -> str:
+    """
+    Chat about transcript using Anthropic API (streams tokens to on_token when given).
+    The transcript is sent as a cached prompt block; token counts including
+    cache reads/writes are added to usage when given.
+    """
+    client = get_anthropic_client(api_key)
+    summary, history = select_chat_history(chat_history, question, "anthropic")
+    system_prompt, user_message = build_chat_prompt(transcript, question, history, "anthropic", index=index)
+    request = anthropic_chat_request(system_prompt, history, user_message, CHAT_OPTIONS["anthropic"]["max_tokens"],
+                                     summary)
 
     try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1500,
-            system=system_prompt,
-            messages=messages
-        )
+        if on_token:
+            return collect_stream(stream_anthropic_text(client, usage, **request), on_token)
+        response = client.messages.create(**request)
+        add_usage(usage, response.usage)
         return response.content[0].text
     except Exception as e:
         logging.error("Anthropic chat fout", exc_info=True)
         raise Exception(f"Anthropic fout: {type(e).__name__}: {str(e)}")
 
 
-def create_word_document(title: str, video_id: str, provider: str, model: str, summary: str) -> Document:
-    """Create a Word document from the summary."""
+def warm_anthropic_cache(transcript: str, api_key: str, usage: Optional[dict] = None):
+    """
+    Refresh the prompt cache of the transcript with a minimal request
+    (1 output token), so the next chat question is still a cache hit.
+    """
+    system_prompt, _ = build_chat_prompt(transcript, "", [], "anthropic")
+    request = anthropic_chat_request(system_prompt, [], "Antwoord alleen met: ok", 1)
+    try:
+        response = get_anthropic_client(api_key).messages.create(**request)
+        add_usage(usage, response.usage)
+    except Exception:
+        logging.warning("Anthropic cache warm houden mislukt", exc_info=True)
+
+
+# Markdown van het model: één keer parsen naar blokken, daarna per formaat renderen
+_SUMMARY_LINE_PATTERN = re.compile(r'(?P<heading2>### )|(?P<heading1>## )|(?P<bullet>- )|(?P<number>\d+\. )|(?P<rule>---)')
+_BOLD_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+
+
+def parse_inline(text: str) -> list:
+    """Split text into runs [(text, bold)] on **bold** markers."""
+    runs = []
+    position = 0
+    for match in _BOLD_PATTERN.finditer(text):
+        if match.start() > position:
+            runs.append((text[position:match.start()], False))
+        runs.append((match.group(1), True))
+        position = match.end()
+    if position < len(text):
+        runs.append((text[position:], False))
+    return runs
+
+
+def parse_summary(summary: str) -> list:
+    """
+    Parse the summary Markdown in one pass into blocks [(kind, runs)].
+    kind is heading1 (##), heading2 (###), bullet, number, rule or paragraph.
+    """
+    blocks = []
+    for line in summary.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        match = _SUMMARY_LINE_PATTERN.match(line)
+        if match is None:
+            blocks.append(("paragraph", parse_inline(line)))
+        elif match.lastgroup == "rule":
+            blocks.append(("rule", []))
+        else:
+            blocks.append((match.lastgroup, parse_inline(line[match.end():])))
+    return blocks
+
+
+def split_timestamps(text: str) -> list:
+    """Split text into pieces [(text, seconds)]; seconds is set for [m:ss] markers, else None."""
+    pieces = []
+    position = 0
+    for match in _TIMESTAMP_PATTERN.finditer(text):
+        if match.start() > position:
+            pieces.append((text[position:match.start()], None))
+        pieces.append((match.group(0), parse_timestamp(match.group(1))))
+        position = match.end()
+    if position < len(text):
+        pieces.append((text[position:], None))
+    return pieces
+
+
+def _add_docx_link(para, text: str, url: str, bold: bool):
+    """Append a hyperlink run to a python-docx paragraph."""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.opc.constants import RELATIONSHIP_TYPE
+
+    r_id = para.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    link = OxmlElement("w:hyperlink")
+    link.set(qn("r:id"), r_id)
+    run = OxmlElement("w:r")
+    props = OxmlElement("w:rPr")
+    style = OxmlElement("w:rStyle")
+    style.set(qn("w:val"), "Hyperlink")
+    props.append(style)
+    if bold:
+        props.append(OxmlElement("w:b"))
+    run.append(props)
+    text_element = OxmlElement("w:t")
+    text_element.text = text
+    run.append(text_element)
+    link.append(run)
+    para._p.append(link)
+
+
+def _model_label(provider: str, model: Optional[str]) -> str:
+    return f"{provider}" + (f" ({model})" if model else "")
+
+
+def render_docx(blocks: list, title: str, video_id: str, provider: str, model: Optional[str]) -> "Document":
+    """Render summary blocks to a Word document."""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
     doc = Document()
 
     # Title
@@ -415,97 +1806,318 @@ def create_word_document(title: str, video_id: str, provider: str, model: str, s
     meta.add_run("Datum: ").bold = True
     meta.add_run(f"{datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
     meta.add_run("Model: ").bold = True
-    meta.add_run(f"{provider}" + (f" ({model})" if model else ""))
+    meta.add_run(_model_label(provider, model))
 
     doc.add_paragraph()  # Spacing
 
-    # Parse and add summary content
-    lines = summary.split('\n')
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        # Heading 2 (##)
-        if line.startswith('## '):
-            doc.add_heading(line[3:], level=1)
-        # Heading 3 (###)
-        elif line.startswith('### '):
-            doc.add_heading(line[4:], level=2)
-        # Bullet point
-        elif line.startswith('- '):
-            para = doc.add_paragraph(line[2:], style='List Bullet')
-        # Numbered list
-        elif re.match(r'^\d+\. ', line):
-            text = re.sub(r'^\d+\. ', '', line)
-            doc.add_paragraph(text, style='List Number')
-        # Horizontal rule
-        elif line.startswith('---'):
+    styles = {"bullet": "List Bullet", "number": "List Number"}
+    for kind, runs in blocks:
+        if kind == "heading1":
+            doc.add_heading("".join(text for text, _ in runs), level=1)
+        elif kind == "heading2":
+            doc.add_heading("".join(text for text, _ in runs), level=2)
+        elif kind == "rule":
             doc.add_paragraph('─' * 50)
-        # Regular paragraph
         else:
-            # Handle bold text (**text**)
-            para = doc.add_paragraph()
-            parts = re.split(r'(\*\*[^*]+\*\*)', line)
-            for part in parts:
-                if part.startswith('**') and part.endswith('**'):
-                    para.add_run(part[2:-2]).bold = True
-                else:
-                    para.add_run(part)
+            para = doc.add_paragraph(style=styles.get(kind))
+            for text, bold in runs:
+                for piece, seconds in split_timestamps(text):
+                    if seconds is None:
+                        para.add_run(piece).bold = bold or None
+                    else:
+                        _add_docx_link(para, piece, timestamp_url(video_id, seconds), bold)
 
     return doc
 
 
-def chat_with_transcript(transcript: str, question: str, chat_history: list,
-                         provider: str, api_key: Optional[str] = None, model: str = None) -> str:
-    """Chat about a transcript using specified provider."""
+def _markdown_runs(runs: list, video_id: str) -> str:
+    return "".join(f"**{_markdown_links(text, video_id)}**" if bold else _markdown_links(text, video_id)
+                   for text, bold in runs)
+
+
+def _markdown_links(text: str, video_id: str) -> str:
+    return "".join(piece if seconds is None else f"{piece}({timestamp_url(video_id, seconds)})"
+                   for piece, seconds in split_timestamps(text))
+
+
+def render_markdown(blocks: list, title: str, video_id: str, provider: str, model: Optional[str]) -> str:
+    """Render summary blocks to a Markdown document with a metadata header."""
+    lines = [f"# {title}", "",
+             f"**Video:** https://youtube.com/watch?v={video_id}  ",
+             f"**Datum:** {datetime.now().strftime('%Y-%m-%d %H:%M')}  ",
+             f"**Model:** {_model_label(provider, model)}", ""]
+    number = 0
+    previous = None
+    for kind, runs in blocks:
+        number = number + 1 if kind == "number" else 0
+        if kind in ("bullet", "number") and previous == kind:
+            lines.pop()  # Geen lege regel tussen items van dezelfde lijst
+        text = _markdown_runs(runs, video_id)
+        if kind == "heading1":
+            lines.append(f"## {text}")
+        elif kind == "heading2":
+            lines.append(f"### {text}")
+        elif kind == "bullet":
+            lines.append(f"- {text}")
+        elif kind == "number":
+            lines.append(f"{number}. {text}")
+        elif kind == "rule":
+            lines.append("---")
+        else:
+            lines.append(text)
+        lines.append("")
+        previous = kind
+    return "\n".join(lines)
+
+
+def _html_runs(runs: list, video_id: str) -> str:
+    return "".join(f"<strong>{_html_links(text, video_id)}</strong>" if bold else _html_links(text, video_id)
+                   for text, bold in runs)
+
+
+def _html_links(text: str, video_id: str) -> str:
+    return "".join(html.escape(piece) if seconds is None
+                   else f'<a href="{timestamp_url(video_id, seconds)}">{html.escape(piece)}</a>'
+                   for piece, seconds in split_timestamps(text))
+
+
+def render_html(blocks: list, title: str, video_id: str, provider: str, model: Optional[str]) -> str:
+    """Render summary blocks to a standalone HTML page."""
+    url = f"https://youtube.com/watch?v={video_id}"
+    parts = ['<!DOCTYPE html>', '<html lang="nl">', '<head>', '<meta charset="utf-8">',
+             f'<title>{html.escape(title)}</title>', '</head>', '<body>',
+             f'<h1>{html.escape(title)}</h1>',
+             f'<p><strong>Video:</strong> <a href="{url}">{url}</a><br>'
+             f'<strong>Datum:</strong> {datetime.now().strftime("%Y-%m-%d %H:%M")}<br>'
+             f'<strong>Model:</strong> {html.escape(_model_label(provider, model))}</p>']
+    tags = {"heading1": "h2", "heading2": "h3", "paragraph": "p"}
+    lists = {"bullet": "ul", "number": "ol"}
+    open_list = None
+    for kind, runs in blocks:
+        if open_list and lists.get(kind) != open_list:
+            parts.append(f"</{open_list}>")
+            open_list = None
+        if kind in lists:
+            if open_list is None:
+                open_list = lists[kind]
+                parts.append(f"<{open_list}>")
+            parts.append(f"<li>{_html_runs(runs, video_id)}</li>")
+        elif kind == "rule":
+            parts.append("<hr>")
+        else:
+            parts.append(f"<{tags[kind]}>{_html_runs(runs, video_id)}</{tags[kind]}>")
+    if open_list:
+        parts.append(f"</{open_list}>")
+    parts += ['</body>', '</html>', '']
+    return "\n".join(parts)
+
+
+# Formaat -> (bestandsextensie, renderer(blocks, title, video_id, provider, model))
+RENDERERS = {
+    "docx": (".docx", render_docx),
+    "md": (".md", render_markdown),
+    "html": (".html", render_html),
+}
+
+
+def create_word_document(title: str, video_id: str, provider: str, model: str, summary: str) -> "Document":
+    """Create a Word document from the summary."""
+    return render_docx(parse_summary(summary), title, video_id, provider, model)
+
+
+def chat_with_transcript(transcript: str, question: str, chat_history,
+                         provider: str, api_key: Optional[str] = None, model: str = None,
+                         on_token=None, index: Optional[TranscriptIndex] = None,
+                         usage: Optional[dict] = None) -> str:
+    """
+    Chat about a transcript using specified provider.
+    chat_history is a ChatHistory (recent turns + summary of older ones) or
+    a plain list of messages; only what fits in the history reserve is sent.
+    With on_token, the answer is streamed token by token.
+    With index (a TranscriptIndex of the transcript), only the passages
+    relevant to the question are sent instead of the whole transcript.
+    Token counts of the request are added to usage when given.
+    """
     if provider == "ollama":
-        return chat_with_ollama(transcript, question, chat_history, model or "gpt-oss:20b")
+        return chat_with_ollama(transcript, question, chat_history, model or "gpt-oss:20b", on_token, index, usage)
     elif provider == "openai":
         if not api_key:
             raise Exception("OpenAI API key is vereist.")
-        return chat_with_openai(transcript, question, chat_history, api_key)
+        return chat_with_openai(transcript, question, chat_history, api_key, on_token, index, usage)
     elif provider == "anthropic":
         if not api_key:
             raise Exception("Anthropic API key is vereist.")
-        return chat_with_anthropic(transcript, question, chat_history, api_key)
+        return chat_with_anthropic(transcript, question, chat_history, api_key, on_token, index, usage)
     else:
         raise Exception(f"Onbekende provider: {provider}")
 
 
-def process_video(url: str, provider: str, api_key: Optional[str] = None,
-                  model: Optional[str] = None, progress_callback=None) -> Tuple[Path, Path]:
+def chat_with_library(question: str, chat_history, provider: str, api_key: Optional[str] = None,
+                      model: Optional[str] = None, on_token=None, usage: Optional[dict] = None,
+                      library: Optional["Library"] = None) -> Tuple[str, list]:
     """
-    Process a YouTube video: get transcript and create summary.
-    Returns paths to transcript and summary files.
+    Answer a question over all videos in the library (default LIBRARY).
+    Only the most relevant passages across all transcripts are sent, as
+    numbered sources. Returns (answer, sources): the passages that were
+    sent, in source order, with video_id, title, position and text.
     """
-    # Extract video ID
-    if progress_callback:
-        progress_callback("Video ID extraheren...")
+    index = LibraryIndex(library if library is not None else LIBRARY)
+    answer = chat_with_transcript("", question, chat_history, provider, api_key, model, on_token, index, usage)
+    return answer, index.sources
 
-    video_id = extract_video_id(url)
-    if not video_id:
-        raise Exception("Ongeldige YouTube URL. Controleer de link en probeer opnieuw.")
 
-    # Get video title
-    if progress_callback:
-        progress_callback("Video titel ophalen...")
-    title = get_video_title(video_id)
+def format_sources(sources: list) -> str:
+    """Source list for a library answer: [n] title - video link (at the passage when known)."""
+    lines = [f"[{n}] {source['title']} - "
+             + (timestamp_url(source['video_id'], source['start']) if source.get('start') is not None
+                else f"https://youtube.com/watch?v={source['video_id']}")
+             for n, source in enumerate(sources, 1)]
+    return "Bronnen:\n" + "\n".join(lines) if lines else ""
+
+
+class MetricsLog:
+    """
+    on_stage callback that appends every stage event as one JSON line to a
+    file. Thread-safe; the file is opened per event so it can be tailed.
+    """
+
+    def __init__(self, path: Path = METRICS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict):
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+            except OSError:
+                logging.warning(f"Kan metrics niet schrijven naar {self.path}", exc_info=True)
 
-    # Create output directory
+
+@contextmanager
+def timed_stage(on_stage, stage: str, **fields):
+    """
+    Time a stage of process_video and pass the event to on_stage(event).
+    The event dict is yielded so the stage can add counts (bytes, tokens).
+    A failing stage is reported with an "error" field and re-raised.
+    """
+    event = {"stage": stage, **fields, "start": time.time()}
+    started = time.perf_counter()
+    try:
+        yield event
+    except Exception as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        event["end"] = time.time()
+        event["seconds"] = time.perf_counter() - started
+        if on_stage:
+            try:
+                on_stage(event)
+            except Exception:
+                logging.warning("on_stage callback fout", exc_info=True)
+
+
+def summarize_stage_events(events: list) -> dict:
+    """Per stage: number of events, total, mean and max seconds (in first-seen order)."""
+    stages = {}
+    for event in events:
+        stats = stages.setdefault(event["stage"], {"count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += event["seconds"]
+        stats["max"] = max(stats["max"], event["seconds"])
+    for stats in stages.values():
+        stats["mean"] = stats["total"] / stats["count"]
+    return stages
+
+
+def format_stage_timings(events: list) -> str:
+    """Text table with the time spent per stage (for the CLI)."""
+    stages = summarize_stage_events(events)
+    if not stages:
+        return "Geen tijden gemeten."
+    lines = [f"{'Stap':<18} {'aantal':>6} {'totaal':>9} {'gemiddeld':>10} {'max':>9}", "-" * 56]
+    for stage, stats in stages.items():
+        lines.append(f"{stage:<18} {stats['count']:>6} {stats['total']:>8.2f}s "
+                     f"{stats['mean']:>9.2f}s {stats['max']:>8.2f}s")
+    return "\n".join(lines)
+
+
+class ProcessResult:
+    """
+    Everything process_video produced, in memory: transcript with timed
+    segments, the summary (Markdown) and metadata. llm_segments is the
+    normalized transcript the LLM got (segments when not normalized).
+    transcript_path and summary_path are set when the result is saved to
+    files; with a background save, wait_saved() blocks until the files are
+    written.
+    """
+
+    def __init__(self, url: str, video_id: str, title: str, lang: str, transcript: str,
+                 segments: TranscriptSegments, summary: str, provider: str, model: Optional[str] = None,
+                 summary_cached: bool = False, llm_segments: Optional[TranscriptSegments] = None):
+        self.url = url
+        self.video_id = video_id
+        self.title = title
+        self.lang = lang
+        self.transcript = transcript
+        self.segments = segments
+        self.llm_segments = llm_segments if llm_segments is not None else segments
+        self._timed = None
+        self.summary = summary
+        self.provider = provider
+        self.model = model
+        self.summary_cached = summary_cached
+        self.created = datetime.now()
+        self.transcript_path = None
+        self.summary_path = None  # Eerste gevraagde formaat
+        self.summary_paths = {}   # Formaat -> pad
+        self._pending = []  # Futures van bestanden die op de achtergrond worden geschreven
+
+    def timed_transcript(self) -> str:
+        """The transcript with [m:ss] markers, as the LLM gets it for summary and chat."""
+        if self._timed is None:
+            if isinstance(self.llm_segments, TranscriptSegments):
+                self._timed = timed_transcript(self.llm_segments.text, self.llm_segments)
+            else:
+                self._timed = self.transcript
+        return self._timed
+
+    def wait_saved(self):
+        """Wait for background file writes; raises the error of a failed write."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+
+def output_base(title: str) -> Path:
+    """Timestamped base path (without suffix) in OUTPUT_DIR for the files of a video."""
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_title = re.sub(r'[^\w\s-]', '', title).strip()[:50]
-    base_filename = f"{timestamp}_{safe_title}"
+    return OUTPUT_DIR / f"{timestamp}_{safe_title}"
+
+
+def summary_output_paths(base: Path, formats=DEFAULT_OUTPUT_FORMATS, label: str = "") -> dict:
+    """{format: summary path} next to base; label distinguishes providers in a comparison."""
+    unknown = [fmt for fmt in formats if fmt not in RENDERERS]
+    if unknown or not formats:
+        raise Exception(f"Onbekend uitvoerformaat: {', '.join(unknown) or '(geen)'} "
+                        f"(kies uit {', '.join(RENDERERS)})")
+    suffix = f"_{label}" if label else ""
+    return {fmt: Path(f"{base}_samenvatting{suffix}{RENDERERS[fmt][0]}") for fmt in formats}
 
-    # Get transcript
-    if progress_callback:
-        progress_callback("Transcriptie ophalen van YouTube...")
-    transcript, lang = get_transcript(video_id)
 
-    # Save transcript
-    transcript_path = OUTPUT_DIR / f"{base_filename}_transcriptie.txt"
-    with open(transcript_path, 'w', encoding='utf-8') as f:
+def output_paths(title: str, formats=DEFAULT_OUTPUT_FORMATS) -> Tuple[Path, dict]:
+    """Timestamped transcript .txt path and {format: summary path} in OUTPUT_DIR for a video title."""
+    base = output_base(title)
+    return Path(f"{base}_transcriptie.txt"), summary_output_paths(base, formats)
+
+
+def write_transcript_file(path: Path, title: str, video_id: str, lang: str, transcript: str):
+    """Write the transcript with a short header to a text file."""
+    with open(path, 'w', encoding='utf-8') as f:
         f.write(f"Video: {title}\n")
         f.write(f"URL: https://youtube.com/watch?v={video_id}\n")
         f.write(f"Taal transcriptie: {lang}\n")
@@ -513,17 +2125,969 @@ def process_video(url: str, provider: str, api_key: Optional[str] = None,
         f.write("=" * 50 + "\n\n")
         f.write(transcript)
 
-    # Create summary
+
+def write_summary_files(paths: dict, result: ProcessResult, on_stage=None):
+    """
+    Parse the summary once and write it in every requested format
+    ({format: path}); stages <format>_render and <format>_save.
+    """
+    fields = {"provider": result.provider, "model": result.model, "video_id": result.video_id}
+    blocks = parse_summary(result.summary)
+    for fmt, path in paths.items():
+        with timed_stage(on_stage, f"{fmt}_render", **fields) as event:
+            content = RENDERERS[fmt][1](blocks, result.title, result.video_id, result.provider, result.model)
+            event["bytes"] = len(result.summary.encode('utf-8'))
+        with timed_stage(on_stage, f"{fmt}_save", **fields) as event:
+            if isinstance(content, str):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+            else:
+                content.save(path)
+            event["bytes"] = path.stat().st_size
+
+
+def _set_result_paths(result: ProcessResult, transcript_path: Path, summary_paths: dict):
+    result.transcript_path = transcript_path
+    result.summary_paths = summary_paths
+    result.summary_path = next(iter(summary_paths.values()))
+
+
+def save_result(result: ProcessResult, on_stage=None, formats=DEFAULT_OUTPUT_FORMATS) -> ProcessResult:
+    """Write the transcript and summary files of a result (for process_video(save=False))."""
+    transcript_path, summary_paths = output_paths(result.title, formats)
+    fields = {"provider": result.provider, "model": result.model, "video_id": result.video_id}
+    with timed_stage(on_stage, "transcript_write", **fields) as event:
+        write_transcript_file(transcript_path, result.title, result.video_id, result.lang, result.transcript)
+        event["bytes"] = transcript_path.stat().st_size
+    write_summary_files(summary_paths, result, on_stage)
+    _set_result_paths(result, transcript_path, summary_paths)
+    record_result(result, on_stage=on_stage)
+    return result
+
+
+class Library:
+    """
+    SQLite catalog of processed videos (metadata, timings, file paths) with
+    an FTS5 index over title, transcript and summary. One row per summary
+    (a comparison gives one row per provider). For library-wide chat every
+    video's transcript is also split into passages with their own FTS5
+    index, once per video ID, so adding a video only costs that video;
+    each passage keeps the start time of its first segment.
+    The connection is opened on first use and shared between threads.
+    """
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")  # Lezers (server, CLI) blokkeren schrijvers niet
+            with conn:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS videos (
+                        id INTEGER PRIMARY KEY,
+                        key TEXT UNIQUE NOT NULL,
+                        video_id TEXT NOT NULL,
+                        title TEXT,
+                        lang TEXT,
+                        provider TEXT,
+                        model TEXT,
+                        created TEXT,
+                        transcript_path TEXT,
+                        summary_path TEXT,
+                        summary_paths TEXT,
+                        transcript_tokens INTEGER,
+                        seconds REAL,
+                        timings TEXT
+                    );
+                    CREATE INDEX IF NOT EXISTS videos_video_id ON videos (video_id);
+                    CREATE INDEX IF NOT EXISTS videos_created ON videos (created);
+                    CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+                        title, transcript, summary, tokenize='unicode61 remove_diacritics 2'
+                    );
+                    CREATE TABLE IF NOT EXISTS passages (
+                        id INTEGER PRIMARY KEY,
+                        video_id TEXT NOT NULL,
+                        title TEXT,
+                        position INTEGER,
+                        text TEXT,
+                        start REAL
+                    );
+                    CREATE INDEX IF NOT EXISTS passages_video_id ON passages (video_id);
+                    CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+                        text, content='passages', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+                    );
+                """)
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM videos WHERE key = ?", (str(key),)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def add(self, result: ProcessResult, timings: Optional[dict] = None, seconds: Optional[float] = None) -> int:
+        """Add or update the catalog row of a saved result; returns its row id."""
+        return self.store(
+            key=str(result.summary_path or result.transcript_path),
+            video_id=result.video_id, title=result.title, lang=result.lang,
+            provider=result.provider, model=result.model, created=result.created.isoformat(timespec="seconds"),
+            transcript_path=result.transcript_path, summary_paths=result.summary_paths,
+            transcript=result.transcript, summary=result.summary, seconds=seconds, timings=timings,
+            segments=result.llm_segments,
+        )
+
+    def store(self, key: str, video_id: str, title: str, lang: str, provider: Optional[str], model: Optional[str],
+              created: str, transcript_path, summary_paths: dict, transcript: str, summary: str,
+              seconds: Optional[float] = None, timings: Optional[dict] = None,
+              segments: Optional[TranscriptSegments] = None) -> int:
+        """
+        Insert or replace one catalog row and its full-text entry (one
+        transaction). segments is the (normalized) transcript the chat
+        passages are split from, with their start times; without it the
+        passages come from transcript and have no start time.
+        """
+        summary_path = next(iter(summary_paths.values()), None)
+        values = (video_id, title, lang, provider, model, created,
+                  str(transcript_path) if transcript_path else None,
+                  str(summary_path) if summary_path else None,
+                  json.dumps({fmt: str(path) for fmt, path in summary_paths.items()}),
+                  count_tokens(transcript), seconds, json.dumps(timings or {}))
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                row = conn.execute("SELECT id FROM videos WHERE key = ?", (key,)).fetchone()
+                if row:
+                    row_id = row["id"]
+                    conn.execute("""UPDATE videos SET video_id = ?, title = ?, lang = ?, provider = ?, model = ?,
+                                    created = ?, transcript_path = ?, summary_path = ?, summary_paths = ?,
+                                    transcript_tokens = ?, seconds = ?, timings = ? WHERE id = ?""",
+                                 values + (row_id,))
+                    conn.execute("DELETE FROM videos_fts WHERE rowid = ?", (row_id,))
+                else:
+                    row_id = conn.execute("""INSERT INTO videos (key, video_id, title, lang, provider, model,
+                                             created, transcript_path, summary_path, summary_paths,
+                                             transcript_tokens, seconds, timings)
+                                             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                          (key,) + values).lastrowid
+                conn.execute("INSERT INTO videos_fts (rowid, title, transcript, summary) VALUES (?, ?, ?, ?)",
+                             (row_id, title, transcript, summary))
+                if segments is not None:
+                    self._index_passages(conn, video_id, title, segments.text, segments)
+                else:
+                    self._index_passages(conn, video_id, title, transcript)
+        return row_id
+
+    def _index_passages(self, conn: sqlite3.Connection, video_id: str, title: str, transcript: str,
+                        segments: Optional[TranscriptSegments] = None):
+        """
+        Split a transcript into passages and index them, unless the video
+        already has passages. With segments (whose text is transcript) each
+        passage gets the start time of the segment it begins in.
+        """
+        if conn.execute("SELECT 1 FROM passages WHERE video_id = ? LIMIT 1", (video_id,)).fetchone():
+            return
+        timed = segments is not None and len(segments) > 0
+        offset = 0
+        for position, text in enumerate(split_transcript(transcript, RETRIEVAL_PASSAGE_TOKENS)):
+            # Passages volgen de tekst in volgorde; hun eerste regel (of zin) staat letterlijk in transcript
+            found = transcript.find(text.split("\n", 1)[0], offset)
+            if found >= 0:
+                offset = found
+            start = segments.time_at(offset) if timed else None
+            row_id = conn.execute("INSERT INTO passages (video_id, title, position, text, start) VALUES (?, ?, ?, ?, ?)",
+                                  (video_id, title, position, text, start)).lastrowid
+            conn.execute("INSERT INTO passages_fts (rowid, text) VALUES (?, ?)", (row_id, text))
+
+    def search_passages(self, query: str, k: int = LIBRARY_CHAT_TOP_K,
+                        per_video: int = LIBRARY_CHAT_PER_VIDEO) -> list:
+        """
+        Best matching transcript passages across all videos (any query word
+        counts, ranked by bm25), at most per_video per video.
+        Returns dicts with video_id, title, position, text and start (seconds
+        into the video where the passage begins, or None when unknown).
+        """
+        terms = list(dict.fromkeys(tokenize_terms(query)))
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._connect().execute("""
+                SELECT p.video_id, p.title, p.position, p.text, p.start
+                FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid
+                WHERE passages_fts MATCH ?
+                ORDER BY bm25(passages_fts)
+                LIMIT ?""", (match, k * per_video)).fetchall()
+        hits = []
+        counts = Counter()
+        for row in rows:
+            if counts[row["video_id"]] >= per_video:
+                continue
+            counts[row["video_id"]] += 1
+            hits.append(dict(row))
+            if len(hits) == k:
+                break
+        return hits
+
+    def search(self, query: str, limit: int = LIBRARY_SEARCH_LIMIT) -> list:
+        """
+        Full-text search over titles, transcripts and summaries, best match
+        first. Words must all occur; "quoted phrases" and prefix* work.
+        Returns dicts with the catalog fields and a snippet.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._connect().execute("""
+                SELECT v.*, snippet(videos_fts, -1, '[', ']', '...', 12) AS snippet
+                FROM videos_fts JOIN videos v ON v.id = videos_fts.rowid
+                WHERE videos_fts MATCH ?
+                ORDER BY bm25(videos_fts, 10.0, 1.0, 3.0)
+                LIMIT ?""", (match, limit)).fetchall()
+        return [_library_row(row) for row in rows]
+
+    def recent(self, limit: int = LIBRARY_SEARCH_LIMIT) -> list:
+        """Most recently processed videos."""
+        with self._lock:
+            rows = self._connect().execute("SELECT * FROM videos ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        return [_library_row(row) for row in rows]
+
+    def import_files(self, directory: Path = None, progress_callback=None) -> Tuple[int, int]:
+        """
+        Backfill the catalog from existing *_transcriptie.txt files (title,
+        URL and language from the header) and the summaries next to them.
+        Files that are already in the catalog are skipped.
+        Returns (added, skipped).
+        """
+        directory = Path(directory or OUTPUT_DIR)
+        summaries = {}  # Basisnaam -> {label: {formaat: pad}}
+        transcripts = []
+        for path in sorted(directory.iterdir()):
+            if path.name.endswith("_transcriptie.txt"):
+                transcripts.append(path)
+                continue
+            base, sep, rest = path.stem.rpartition("_samenvatting")
+            fmt = next((fmt for fmt, (ext, _) in RENDERERS.items() if ext == path.suffix), None)
+            if sep and fmt:
+                summaries.setdefault(base, {}).setdefault(rest, {})[fmt] = path
+
+        added = skipped = 0
+        for transcript_path in transcripts:
+            base = transcript_path.name[:-len("_transcriptie.txt")]
+            groups = list(summaries.get(base, {}).values()) or [{}]
+            header = None
+            for summary_paths in groups:
+                key = str(next(iter(summary_paths.values()), transcript_path))
+                if key in self:
+                    skipped += 1
+                    continue
+                try:
+                    if header is None:
+                        header = read_transcript_file(transcript_path)
+                    title, video_id, lang, created, transcript = header
+                    summary, provider, model = read_summary_file(summary_paths)
+                    self.store(key, video_id, title, lang, provider, model,
+                               _timestamp_from_name(base) or created, transcript_path, summary_paths,
+                               transcript, summary)
+                    added += 1
+                except Exception:
+                    logging.error(f"Bibliotheek: importeren van {transcript_path} mislukt", exc_info=True)
+                    skipped += 1
+            if progress_callback:
+                progress_callback(f"{transcript_path.name} verwerkt")
+        return added, skipped
+
+
+class LibraryIndex:
+    """
+    Retrieval over the whole library for chat_with_transcript (index=...).
+    sources holds the passages the last prompt was built from.
+    """
+
+    def __init__(self, library: Library, k: int = LIBRARY_CHAT_TOP_K):
+        self.library = library
+        self.k = k
+        self.sources = []
+
+    def search(self, query: str) -> list:
+        return self.library.search_passages(query, self.k)
+
+
+def _library_row(row: sqlite3.Row) -> dict:
+    data = dict(row)
+    data["summary_paths"] = json.loads(data["summary_paths"] or "{}")
+    data["timings"] = json.loads(data["timings"] or "{}")
+    return data
+
+
+def fts_query(text: str) -> str:
+    """Turn user input into a safe FTS5 query: all words, "phrases" and prefix* kept."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]+)"|(\S+)', text):
+        prefix = word.endswith("*")
+        term = (phrase or word.rstrip("*")).replace('"', ' ').strip()
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _timestamp_from_name(name: str) -> Optional[str]:
+    """ISO time from the {timestamp}_ prefix of an output file name."""
+    try:
+        return datetime.strptime(name[:15], "%Y%m%d_%H%M%S").isoformat(timespec="seconds")
+    except ValueError:
+        return None
+
+
+def read_transcript_file(path: Path) -> Tuple[str, str, str, Optional[str], str]:
+    """Read a file of write_transcript_file: (title, video_id, lang, created, transcript)."""
+    text = path.read_text(encoding='utf-8')
+    header, sep, transcript = text.partition("=" * 50 + "\n\n")
+    if not sep:
+        raise Exception(f"Geen transcriptie header in {path.name}")
+    fields = dict(line.split(": ", 1) for line in header.splitlines() if ": " in line)
+    video_id = extract_video_id(fields.get("URL", ""))
+    if not video_id:
+        raise Exception(f"Geen video URL in {path.name}")
+    created = None
+    if fields.get("Datum"):
+        created = datetime.strptime(fields["Datum"], "%Y-%m-%d %H:%M").isoformat(timespec="seconds")
+    return fields.get("Video", ""), video_id, fields.get("Taal transcriptie", ""), created, transcript
+
+
+def read_summary_file(paths: dict) -> Tuple[str, Optional[str], Optional[str]]:
+    """Text, provider and model of a saved summary ({format: path}, Markdown preferred)."""
+    if "md" in paths:
+        text = paths["md"].read_text(encoding='utf-8')
+    elif "docx" in paths:
+        from docx import Document
+        text = "\n".join(para.text for para in Document(paths["docx"]).paragraphs)
+    elif "html" in paths:
+        text = html.unescape(re.sub(r'<[^>]+>', ' ', paths["html"].read_text(encoding='utf-8')))
+    else:
+        return "", None, None
+    match = re.search(r'Model:\**\s*(\w+)(?: \(([^)]+)\))?', text)
+    return text, match.group(1) if match else None, match.group(2) if match else None
+
+
+def record_result(result: ProcessResult, timings: Optional[dict] = None, seconds: Optional[float] = None,
+                  on_stage=None):
+    """Add a saved result to LIBRARY (stage library); a catalog error doesn't fail the video."""
+    try:
+        with timed_stage(on_stage, "library", provider=result.provider, model=result.model,
+                         video_id=result.video_id):
+            LIBRARY.add(result, timings, seconds)
+    except Exception:
+        logging.error("Bibliotheek bijwerken mislukt", exc_info=True)
+
+
+def collect_timings(timings: dict, on_stage=None):
+    """on_stage callback that sums seconds per stage into timings and forwards the event."""
+    def hook(event):
+        timings[event["stage"]] = timings.get(event["stage"], 0.0) + event["seconds"]
+        if on_stage:
+            on_stage(event)
+    return hook
+
+
+LIBRARY = Library(LIBRARY_DB)
+
+
+def fetch_video(video_id: str, use_cache: bool = True, progress_callback=None, on_stage=None,
+                fetch_semaphore=None, normalize: bool = True, remove_fillers: bool = NORMALIZE_FILLERS,
+                **fields) -> Tuple[str, str, str, TranscriptSegments, TranscriptSegments]:
+    """
+    Fetch title and transcript of a video, the title in the background.
+    With normalize a cleaned copy for the LLM is made by normalize_transcript
+    (stage normalize, with the character and token counts before and after).
+    Returns (title, language, transcript, segments, llm_segments): the
+    transcript and segments as YouTube delivers them, llm_segments what the
+    model gets (segments itself without normalize). Stages title,
+    transcript and normalize go to on_stage with the extra event fields.
+    """
+    def fetch_title():
+        with timed_stage(on_stage, "title", video_id=video_id, **fields) as event:
+            title = get_video_title(video_id, use_cache)
+            event["bytes"] = len(title.encode('utf-8'))
+            return title
+
+    title_pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        with fetch_semaphore or nullcontext():
+            # Get video title (in the background)
+            if progress_callback:
+                progress_callback("Video titel ophalen...")
+            title_future = title_pool.submit(fetch_title)
+
+            # Get transcript
+            if progress_callback:
+                progress_callback("Transcriptie ophalen van YouTube...")
+            with timed_stage(on_stage, "transcript", video_id=video_id, **fields) as event:
+                transcript, lang, segments = get_transcript_with_segments(video_id, use_cache=use_cache)
+                event.update(lang=lang, bytes=len(transcript.encode('utf-8')), tokens=count_tokens(transcript),
+                             segments=len(segments))
+            llm_segments = segments
+            if normalize:
+                with timed_stage(on_stage, "normalize", video_id=video_id, **fields) as event:
+                    event.update(chars_in=len(transcript), tokens_in=count_tokens(transcript))
+                    llm_segments = normalize_transcript(segments, remove_fillers)
+                    event.update(chars_out=len(llm_segments.text), tokens_out=count_tokens(llm_segments.text),
+                                 segments=len(llm_segments))
+                if progress_callback:
+                    saved = 1 - event["tokens_out"] / event["tokens_in"] if event["tokens_in"] else 0
+                    progress_callback(f"Transcriptie opgeschoond: {event['tokens_in']} -> {event['tokens_out']} "
+                                      f"tokens (-{saved:.0%}), {event['chars_in']} -> {event['chars_out']} tekens")
+            title = title_future.result()
+    finally:
+        # Niet wachten op een titel-thread als het ophalen van de transcriptie faalde
+        title_pool.shutdown(wait=False)
+    return title, lang, transcript, segments, llm_segments
+
+
+def create_summary(transcript: str, provider: str, api_key: Optional[str] = None, model: Optional[str] = None,
+                   chunked: bool = True, use_cache: bool = True, refresh: bool = False,
+                   progress_callback=None, on_token=None, on_stage=None, llm_semaphore=None,
+                   usage: Optional[dict] = None, **fields) -> Tuple[str, bool]:
+    """
+    Summarize a transcript or reuse an identical earlier summary (stage llm).
+    Returns (summary, from_cache).
+    """
+    with timed_stage(on_stage, "llm", provider=provider, model=model, **fields) as event:
+        cache_key = summary_cache_key(transcript, provider, model, chunked)
+        summary = SUMMARY_CACHE.get(cache_key) if use_cache and not refresh else None
+        event["cached"] = summary is not None
+        if summary is not None:
+            if progress_callback:
+                progress_callback("Samenvatting uit cache geladen...")
+        else:
+            if progress_callback:
+                progress_callback(f"Samenvatting maken met {provider}...")
+            waited = []
+            summary = summarize(transcript, provider, api_key, model, chunked=chunked,
+                                progress_callback=progress_callback, on_token=on_token, usage=usage,
+                                llm_semaphore=llm_semaphore, waited=waited)
+            event["wait_seconds"] = sum(waited)
+            if use_cache:
+                SUMMARY_CACHE.set(cache_key, summary)
+        event.update(input_tokens=count_tokens(transcript), output_tokens=count_tokens(summary))
+    return summary, event["cached"]
+
+
+def process_video(url: str, provider: str, api_key: Optional[str] = None,
+                  model: Optional[str] = None, progress_callback=None,
+                  chunked: bool = True, use_cache: bool = True,
+                  refresh: bool = False, fetch_semaphore=None,
+                  llm_semaphore=None, on_token=None, on_stage=None,
+                  save: bool = True, background_save: bool = False,
+                  formats=DEFAULT_OUTPUT_FORMATS, normalize: bool = True,
+                  remove_fillers: bool = NORMALIZE_FILLERS) -> ProcessResult:
+    """
+    Process a YouTube video: get transcript and create summary.
+    Returns a ProcessResult with transcript, segments, summary and metadata.
+    With save (default) the transcript and summary are also written to
+    files in OUTPUT_DIR (result.transcript_path/summary_paths), the summary
+    in each of formats (keys of RENDERERS: docx, md, html), and recorded
+    in the LIBRARY catalog with the stage timings; with
+    background_save the files are written in the background and
+    result.wait_saved() waits for them.
+    Title, transcript and summary come from the cache when available
+    (use_cache); refresh=True always generates a new summary.
+    normalize cleans the transcript the LLM sees (the saved transcript and
+    the library keep the original), remove_fillers also drops filler words;
+    see normalize_transcript.
+    fetch_semaphore/llm_semaphore optionally limit concurrent YouTube and
+    LLM calls when several videos are processed at the same time.
+    on_token receives the summary tokens while they are generated.
+
+    on_stage(event) receives a dict per stage (video_id, title, transcript,
+    normalize, transcript_write, llm, <format>_render, <format>_save) with start/end timestamps,
+    seconds, provider/model and byte/token counts where relevant. Stages in
+    the background (title, file writes) call it from a worker thread.
+
+    Independent stages overlap: the title is fetched while the transcript is
+    fetched, and the transcript file is written while the LLM runs.
+    progress_callback is only called from the calling thread.
+    """
+    fields = {"provider": provider, "model": model}
+    started = time.perf_counter()
+    timings = {}  # Seconden per stap, voor de bibliotheek
+    on_stage = collect_timings(timings, on_stage)
+
+    # Extract video ID
     if progress_callback:
-        progress_callback(f"Samenvatting maken met {provider}...")
-    summary = summarize(transcript, provider, api_key, model)
+        progress_callback("Video ID extraheren...")
 
-    # Save summary as Word document
-    summary_path = OUTPUT_DIR / f"{base_filename}_samenvatting.docx"
-    doc = create_word_document(title, video_id, provider, model, summary)
-    doc.save(summary_path)
+    with timed_stage(on_stage, "video_id", **fields) as event:
+        video_id = extract_video_id(url)
+        event["video_id"] = video_id
+    if not video_id:
+        raise Exception("Ongeldige YouTube URL. Controleer de link en probeer opnieuw.")
+
+    title, lang, transcript, segments, llm_segments = fetch_video(
+        video_id, use_cache, progress_callback, on_stage, fetch_semaphore, normalize, remove_fillers, **fields)
 
-    return transcript_path, summary_path
+    def write_transcript(path):
+        with timed_stage(on_stage, "transcript_write", video_id=video_id, **fields) as event:
+            write_transcript_file(path, title, video_id, lang, transcript)
+            event["bytes"] = path.stat().st_size
+
+    io_pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        # Save transcript (in the background, the LLM doesn't need the file)
+        pending = []
+        if save:
+            transcript_path, summary_paths = output_paths(title, formats)
+            pending.append(io_pool.submit(write_transcript, transcript_path))
+
+        # Create summary (or reuse an identical earlier one); the LLM gets the
+        # transcript with [m:ss] markers so the summary can point into the video
+        summary, cached = create_summary(timed_transcript(llm_segments.text, llm_segments), provider, api_key, model,
+                                         chunked, use_cache, refresh, progress_callback, on_token, on_stage,
+                                         llm_semaphore, video_id=video_id)
+        result = ProcessResult(url, video_id, title, lang, transcript, segments, summary, provider, model,
+                               summary_cached=cached, llm_segments=llm_segments)
+
+        # Save summary in the requested formats
+        if save:
+            _set_result_paths(result, transcript_path, summary_paths)
+            if background_save:
+                pending.append(io_pool.submit(write_summary_files, summary_paths, result, on_stage))
+
+                def record_when_saved(writes):
+                    if not any(future.exception() for future in writes):
+                        record_result(result, timings, time.perf_counter() - started, on_stage)
+
+                pending.append(io_pool.submit(record_when_saved, list(pending)))
+                result._pending = pending
+            else:
+                write_summary_files(summary_paths, result, on_stage)
+                for future in pending:
+                    future.result()  # Schrijffouten van de transcriptie doorgeven
+                record_result(result, timings, time.perf_counter() - started, on_stage)
+    finally:
+        # Schrijfopdrachten die al gepland zijn lopen gewoon door
+        io_pool.shutdown(wait=False)
+
+    return result
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when the lane of a provider has too many waiting jobs."""
+
+
+class Job:
+    """A video in a JobQueue with its status, timing and (when done) ProcessResult."""
+
+    def __init__(self, job_id: int, url: str, provider: str, api_key: Optional[str] = None,
+                 model: Optional[str] = None, options: Optional[dict] = None):
+        self.id = job_id
+        self.url = url
+        self.provider = provider
+        self.api_key = api_key
+        self.model = model
+        self.options = options or {}  # Extra argumenten voor process_video
+        self.status = "wachtend"      # wachtend, bezig, klaar, fout
+        self.message = ""             # Laatste voortgangsmelding
+        self.error = None
+        self.result = None
+        self.attempts = 0
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds the job has been running (or ran)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def label(self) -> str:
+        """Video title when known, otherwise the URL."""
+        return self.result.title if self.result else self.url
+
+
+class JobQueue:
+    """
+    Queue of videos processed by a fixed pool of worker threads.
+    Every provider has its own lane with workers[provider] threads
+    (default BATCH_LLM_WORKERS: one for the local Ollama, several for the
+    cloud providers), so a slow Ollama job doesn't hold up cloud jobs.
+    YouTube fetches share one BATCH_FETCH_WORKERS limit. The LLM stage of a
+    job takes one of llm_semaphores[provider] (as many slots as workers) for
+    every provider call, map-reduce chunks included, so other LLM work on
+    the same provider, such as chat, shares the limit.
+
+    With max_pending, submit and retry raise QueueFullError when that many
+    jobs of a provider are already waiting.
+
+    on_change(job) is called on every status or progress change and
+    on_token(job, token) for streamed summary tokens, both from worker threads.
+    """
+
+    def __init__(self, workers: Optional[dict] = None, on_change=None, on_token=None,
+                 fetch_workers: int = BATCH_FETCH_WORKERS, max_pending: Optional[int] = None):
+        self.workers = dict(workers or BATCH_LLM_WORKERS)
+        self.max_pending = max_pending
+        self.on_change = on_change
+        self.on_token = on_token
+        self.fetch_semaphore = threading.BoundedSemaphore(fetch_workers)
+        self.llm_semaphores = {provider: threading.BoundedSemaphore(count)
+                               for provider, count in self.workers.items()}
+        self.jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._lanes = {}
+        self._threads = []
+        for provider, count in self.workers.items():
+            lane = self._lanes[provider] = queue.Queue()
+            for _ in range(count):
+                thread = threading.Thread(target=self._work, args=(lane,), daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, url: str, provider: str, api_key: Optional[str] = None,
+               model: Optional[str] = None, **options) -> Job:
+        """Add a video to the queue; options go to process_video."""
+        if provider not in self._lanes:
+            raise Exception(f"Onbekende provider: {provider}")
+        with self._lock:
+            if self.max_pending is not None and self._lanes[provider].qsize() >= self.max_pending:
+                raise QueueFullError(f"Wachtrij voor {provider} is vol ({self.max_pending} wachtend)")
+            job = Job(self._next_id, url, provider, api_key, model, options)
+            self._next_id += 1
+            self.jobs[job.id] = job
+            self._lanes[provider].put(job)
+        self._changed(job)
+        return job
+
+    def retry(self, job_id: int) -> Job:
+        """Put a failed job back in the queue."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "fout":
+                raise Exception("Alleen mislukte taken kunnen opnieuw worden geprobeerd.")
+            if self.max_pending is not None and self._lanes[job.provider].qsize() >= self.max_pending:
+                raise QueueFullError(f"Wachtrij voor {job.provider} is vol ({self.max_pending} wachtend)")
+            job.status = "wachtend"
+            job.message = ""
+            job.error = None
+            job.started = job.finished = None
+            self._lanes[job.provider].put(job)
+        self._changed(job)
+        return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def forget(self, keep: int):
+        """Drop the oldest finished jobs so at most keep finished jobs remain."""
+        with self._lock:
+            finished = [job for job in self.jobs.values() if job.status in ("klaar", "fout")]
+            for job in finished[:max(0, len(finished) - keep)]:
+                del self.jobs[job.id]
+
+    def pending(self, provider: Optional[str] = None) -> int:
+        """Number of waiting jobs (for one provider or in total)."""
+        lanes = [self._lanes[provider]] if provider else self._lanes.values()
+        return sum(lane.qsize() for lane in lanes)
+
+    def shutdown(self, wait: bool = False):
+        """Stop the workers after the jobs that are already queued."""
+        for provider, lane in self._lanes.items():
+            for _ in range(self.workers[provider]):
+                lane.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _changed(self, job: Job):
+        if self.on_change:
+            self.on_change(job)
+
+    def _work(self, lane: queue.Queue):
+        while True:
+            job = lane.get()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: Job):
+        with self._lock:
+            job.status = "bezig"
+            job.attempts += 1
+            job.started = time.time()
+        self._changed(job)
+
+        def progress(message):
+            job.message = message
+            self._changed(job)
+
+        on_token = (lambda token: self.on_token(job, token)) if self.on_token else None
+        try:
+            result = process_video(job.url, job.provider, job.api_key, model=job.model,
+                                   progress_callback=progress, on_token=on_token,
+                                   fetch_semaphore=self.fetch_semaphore,
+                                   llm_semaphore=self.llm_semaphores[job.provider], **job.options)
+            result.wait_saved()
+        except Exception as e:
+            logging.error(f"Wachtrij: fout bij {job.url}", exc_info=True)
+            with self._lock:
+                job.status, job.error, job.finished = "fout", str(e), time.time()
+        else:
+            with self._lock:
+                job.status, job.result, job.finished = "klaar", result, time.time()
+        self._changed(job)
+
+
+def parse_target(target: str) -> Tuple[str, Optional[str]]:
+    """Parse "provider[:model]" (e.g. "ollama:gemma2:9b") into (provider, model)."""
+    provider, _, model = target.strip().partition(":")
+    if provider not in DEFAULT_MODELS:
+        raise Exception(f"Onbekende provider: {provider}")
+    if provider != "ollama":
+        return provider, None  # Cloud providers gebruiken hun standaardmodel
+    return provider, model or DEFAULT_MODELS["ollama"]
+
+
+def compare_providers(url: str, targets: list, api_keys: dict, chunked: bool = True,
+                      use_cache: bool = True, refresh: bool = False, progress_callback=None,
+                      on_stage=None, save: bool = True, formats=DEFAULT_OUTPUT_FORMATS, normalize: bool = True,
+                      remove_fillers: bool = NORMALIZE_FILLERS) -> Tuple[list, Optional[Path]]:
+    """
+    Summarize one video with several providers/models to compare them.
+    The transcript is fetched (and normalized) once; all targets [(provider, model)] run
+    concurrently, at most BATCH_LLM_WORKERS[provider] at a time per provider
+    (so Ollama models run one after the other). api_keys maps provider to key.
+    Writes the transcript, one summary per target and a Markdown comparison
+    report (when save). progress_callback is called from worker threads.
+
+    Returns (rows, report_path) with one row dict per target: status, error,
+    seconds, first_token_seconds, usage, cost, tokens_per_second, cached,
+    summary_path and the ProcessResult.
+    """
+    video_id = extract_video_id(url)
+    if not video_id:
+        raise Exception("Ongeldige YouTube URL. Controleer de link en probeer opnieuw.")
+
+    if progress_callback:
+        progress_callback("Transcriptie ophalen (eenmalig voor alle modellen)...")
+    title, lang, transcript, segments, llm_segments = fetch_video(video_id, use_cache, progress_callback, on_stage,
+                                                                  normalize=normalize, remove_fillers=remove_fillers)
+    timed = timed_transcript(llm_segments.text, llm_segments)
+
+    base = output_base(title) if save else None
+    transcript_path = Path(f"{base}_transcriptie.txt") if save else None
+    if save:
+        write_transcript_file(transcript_path, title, video_id, lang, transcript)
+
+    rows = [{"provider": provider, "model": model, "status": "wachtend", "error": None, "seconds": 0.0,
+             "first_token_seconds": None, "usage": {}, "cost": 0.0, "tokens_per_second": 0.0,
+             "cached": False, "summary_path": None, "result": None}
+            for provider, model in targets]
+    # Per provider: aantal targets tegelijk, en apart het aantal LLM aanroepen tegelijk
+    # (map-reduce delen van alle targets samen)
+    semaphores = {provider: threading.BoundedSemaphore(BATCH_LLM_WORKERS.get(provider, 1))
+                  for provider, _ in targets}
+    call_semaphores = {provider: threading.BoundedSemaphore(BATCH_LLM_WORKERS.get(provider, 1))
+                       for provider, _ in targets}
+
+    def run(row):
+        provider, model = row["provider"], row["model"]
+        name = provider + (f" ({model})" if model else "")
+        callback = (lambda msg: progress_callback(f"[{name}] {msg}")) if progress_callback else None
+        first_token = []
+
+        with semaphores[provider]:
+            start = time.perf_counter()
+
+            def on_token(token):
+                if not first_token:
+                    first_token.append(time.perf_counter() - start)
+
+            try:
+                summary, cached = create_summary(timed, provider, api_keys.get(provider), model, chunked,
+                                                 use_cache, refresh, callback, on_token, on_stage,
+                                                 llm_semaphore=call_semaphores[provider],
+                                                 usage=row["usage"], video_id=video_id)
+            except Exception as e:
+                logging.error(f"Vergelijking: fout bij {name}", exc_info=True)
+                row.update(status="fout", error=str(e), seconds=time.perf_counter() - start)
+                return
+            seconds = time.perf_counter() - start
+
+        output_tokens = row["usage"].get("output_tokens") or count_tokens(summary)
+        result = ProcessResult(url, video_id, title, lang, transcript, segments, summary, provider, model,
+                               summary_cached=cached, llm_segments=llm_segments)
+        row.update(status="ok", seconds=seconds, cached=cached, result=result,
+                   first_token_seconds=first_token[0] if first_token else None,
+                   tokens_per_second=output_tokens / seconds if seconds and not cached else 0.0,
+                   cost=estimate_cost(provider, row["usage"]))
+        if save:
+            label = re.sub(r'[^\w.-]+', '-', provider + (f"_{model}" if model else ""))
+            summary_paths = summary_output_paths(base, formats, label)
+            write_summary_files(summary_paths, result, on_stage)
+            _set_result_paths(result, transcript_path, summary_paths)
+            record_result(result, {"llm": seconds}, seconds, on_stage)
+            row["summary_path"] = result.summary_path
+        if callback:
+            callback("Klaar")
+
+    with ThreadPoolExecutor(max_workers=len(rows) or 1) as pool:
+        list(pool.map(run, rows))
+
+    report_path = None
+    if save:
+        report_path = Path(f"{base}_vergelijking.md")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(f"# Vergelijking: {title}\n\n")
+            f.write(f"Video: https://youtube.com/watch?v={video_id}  \n")
+            f.write(f"Transcriptie: {count_tokens(transcript)} tokens ({lang})\n\n")
+            f.write(format_comparison(rows) + "\n")
+    return rows, report_path
+
+
+def format_comparison(rows: list) -> str:
+    """Markdown table comparing latency, throughput, token usage and cost per provider."""
+    lines = ["| Provider | Model | Status | Tijd | Eerste token | Tokens in | Tokens uit | Tokens/s | Kosten |",
+             "|---|---|---|---:|---:|---:|---:|---:|---:|"]
+    for row in rows:
+        usage = row["usage"]
+        status = "cache" if row["cached"] else row["status"]
+        if row["status"] != "ok":
+            status = f"fout: {row['error']}"
+        first = f"{row['first_token_seconds']:.1f}s" if row["first_token_seconds"] is not None else "-"
+        lines.append(f"| {row['provider']} | {row['model'] or DEFAULT_MODELS[row['provider']]} | {status} "
+                     f"| {row['seconds']:.1f}s | {first} | {usage.get('input_tokens', 0)} "
+                     f"| {usage.get('output_tokens', 0)} | {row['tokens_per_second']:.1f} | ${row['cost']:.4f} |")
+    return "\n".join(lines)
+
+
+def read_urls(lines) -> list:
+    """Read URLs from lines of text (whitespace separated, # starts a comment)."""
+    urls = []
+    for line in lines:
+        if line.lstrip().startswith('#'):
+            continue
+        urls.extend(line.split())
+    return urls
+
+
+def process_batch(urls: list, provider: str, api_key: Optional[str] = None,
+                  model: Optional[str] = None, fetch_workers: int = BATCH_FETCH_WORKERS,
+                  llm_workers: Optional[int] = None, progress_callback=None, **kwargs) -> list:
+    """
+    Process many videos with process_video, deduplicated by video ID.
+    YouTube fetches and LLM calls have separate concurrency limits, so cheap
+    transcript fetches continue while slow summaries run. A failing video
+    does not stop the batch.
+    Returns one result dict per video (in input order).
+    """
+    results = []
+    jobs = []
+    seen = set()
+    for url in urls:
+        video_id = extract_video_id(url)
+        if not video_id:
+            results.append({"url": url, "video_id": None, "status": "fout",
+                            "error": "Ongeldige YouTube URL", "seconds": 0.0,
+                            "transcript_path": None, "summary_path": None})
+            continue
+        if video_id in seen:
+            continue
+        seen.add(video_id)
+        result = {"url": url, "video_id": video_id, "status": "wachtend", "error": None,
+                  "seconds": 0.0, "transcript_path": None, "summary_path": None}
+        results.append(result)
+        jobs.append(result)
+
+    if not jobs:
+        return results
+
+    llm_workers = llm_workers or BATCH_LLM_WORKERS.get(provider, 1)
+    fetch_semaphore = threading.BoundedSemaphore(fetch_workers)
+    llm_semaphore = threading.BoundedSemaphore(llm_workers)
+
+    def run(result):
+        video_id = result["video_id"]
+        callback = None
+        if progress_callback:
+            callback = lambda msg: progress_callback(f"[{video_id}] {msg}")
+        start = time.perf_counter()
+        try:
+            video = process_video(
+                result["url"], provider, api_key, model=model,
+                progress_callback=callback,
+                fetch_semaphore=fetch_semaphore, llm_semaphore=llm_semaphore,
+                **kwargs
+            )
+            video.wait_saved()
+            result.update(status="ok", transcript_path=video.transcript_path, summary_path=video.summary_path)
+        except Exception as e:
+            logging.error(f"Batch: fout bij video {video_id}", exc_info=True)
+            result.update(status="fout", error=str(e))
+        result["seconds"] = time.perf_counter() - start
+        if progress_callback:
+            progress_callback(f"[{video_id}] {'Klaar' if result['status'] == 'ok' else 'Fout'}")
+
+    # Threads die op een LLM slot wachten houden een worker bezet; met
+    # BATCH_MAX_PENDING extra workers blijft het ophalen doorlopen.
+    max_workers = min(len(jobs), llm_workers + max(fetch_workers, BATCH_MAX_PENDING))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(run, jobs))
+
+    return results
+
+
+def format_search_results(hits: list) -> str:
+    """Format library search results for the terminal."""
+    lines = []
+    for hit in hits:
+        when = (hit["created"] or "")[:16].replace("T", " ")
+        lines.append(f"{when}  {hit['title']}  [{_model_label(hit['provider'] or '?', hit['model'])}]")
+        lines.append(f"    https://youtube.com/watch?v={hit['video_id']}")
+        lines.append(f"    {' '.join(hit['snippet'].split())}")
+        lines.append(f"    {hit['summary_path'] or hit['transcript_path']}")
+    return "\n".join(lines) if lines else "Niets gevonden."
+
+
+def format_batch_results(results: list) -> str:
+    """Format batch results as a plain text table."""
+    rows = [("#", "Video ID", "Status", "Tijd", "Samenvatting / fout")]
+    for i, result in enumerate(results, 1):
+        detail = str(result["summary_path"]) if result["status"] == "ok" else (result["error"] or "")
+        rows.append((str(i), result["video_id"] or result["url"][:11], result["status"],
+                     f"{result['seconds']:.1f}s", detail))
+
+    widths = [max(len(row[col]) for row in rows) for col in range(4)]
+    lines = []
+    for row in rows:
+        cells = [row[col].ljust(widths[col]) for col in range(4)]
+        lines.append("  ".join(cells + [row[4]]))
+    lines.insert(1, "-" * len(lines[0]))
+
+    ok = sum(1 for result in results if result["status"] == "ok")
+    lines.append("")
+    lines.append(f"{ok}/{len(results)} video's verwerkt")
+    return "\n".join(lines)
 
 
 def load_config() -> dict:
@@ -545,14 +3109,79 @@ def save_config(config: dict):
 if __name__ == "__main__":
     # CLI mode
     import sys
-
-    if len(sys.argv) < 2:
-        print("Gebruik: python youtube_samenvatting.py <youtube_url> [provider]")
-        print("Providers: ollama, openai, anthropic")
-        sys.exit(1)
-
-    url = sys.argv[1]
-    provider = sys.argv[2] if len(sys.argv) > 2 else "ollama"
+    import argparse
+
+    providers = ["ollama", "openai", "anthropic"]
+    parser = argparse.ArgumentParser(
+        description="Maak samenvattingen van een of meer YouTube video's.",
+        epilog="Zonder URL's en zonder --file worden URL's van stdin gelezen."
+    )
+    parser.add_argument("urls", nargs="*", metavar="url",
+                        help="YouTube URL's of video ID's (optioneel gevolgd door een provider)")
+    parser.add_argument("-p", "--provider", choices=providers, help="Taalmodel provider (standaard: ollama)")
+    parser.add_argument("-f", "--file", help="Bestand met URL's (een per regel, '-' voor stdin)")
+    parser.add_argument("--fetch-workers", type=int, default=BATCH_FETCH_WORKERS,
+                        help="Gelijktijdige YouTube verzoeken in batch modus")
+    parser.add_argument("--llm-workers", type=int,
+                        help="Gelijktijdige LLM verzoeken in batch modus (standaard per provider)")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Negeer de samenvatting cache en maak een nieuwe samenvatting")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Gebruik en vul geen cache (transcriptie en samenvatting)")
+    parser.add_argument("--compare", nargs="?", const=",".join(DEFAULT_COMPARE_TARGETS), metavar="DOELEN",
+                        help="Vat één video samen met meerdere providers tegelijk en vergelijk ze; "
+                             f"komma gescheiden provider[:model] (standaard: {','.join(DEFAULT_COMPARE_TARGETS)})")
+    parser.add_argument("--raw-transcript", action="store_true",
+                        help="Transcriptie niet opschonen (herhaalde regels, [Music] e.d. blijven staan)")
+    parser.add_argument("--remove-fillers", action="store_true",
+                        help="Ook stopwoorden als uh, uhm en ehm uit de transcriptie halen")
+    parser.add_argument("--format", default=",".join(DEFAULT_OUTPUT_FORMATS),
+                        help=f"Uitvoerformaten, komma gescheiden: {', '.join(RENDERERS)} "
+                             f"(standaard: {','.join(DEFAULT_OUTPUT_FORMATS)})")
+    parser.add_argument("--search", metavar="ZOEKTERM",
+                        help="Zoek in alle verwerkte video's (titel, transcriptie en samenvatting)")
+    parser.add_argument("--limit", type=int, default=LIBRARY_SEARCH_LIMIT,
+                        help="Maximaal aantal zoekresultaten")
+    parser.add_argument("--ask", metavar="VRAAG",
+                        help="Stel een vraag over alle video's in de bibliotheek (antwoord met bronnen)")
+    parser.add_argument("--import-library", nargs="?", const=str(OUTPUT_DIR), metavar="MAP",
+                        help=f"Zet bestaande bestanden in de bibliotheek (standaard: {OUTPUT_DIR})")
+    parser.add_argument("--timings", action="store_true",
+                        help="Toon na afloop de tijd per stap")
+    parser.add_argument("--metrics", nargs="?", const=str(METRICS_FILE), metavar="BESTAND",
+                        help=f"Schrijf stap-metingen als JSON regels (standaard: {METRICS_FILE})")
+    args = parser.parse_args()
+
+    if args.import_library:
+        print(f"Importeren uit {args.import_library}...")
+        added, skipped = LIBRARY.import_files(Path(args.import_library))
+        print(f"{added} toegevoegd, {skipped} overgeslagen ({len(LIBRARY)} in de bibliotheek)")
+        if not args.search:
+            sys.exit(0)
+
+    if args.search:
+        start = time.perf_counter()
+        hits = LIBRARY.search(args.search, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(format_search_results(hits))
+        print(f"\n{len(hits)} resultaten in {elapsed:.1f} ms")
+        sys.exit(0)
+
+    urls = list(args.urls)
+    provider = args.provider
+    # Oude vorm: youtube_samenvatting.py <url> <provider>
+    if urls and urls[-1] in providers and not provider:
+        provider = urls.pop()
+    provider = provider or "ollama"
+
+    if args.file:
+        if args.file == "-":
+            urls.extend(read_urls(sys.stdin))
+        else:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                urls.extend(read_urls(f))
+    elif not urls and not args.ask and not sys.stdin.isatty():
+        urls.extend(read_urls(sys.stdin))
 
     config = load_config()
     api_key = None
@@ -561,15 +3190,114 @@ if __name__ == "__main__":
     elif provider == "anthropic":
         api_key = config.get("anthropic_api_key") or os.environ.get("ANTHROPIC_API_KEY")
 
-    try:
-        print(f"Verwerken van: {url}")
-        transcript_path, summary_path = process_video(
-            url, provider, api_key,
-            progress_callback=lambda msg: print(f"  > {msg}")
-        )
-        print(f"\nKlaar!")
-        print(f"Transcriptie: {transcript_path}")
-        print(f"Samenvatting: {summary_path}")
-    except Exception as e:
-        print(f"Fout: {e}")
+    if args.ask:
+        try:
+            answer, sources = chat_with_library(args.ask, [], provider, api_key,
+                                                on_token=lambda token: print(token, end="", flush=True))
+        except Exception as e:
+            print(f"Fout: {e}")
+            sys.exit(1)
+        print()
+        print()
+        print(format_sources(sources) or "Geen passages gevonden in de bibliotheek.")
+        sys.exit(0)
+
+    if not urls:
+        parser.print_usage()
         sys.exit(1)
+
+    formats = tuple(fmt.strip().lower() for fmt in args.format.split(",") if fmt.strip())
+    unknown = [fmt for fmt in formats if fmt not in RENDERERS]
+    if unknown or not formats:
+        parser.error(f"Onbekend uitvoerformaat: {', '.join(unknown) or args.format} (kies uit {', '.join(RENDERERS)})")
+
+    stage_events = []
+    metrics_log = MetricsLog(args.metrics) if args.metrics else None
+
+    def on_stage(event):
+        stage_events.append(event)
+        if metrics_log:
+            metrics_log(event)
+
+    def print_timings():
+        if args.timings:
+            print()
+            print(format_stage_timings(stage_events))
+
+    if args.compare:
+        if len(urls) != 1:
+            parser.error("--compare werkt met precies één URL")
+        try:
+            targets = [parse_target(target) for target in args.compare.split(",") if target.strip()]
+        except Exception as e:
+            parser.error(str(e))
+        api_keys = {
+            "openai": config.get("openai_api_key") or os.environ.get("OPENAI_API_KEY"),
+            "anthropic": config.get("anthropic_api_key") or os.environ.get("ANTHROPIC_API_KEY"),
+        }
+        print(f"Vergelijken van {len(targets)} modellen voor: {urls[0]}")
+        try:
+            rows, report_path = compare_providers(
+                urls[0], targets, api_keys,
+                use_cache=not args.no_cache,
+                refresh=args.refresh,
+                progress_callback=lambda msg: print(f"  > {msg}"),
+                on_stage=on_stage,
+                formats=formats,
+                normalize=not args.raw_transcript,
+                remove_fillers=args.remove_fillers
+            )
+        except Exception as e:
+            print(f"Fout: {e}")
+            sys.exit(1)
+        print()
+        print(format_comparison(rows))
+        print(f"\nRapport: {report_path}")
+        for row in rows:
+            if row["summary_path"]:
+                print(f"Samenvatting ({row['provider']} {row['model'] or ''}): {row['summary_path']}")
+        print_timings()
+        if any(row["status"] != "ok" for row in rows):
+            sys.exit(1)
+    elif len(urls) == 1:
+        url = urls[0]
+        try:
+            print(f"Verwerken van: {url}")
+            result = process_video(
+                url, provider, api_key,
+                progress_callback=lambda msg: print(f"  > {msg}"),
+                use_cache=not args.no_cache,
+                refresh=args.refresh,
+                on_stage=on_stage,
+                formats=formats,
+                normalize=not args.raw_transcript,
+                remove_fillers=args.remove_fillers
+            )
+            print(f"\nKlaar!")
+            print(f"Transcriptie: {result.transcript_path}")
+            for path in result.summary_paths.values():
+                print(f"Samenvatting: {path}")
+            print_timings()
+        except Exception as e:
+            print(f"Fout: {e}")
+            print_timings()
+            sys.exit(1)
+    else:
+        print(f"Verwerken van {len(urls)} URL's met {provider}...")
+        results = process_batch(
+            urls, provider, api_key,
+            fetch_workers=args.fetch_workers,
+            llm_workers=args.llm_workers,
+            progress_callback=lambda msg: print(f"  > {msg}"),
+            use_cache=not args.no_cache,
+            refresh=args.refresh,
+            on_stage=on_stage,
+            formats=formats,
+            normalize=not args.raw_transcript,
+            remove_fillers=args.remove_fillers
+        )
+        print()
+        print(format_batch_results(results))
+        print_timings()
+        if any(result["status"] != "ok" for result in results):
+            sys.exit(1)